@@ -0,0 +1,95 @@
+"""Micro-benchmark for deserialising a large dose history.
+
+Run with ``python benchmarks/bench_history_load.py [entries]``.
+"""
+from __future__ import annotations
+
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from reminders import models  # noqa: E402
+
+
+def _legacy_from_iso(value):
+    if value is None:
+        return None
+    try:
+        return datetime.strptime(value, models.ISO_FORMAT)
+    except ValueError:
+        return datetime.fromisoformat(value.replace("Z", ""))
+
+
+def _legacy_from_dict(data):
+    timestamp = _legacy_from_iso(data.get("timestamp"))
+    if timestamp is None:
+        timestamp = _legacy_from_iso(data.get("acted_at"))
+    return models.DoseHistoryEntry(
+        dose_id=data["dose_id"],
+        medication_id=data["medication_id"],
+        scheduled_time=_legacy_from_iso(data["scheduled_time"]),
+        timestamp=timestamp,
+        status=data["status"],
+        acted_at=_legacy_from_iso(data["acted_at"]),
+        notes=data.get("notes", ""),
+    )
+
+
+def _build_history(count: int):
+    start = datetime(2022, 1, 1, 8, 0)
+    entries = []
+    for index in range(count):
+        scheduled = start + timedelta(hours=8 * (index // 3))
+        acted = scheduled + timedelta(minutes=index % 45, microseconds=index)
+        entries.append(
+            models.DoseHistoryEntry(
+                dose_id=f"dose-{index}",
+                medication_id=f"med-{index % 3}",
+                scheduled_time=scheduled,
+                status="taken",
+                acted_at=acted,
+                timestamp=acted,
+            )
+        )
+    return entries
+
+
+def _timed(label: str, func) -> float:
+    models._parse_iso.cache_clear()
+    models._parse_epoch.cache_clear()
+    began = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - began
+    print(f"{label:<32} {elapsed * 1000:9.1f} ms")
+    return elapsed
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    entries = _build_history(count)
+    iso_text = json.dumps(models.serialize_collection(entries))
+    epoch_text = json.dumps(models.serialize_collection(entries, epoch=True))
+
+    print(f"Loading {count} history entries (json.loads + deserialise)")
+    print(f"Document size: iso {len(iso_text) / 1e6:.1f} MB, epoch {len(epoch_text) / 1e6:.1f} MB")
+    legacy = _timed(
+        "strptime (previous codec)",
+        lambda: [_legacy_from_dict(item) for item in json.loads(iso_text)],
+    )
+    fast = _timed(
+        "fromisoformat + memo",
+        lambda: models.deserialize_history(json.loads(iso_text)),
+    )
+    epoch = _timed(
+        "epoch integers",
+        lambda: models.deserialize_history(json.loads(epoch_text)),
+    )
+    print(f"Speed-up: iso {legacy / fast:.1f}x, epoch {legacy / epoch:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Memory benchmark: bytes per materialised dose history entry.
+
+Run with ``python benchmarks/bench_history_memory.py [entries]`` (default 1M).
+"""
+from __future__ import annotations
+
+import gc
+import sys
+import tracemalloc
+from dataclasses import make_dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from reminders import models  # noqa: E402
+
+# The pre-slots layout: an ordinary dataclass with a per-instance __dict__.
+LegacyHistoryEntry = make_dataclass(
+    "LegacyHistoryEntry",
+    ["dose_id", "medication_id", "scheduled_time", "status", "acted_at", "timestamp", "notes"],
+)
+
+
+def _build_payload(count: int):
+    start = datetime(2020, 1, 1, 8, 0)
+    payload = []
+    for index in range(count):
+        scheduled = start + timedelta(hours=8 * (index // 3))
+        acted = scheduled + timedelta(minutes=index % 45, microseconds=index)
+        entry = models.DoseHistoryEntry(
+            dose_id=f"{index:08d}-0000-4000-8000-000000000000",
+            medication_id=f"med-{index % 3}",
+            scheduled_time=scheduled,
+            status=("taken", "missed", "snoozed")[index % 3],
+            acted_at=acted,
+            timestamp=acted,
+        )
+        payload.append(entry.to_dict())
+    return payload
+
+
+def _legacy_from_dict(data):
+    return LegacyHistoryEntry(
+        dose_id=data["dose_id"],
+        medication_id=data["medication_id"],
+        scheduled_time=models._from_iso(data["scheduled_time"]),
+        status=data["status"],
+        acted_at=models._from_iso(data["acted_at"]),
+        timestamp=models._from_iso(data["timestamp"]),
+        notes=data.get("notes", ""),
+    )
+
+
+def _measure(label: str, payload, build) -> None:
+    gc.collect()
+    models._parse_iso.cache_clear()
+    tracemalloc.start()
+    entries = build(payload)
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {current / len(entries):8.1f} bytes/entry")
+    del entries
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    payload = _build_payload(count)
+    print(f"Materialising {count} history entries")
+    _measure("dataclass with __dict__", payload, lambda p: [_legacy_from_dict(i) for i in p])
+    _measure("slotted DoseHistoryEntry", payload, models.deserialize_history)
+
+
+if __name__ == "__main__":
+    main()
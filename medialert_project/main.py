@@ -1,14 +1,16 @@
 """Entry point that wires the reminder scheduler, storage and UI together."""
 from __future__ import annotations
 
+import argparse
 import logging
 from datetime import datetime, timedelta, time as time_cls
-from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 from src.reminders.models import DoseSchedule, Medication
+from src.reminders.history_segments import DEFAULT_SEGMENT_SIZE
+from src.reminders.rollups import compact_rollups, summarize_range
 from src.reminders.scheduler import ReminderScheduler
-from src.reminders.storage import ReminderStorage
+from src.reminders.storage import StorageEngine, open_storage
 from src.ui.alerts import AlertDialogManager
 
 LOGGER = logging.getLogger(__name__)
@@ -21,17 +23,17 @@ def configure_logging() -> None:
     )
 
 
-def build_scheduler(storage: ReminderStorage) -> ReminderScheduler:
+def build_scheduler(storage: StorageEngine) -> ReminderScheduler:
     alert_manager = AlertDialogManager()
 
     def handle_due(dose, medication, on_taken, on_snooze, on_skip):
         alert_manager.show_alert(dose, medication, on_taken, on_snooze, on_skip)
 
-    scheduler = ReminderScheduler(storage, due_handler=handle_due)
+    scheduler = ReminderScheduler(storage, due_handler=handle_due, mode="event")
     return scheduler
 
 
-def ensure_pending_doses(scheduler: ReminderScheduler, storage: ReminderStorage) -> None:
+def ensure_pending_doses(scheduler: ReminderScheduler, storage: StorageEngine) -> None:
     for medication in storage.load_medications():
         scheduler.ensure_next_dose(medication)
 
@@ -53,7 +55,7 @@ def parse_times(times_str: str) -> List[time_cls]:
     return values
 
 
-def add_medication_interactively(storage: ReminderStorage, scheduler: ReminderScheduler) -> None:
+def add_medication_interactively(storage: StorageEngine, scheduler: ReminderScheduler) -> None:
     name = prompt("Medication name: ").strip()
     if not name:
         print("Name is required")
@@ -91,7 +93,7 @@ def add_medication_interactively(storage: ReminderStorage, scheduler: ReminderSc
     print(f"Added medication {name}")
 
 
-def list_medications(storage: ReminderStorage) -> None:
+def list_medications(storage: StorageEngine) -> None:
     medications = storage.load_medications()
     if not medications:
         print("No medications configured")
@@ -112,7 +114,7 @@ def list_medications(storage: ReminderStorage) -> None:
             print(f"  Schedule: {interval}, starting {med.schedule.start_time:%Y-%m-%d %H:%M}")
 
 
-def list_upcoming_doses(storage: ReminderStorage) -> None:
+def list_upcoming_doses(storage: StorageEngine) -> None:
     doses = storage.load_upcoming_doses()
     if not doses:
         print("No upcoming doses scheduled")
@@ -124,12 +126,24 @@ def list_upcoming_doses(storage: ReminderStorage) -> None:
         )
 
 
-def list_history(storage: ReminderStorage) -> None:
-    history = storage.load_history()
+def list_history(storage: StorageEngine) -> None:
+    history = storage.load_history(limit=10, reverse=True)
     if not history:
         print("No history available")
         return
-    for entry in history[-10:]:
+    now = datetime.now()
+    summary = summarize_range(storage, now - timedelta(days=30), now)
+    taken = sum(statuses.get("taken", 0) for statuses in summary.counts.values())
+    missed = sum(statuses.get("missed", 0) for statuses in summary.counts.values())
+    if taken + missed:
+        line = f"Last 30 days: {taken / (taken + missed) * 100:.1f}% adherence"
+        if summary.p95_delay is not None:
+            line += (
+                f", taken {summary.mean_delay / 60:.0f} min late on average"
+                f" (p95 {summary.p95_delay / 60:.0f} min)"
+            )
+        print(line)
+    for entry in reversed(history):
         recorded = entry.timestamp.strftime("%Y-%m-%d %H:%M") if entry.timestamp else "n/a"
         print(
             f"- {entry.medication_id} dose scheduled {entry.scheduled_time:%Y-%m-%d %H:%M}"
@@ -140,7 +154,7 @@ def list_history(storage: ReminderStorage) -> None:
             print(f"    Notes: {entry.notes}")
 
 
-def run_cli(storage: ReminderStorage, scheduler: ReminderScheduler) -> None:
+def run_cli(storage: StorageEngine, scheduler: ReminderScheduler) -> None:
     print("Medication reminder service running. Commands: list, doses, history, add, quit")
     while True:
         command = prompt("> ").strip().lower()
@@ -160,9 +174,36 @@ def run_cli(storage: ReminderStorage, scheduler: ReminderScheduler) -> None:
             print("Unknown command")
 
 
-def main() -> None:
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Medication reminder service")
+    parser.add_argument(
+        "--storage",
+        default="data/reminders.json",
+        help="Storage path or URL, e.g. data/reminders.json or sqlite:///data/reminders.db",
+    )
+    parser.add_argument(
+        "--retention-days",
+        type=int,
+        default=None,
+        help="Archive history older than this many days (JSON storage only)",
+    )
+    parser.add_argument(
+        "--segment-size",
+        type=int,
+        default=DEFAULT_SEGMENT_SIZE,
+        help="Seal history into segments of this many entries; 0 keeps it all in the"
+        " document (JSON storage only)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
     configure_logging()
-    storage = ReminderStorage(Path("data/reminders.json"))
+    storage = open_storage(
+        args.storage, retention_days=args.retention_days, segment_size=args.segment_size
+    )
+    compact_rollups(storage)
     scheduler = build_scheduler(storage)
     ensure_pending_doses(scheduler, storage)
     scheduler.start()
@@ -170,6 +211,7 @@ def main() -> None:
         run_cli(storage, scheduler)
     finally:
         scheduler.stop()
+        storage.close()
 
 
 if __name__ == "__main__":
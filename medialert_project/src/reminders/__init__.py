@@ -3,6 +3,23 @@
 __all__ = [
     "models",
     "storage",
+    "journal",
+    "locking",
+    "durability",
+    "snapshot_codec",
+    "cache",
+    "history_index",
+    "history_segments",
+    "history_archive",
+    "aggregates",
+    "sketch",
+    "rollups",
+    "punctuality",
+    "sqlite_storage",
+    "migrate",
     "scheduler",
+    "async_scheduler",
+    "multi_tenant",
     "analytics",
+    "export",
 ]
@@ -0,0 +1,144 @@
+"""Running adherence counts bucketed by day, week and month."""
+from __future__ import annotations
+
+import copy
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+from .models import DoseHistoryEntry, _from_iso
+
+AGGREGATES_KEY = "aggregates"
+
+# {granularity: {bucket: {medication_id: {status: count}}}}
+AggregateData = Dict[str, Dict[str, Dict[str, Dict[str, int]]]]
+Counts = Dict[str, Dict[str, int]]
+
+
+def status_key(status: Optional[str]) -> str:
+    return (status or "").strip().lower() or "unknown"
+
+
+def bucket_keys(day: date) -> Dict[str, str]:
+    """Bucket labels for ``day``; weeks are labelled by their Monday."""
+    monday = day - timedelta(days=day.weekday())
+    return {
+        "day": day.isoformat(),
+        "week": monday.isoformat(),
+        "month": day.strftime("%Y-%m"),
+    }
+
+
+def _next_month(day: date) -> date:
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def _add(data: AggregateData, medication_id: str, status: str, day: date) -> None:
+    for granularity, bucket in bucket_keys(day).items():
+        statuses = (
+            data.setdefault(granularity, {})
+            .setdefault(bucket, {})
+            .setdefault(medication_id, {})
+        )
+        statuses[status] = statuses.get(status, 0) + 1
+
+
+def record_payloads(data: AggregateData, payloads: Iterable[Mapping[str, Any]]) -> None:
+    """Count serialized history entries into ``data`` in place."""
+
+    for payload in payloads:
+        when = _from_iso(payload.get("timestamp")) or _from_iso(payload.get("acted_at"))
+        _add(data, payload["medication_id"], status_key(payload.get("status")), when.date())
+
+
+def update_state(state: Dict[str, Any], payloads: Iterable[Mapping[str, Any]]) -> None:
+    """Keep ``state``'s aggregates in step with history just appended to it.
+
+    Documents written before aggregates existed are counted from scratch the
+    first time history is appended.
+    """
+
+    if AGGREGATES_KEY in state:
+        record_payloads(state[AGGREGATES_KEY], payloads)
+    else:
+        state[AGGREGATES_KEY] = aggregates_from_state(state)
+
+
+def aggregates_from_state(state: Mapping[str, Any]) -> AggregateData:
+    """A private copy of ``state``'s aggregates, counted from history if absent."""
+
+    if AGGREGATES_KEY in state:
+        return copy.deepcopy(state[AGGREGATES_KEY])
+    data: AggregateData = {}
+    record_payloads(data, state.get("history", []))
+    return data
+
+
+class AdherenceAggregates:
+    """Query helper over per-medication status counts.
+
+    Any range whose ends fall on midnight is answered from the coarsest
+    buckets that fit inside it, so a year costs about a dozen month lookups
+    rather than a scan of every history entry.
+    """
+
+    def __init__(self, data: Optional[AggregateData] = None) -> None:
+        self.data: AggregateData = data if data is not None else {}
+
+    @classmethod
+    def from_history(cls, entries: Iterable[DoseHistoryEntry]) -> "AdherenceAggregates":
+        aggregates = cls()
+        for entry in entries:
+            aggregates.add(entry)
+        return aggregates
+
+    def add(self, entry: DoseHistoryEntry) -> None:
+        when = entry.timestamp or entry.acted_at
+        _add(self.data, entry.medication_id, status_key(entry.status), when.date())
+
+    def to_dict(self) -> AggregateData:
+        return self.data
+
+    def _buckets(self, start: date, end: date) -> Iterable[tuple]:
+        cursor = start
+        while cursor < end:
+            keys = bucket_keys(cursor)
+            following = _next_month(cursor)
+            if cursor.day == 1 and following <= end:
+                yield "month", keys["month"]
+                cursor = following
+                continue
+            following = cursor + timedelta(days=7)
+            if cursor.weekday() == 0 and following <= end:
+                yield "week", keys["week"]
+                cursor = following
+                continue
+            yield "day", keys["day"]
+            cursor += timedelta(days=1)
+
+    def counts(self, start: datetime, end: datetime) -> Counts:
+        """Status counts per medication for history filed in ``[start, end)``.
+
+        Both ends must be at midnight; use the raw history for partial days.
+        """
+
+        for bound in (start, end):
+            if bound.time() != time.min:
+                raise ValueError(f"Aggregate ranges must begin and end at midnight: {bound}")
+        totals: Counts = {}
+        for granularity, bucket in self._buckets(start.date(), end.date()):
+            for medication_id, statuses in self.data.get(granularity, {}).get(bucket, {}).items():
+                merged = totals.setdefault(medication_id, {})
+                for status, count in statuses.items():
+                    merged[status] = merged.get(status, 0) + count
+        return totals
+
+
+__all__ = [
+    "AGGREGATES_KEY",
+    "AdherenceAggregates",
+    "aggregates_from_state",
+    "bucket_keys",
+    "record_payloads",
+    "status_key",
+    "update_state",
+]
@@ -3,10 +3,10 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import Iterable, Optional
 
 from .models import DoseHistoryEntry, UpcomingDose
-from .storage import ReminderStorage
+from .storage import StorageEngine
 
 
 @dataclass
@@ -22,24 +22,37 @@ class AlertAction:
 class AlertActionLogger:
     """Persist alert actions to history for analytics."""
 
-    def __init__(self, storage: ReminderStorage) -> None:
+    def __init__(self, storage: StorageEngine) -> None:
         self.storage = storage
 
     def log(self, action: AlertAction) -> None:
-        """Write an alert action entry to history."""
+        """Write an alert action entry to history.
+
+        Storage updates its adherence aggregates in the same write, so
+        dashboards never need to rescan history for aligned ranges.
+        """
+
+        self.storage.append_history(self._entry(action, datetime.now()))
+
+    def log_many(self, actions: Iterable[AlertAction]) -> None:
+        """Write several alert actions to history with a single append."""
 
         recorded_at = datetime.now()
-        acted_at = action.acted_at or recorded_at
-        entry = DoseHistoryEntry(
+        entries = [self._entry(action, recorded_at) for action in actions]
+        if entries:
+            self.storage.append_history_many(entries)
+
+    @staticmethod
+    def _entry(action: AlertAction, recorded_at: datetime) -> DoseHistoryEntry:
+        return DoseHistoryEntry(
             dose_id=action.dose.dose_id,
             medication_id=action.dose.medication_id,
             scheduled_time=action.dose.scheduled_time,
             timestamp=recorded_at,
             status=action.status,
-            acted_at=acted_at,
+            acted_at=action.acted_at or recorded_at,
             notes=action.notes,
         )
-        self.storage.append_history(entry)
 
     def log_action(
         self,
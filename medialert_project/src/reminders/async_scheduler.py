@@ -0,0 +1,230 @@
+"""asyncio-native variant of the reminder scheduler."""
+from __future__ import annotations
+
+import asyncio
+import functools
+import heapq
+import inspect
+import itertools
+import logging
+from concurrent.futures import Executor
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Set, Tuple, Union
+
+from .analytics import AlertActionLogger
+from .models import Medication, UpcomingDose
+from .scheduler import DueHandler, ReminderScheduler
+from .storage import StorageEngine
+
+LOGGER = logging.getLogger(__name__)
+
+
+AsyncDueHandler = Callable[
+    [
+        UpcomingDose,
+        Medication,
+        Callable[[], Awaitable[None]],
+        Callable[[int], Awaitable[None]],
+        Callable[[], Awaitable[None]],
+    ],
+    Awaitable[None],
+]
+
+
+def _is_coroutine_handler(handler: Any) -> bool:
+    return inspect.iscoroutinefunction(handler) or inspect.iscoroutinefunction(
+        getattr(handler, "__call__", None)
+    )
+
+
+class _TransitionEngine(ReminderScheduler):
+    """Synchronous scheduler used for dose transitions, never started itself."""
+
+    def __init__(
+        self,
+        owner: "AsyncReminderScheduler",
+        storage: StorageEngine,
+        action_logger: Optional[AlertActionLogger],
+    ) -> None:
+        super().__init__(storage, action_logger=action_logger)
+        self._owner = owner
+
+    def _dose_changed(self, dose: UpcomingDose) -> None:
+        self._owner._dose_changed_threadsafe(dose)
+
+
+class AsyncReminderScheduler:
+    """Schedule reminders on an asyncio event loop.
+
+    Every storage call runs in ``executor`` (the loop's default executor when
+    omitted) so slow disks never block the loop. ``due_handler`` may be a
+    coroutine function, in which case its callbacks are coroutine functions
+    as well, or a regular :data:`DueHandler`, which runs in the executor and
+    receives thread-safe callbacks.
+    """
+
+    def __init__(
+        self,
+        storage: StorageEngine,
+        due_handler: Optional[Union[AsyncDueHandler, DueHandler]] = None,
+        action_logger: Optional[AlertActionLogger] = None,
+        executor: Optional[Executor] = None,
+        resync_interval: float = 60.0,
+    ) -> None:
+        self.storage = storage
+        self.due_handler = due_handler
+        self.resync_interval = resync_interval
+        self._executor = executor
+        self._engine = _TransitionEngine(self, storage, action_logger)
+        self.action_logger = self._engine.action_logger
+        self._queue: List[Tuple[datetime, int, str]] = []
+        self._queue_counter = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._handler_tasks: Set[asyncio.Task] = set()
+
+    # Lifecycle ----------------------------------------------------------
+
+    async def start(self) -> None:
+        if self._task and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        await self._rebuild_queue()
+        self._task = self._loop.create_task(self._run(), name="AsyncReminderScheduler")
+        LOGGER.info("Async reminder scheduler started")
+
+    async def stop(self) -> None:
+        tasks = [task for task in (self._task, *self._handler_tasks) if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        LOGGER.info("Async reminder scheduler stopped")
+
+    # Scheduling operations ----------------------------------------------
+
+    async def _call(self, func: Callable[..., Any], *args: Any) -> Any:
+        loop = self._loop or asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+    async def add_medication(self, medication: Medication) -> None:
+        await self._call(self._engine.add_medication, medication)
+
+    async def ensure_next_dose(self, medication: Medication) -> None:
+        await self._call(self._engine.ensure_next_dose, medication)
+
+    async def snooze(self, dose_id: str, minutes: int) -> None:
+        await self._call(self._engine.snooze, dose_id, minutes)
+
+    async def mark_taken(self, dose_id: str) -> None:
+        await self._call(self._engine.mark_taken, dose_id)
+
+    async def mark_missed(self, dose_id: str) -> None:
+        await self._call(self._engine.mark_missed, dose_id)
+
+    async def mark_skipped(self, dose_id: str) -> None:
+        await self._call(self._engine.mark_skipped, dose_id)
+
+    async def mark_many(self, dose_ids: Iterable[str], status: str) -> List[UpcomingDose]:
+        return await self._call(self._engine.mark_many, list(dose_ids), status)
+
+    async def snooze_many(self, dose_ids: Iterable[str], minutes: int) -> List[UpcomingDose]:
+        return await self._call(self._engine.snooze_many, list(dose_ids), minutes)
+
+    # Queue helpers ------------------------------------------------------
+
+    def _push(self, due_time: datetime, dose_id: str) -> None:
+        heapq.heappush(self._queue, (due_time, next(self._queue_counter), dose_id))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _dose_changed_threadsafe(self, dose: UpcomingDose) -> None:
+        if self._loop is None or dose.status != "pending" or dose.notified:
+            return
+        self._loop.call_soon_threadsafe(self._push, dose.effective_due_time(), dose.dose_id)
+
+    async def _rebuild_queue(self) -> None:
+        doses = await self._call(self.storage.load_upcoming_doses)
+        entries = [
+            (dose.effective_due_time(), next(self._queue_counter), dose.dose_id)
+            for dose in doses
+            if dose.status == "pending" and not dose.notified
+        ]
+        heapq.heapify(entries)
+        self._queue = entries
+
+    async def _dispatch_due(self) -> None:
+        now = datetime.now()
+        while self._queue and self._queue[0][0] <= now:
+            due_time, _, dose_id = heapq.heappop(self._queue)
+            dose = await self._call(self.storage.get_upcoming_dose, dose_id)
+            if dose is None or dose.status != "pending" or dose.notified:
+                continue
+            if dose.effective_due_time() != due_time:
+                continue
+            medication = await self._call(self.storage.get_medication, dose.medication_id)
+            if not medication:
+                continue
+            dose.notified = True
+            await self._call(self.storage.upsert_upcoming_dose, dose)
+            self._emit_due(dose, medication)
+
+    def _emit_due(self, dose: UpcomingDose, medication: Medication) -> None:
+        if not self.due_handler:
+            return
+        if _is_coroutine_handler(self.due_handler):
+            coroutine = self.due_handler(
+                dose,
+                medication,
+                functools.partial(self.mark_taken, dose.dose_id),
+                functools.partial(self.snooze, dose.dose_id),
+                functools.partial(self.mark_skipped, dose.dose_id),
+            )
+        else:
+            coroutine = self._call(
+                self.due_handler,
+                dose,
+                medication,
+                self._threadsafe(self.mark_taken, dose.dose_id),
+                self._threadsafe(self.snooze, dose.dose_id),
+                self._threadsafe(self.mark_skipped, dose.dose_id),
+            )
+        # Handlers may wait on user input for a long time; never block dispatch.
+        task = self._loop.create_task(coroutine)
+        self._handler_tasks.add(task)
+        task.add_done_callback(self._handler_done)
+
+    def _threadsafe(self, action: Callable[..., Awaitable[None]], *args: Any) -> Callable:
+        loop = self._loop
+
+        def _callback(*extra: Any) -> Any:
+            return asyncio.run_coroutine_threadsafe(action(*args, *extra), loop)
+
+        return _callback
+
+    def _handler_done(self, task: asyncio.Task) -> None:
+        self._handler_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            LOGGER.error("Due handler failed", exc_info=task.exception())
+
+    async def _run(self) -> None:
+        last_sync = self._loop.time()
+        while True:
+            await self._dispatch_due()
+            timeout = self.resync_interval
+            if self._queue:
+                until_due = (self._queue[0][0] - datetime.now()).total_seconds()
+                timeout = min(max(until_due, 0.0), timeout)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._loop.time() - last_sync >= self.resync_interval:
+                await self._rebuild_queue()
+                last_sync = self._loop.time()
+
+
+__all__ = ["AsyncReminderScheduler", "AsyncDueHandler"]
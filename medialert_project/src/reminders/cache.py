@@ -0,0 +1,134 @@
+"""In-memory object cache backing the cached storage mode."""
+from __future__ import annotations
+
+import copy
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import aggregates, journal, models, rollups
+from .history_archive import ARCHIVES_KEY
+from .history_index import HistoryIndex
+from .history_segments import SEGMENTS_KEY
+from .journal import MutationRecord
+
+Signature = Tuple[Tuple[int, int], ...]
+
+
+@dataclass
+class CacheStats:
+    """Counters describing how reads were served by the cache."""
+
+    hits: int = 0
+    misses: int = 0
+    reloads: int = 0
+
+
+class StorageCache:
+    """Deserialized reminder entities keyed by id, refreshed on file changes."""
+
+    def __init__(self) -> None:
+        self.medications: Dict[str, models.Medication] = {}
+        self.upcoming_doses: Dict[str, models.UpcomingDose] = {}
+        self.history = HistoryIndex()
+        self.segment_names: List[str] = []
+        self.archive_names: Dict[str, str] = {}
+        self.aggregates: aggregates.AggregateData = {}
+        self.rollups: Dict[str, Dict[str, Any]] = {}
+        self.signature: Optional[Signature] = None
+        self.stats = CacheStats()
+
+    def is_fresh(self, signature: Signature) -> bool:
+        return self.signature is not None and self.signature == signature
+
+    def load(self, state: Dict[str, Any], signature: Signature) -> None:
+        """Replace the cached objects with the contents of ``state``."""
+
+        self.medications = {
+            item.medication_id: item
+            for item in models.deserialize_medications(state.get("medications", []))
+        }
+        self.upcoming_doses = {
+            item.dose_id: item
+            for item in models.deserialize_upcoming_doses(state.get("upcoming_doses", []))
+        }
+        self.history = HistoryIndex(models.deserialize_history(state.get("history", [])))
+        self.segment_names = list(state.get(SEGMENTS_KEY, []))
+        self.archive_names = dict(state.get(ARCHIVES_KEY, {}))
+        self.aggregates = aggregates.aggregates_from_state(state)
+        self.rollups = dict(state.get(rollups.ROLLUPS_KEY, {}))
+        self.signature = signature
+        self.stats.reloads += 1
+
+    def invalidate(self) -> None:
+        self.signature = None
+
+    def apply(self, record: MutationRecord) -> None:
+        """Write a committed mutation through to the cached objects."""
+
+        if record.op == journal.UPSERT_MEDICATION:
+            medication = models.Medication.from_dict(record.payload)
+            self.medications[medication.medication_id] = medication
+        elif record.op == journal.REPLACE_MEDICATIONS:
+            self.medications = {
+                item.medication_id: item
+                for item in models.deserialize_medications(record.payload)
+            }
+        elif record.op == journal.UPSERT_UPCOMING_DOSE:
+            dose = models.UpcomingDose.from_dict(record.payload)
+            self.upcoming_doses[dose.dose_id] = dose
+        elif record.op == journal.REPLACE_UPCOMING_DOSES:
+            self.upcoming_doses = {
+                item.dose_id: item
+                for item in models.deserialize_upcoming_doses(record.payload)
+            }
+        elif record.op == journal.REMOVE_UPCOMING_DOSE:
+            self.upcoming_doses.pop(record.payload, None)
+        elif record.op == journal.APPEND_HISTORY:
+            self.history.append(models.DoseHistoryEntry.from_dict(record.payload))
+            aggregates.record_payloads(self.aggregates, [record.payload])
+            rollups.invalidate_days(self.rollups, [record.payload])
+        elif record.op == journal.EXTEND_HISTORY:
+            self.history.extend(models.deserialize_history(record.payload))
+            aggregates.record_payloads(self.aggregates, record.payload)
+            rollups.invalidate_days(self.rollups, record.payload)
+        elif record.op == journal.PUT_ROLLUPS:
+            self.rollups.update((item["day"], item) for item in record.payload)
+        else:
+            self.invalidate()
+
+    # Read helpers -------------------------------------------------------
+    # Callers routinely mutate the objects they get back before upserting
+    # them, so every read hands out a copy and the cache stays authoritative.
+
+    def medication_list(self) -> List[models.Medication]:
+        return [copy.deepcopy(item) for item in self.medications.values()]
+
+    def medication(self, medication_id: str) -> Optional[models.Medication]:
+        item = self.medications.get(medication_id)
+        return copy.deepcopy(item) if item is not None else None
+
+    def upcoming_dose_list(self) -> List[models.UpcomingDose]:
+        return [copy.copy(item) for item in self.upcoming_doses.values()]
+
+    def upcoming_dose(self, dose_id: str) -> Optional[models.UpcomingDose]:
+        item = self.upcoming_doses.get(dose_id)
+        return copy.copy(item) if item is not None else None
+
+    def history_list(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        medication_id: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: Optional[int] = None,
+        reverse: bool = False,
+    ) -> List[models.DoseHistoryEntry]:
+        matches = self.history.query(start, end, medication_id, status, limit, reverse)
+        return [copy.copy(item) for item in matches]
+
+    def aggregate_data(self) -> aggregates.AggregateData:
+        return copy.deepcopy(self.aggregates)
+
+
+__all__ = ["CacheStats", "StorageCache"]
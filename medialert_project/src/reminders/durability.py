@@ -0,0 +1,116 @@
+"""Atomic file replacement and fsync policies for the JSON storage engine."""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Optional, Set
+
+LOGGER = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ("always", "batched", "never")
+
+
+def fsync_path(path: Path) -> None:
+    """Flush a file's data to disk; missing files are ignored."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def fsync_directory(path: Path) -> None:
+    """Make renames inside ``path`` durable where the platform allows it."""
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+    except OSError:  # pragma: no cover - e.g. Windows cannot open directories
+        return
+    try:
+        os.fsync(fd)
+    except OSError:  # pragma: no cover - some filesystems refuse directory fsync
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_bytes(path: Path, data: bytes, *, fsync: bool = True) -> None:
+    """Replace ``path`` with ``data`` so readers see the old or new file, never half.
+
+    The data goes to a temporary file in the same directory that is renamed
+    over ``path``. With ``fsync`` the data is flushed before the rename, so a
+    power cut cannot leave a renamed but empty file behind either.
+    """
+
+    path = Path(path)
+    temp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with temp.open("wb") as handle:
+            handle.write(data)
+            handle.flush()
+            if fsync:
+                os.fsync(handle.fileno())
+        os.replace(temp, path)
+    except BaseException:
+        try:
+            temp.unlink()
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def atomic_write_text(path: Path, text: str, *, fsync: bool = True) -> None:
+    """UTF-8 text variant of :func:`atomic_write_bytes`."""
+    atomic_write_bytes(path, text.encode("utf-8"), fsync=fsync)
+
+
+class DeferredSync:
+    """Collect files written under the ``"batched"`` policy and fsync them later.
+
+    The first :meth:`mark` starts a timer; when it fires every marked file
+    and the directories holding them are synced together, so a burst of
+    writes costs one fsync per file instead of one per write.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._paths: Set[Path] = set()
+        self._timer: Optional[threading.Timer] = None
+
+    def mark(self, path: Path) -> None:
+        with self._lock:
+            self._paths.add(Path(path))
+            if self._timer is None:
+                self._timer = threading.Timer(self.interval, self.sync)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def sync(self) -> None:
+        """Fsync every marked file now."""
+        with self._lock:
+            paths, self._paths = self._paths, set()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        try:
+            for path in paths:
+                fsync_path(path)
+            for directory in {path.parent for path in paths}:
+                fsync_directory(directory)
+        except OSError:
+            LOGGER.exception("Deferred fsync failed")
+
+
+__all__ = [
+    "DeferredSync",
+    "FSYNC_POLICIES",
+    "atomic_write_bytes",
+    "atomic_write_text",
+    "fsync_directory",
+    "fsync_path",
+]
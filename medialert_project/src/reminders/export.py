@@ -0,0 +1,56 @@
+"""Calendar export of planned medication doses."""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Iterable, List
+
+from .models import Medication
+
+ICAL_FORMAT = "%Y%m%dT%H%M%S"
+
+
+def _escape(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def to_icalendar(medications: Iterable[Medication], start: datetime, end: datetime) -> str:
+    """Render every dose due in ``[start, end)`` as an iCalendar document.
+
+    Times are written as floating local times, matching how schedules are
+    stored.
+    """
+
+    stamp = datetime.now(timezone.utc).strftime(ICAL_FORMAT) + "Z"
+    lines: List[str] = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//MediAlert//Medication Reminders//EN",
+    ]
+    for medication in medications:
+        if not medication.schedule:
+            continue
+        summary = _escape(f"{medication.name} ({medication.dosage})")
+        description = _escape(medication.instructions.strip())
+        for due in medication.schedule.occurrences(start, end):
+            lines.extend(
+                [
+                    "BEGIN:VEVENT",
+                    f"UID:{medication.medication_id}-{due:{ICAL_FORMAT}}@medialert",
+                    f"DTSTAMP:{stamp}",
+                    f"DTSTART:{due:{ICAL_FORMAT}}",
+                    f"SUMMARY:{summary}",
+                ]
+            )
+            if description:
+                lines.append(f"DESCRIPTION:{description}")
+            lines.append("END:VEVENT")
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(lines) + "\r\n"
+
+
+__all__ = ["to_icalendar"]
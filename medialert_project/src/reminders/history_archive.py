@@ -0,0 +1,161 @@
+"""Compressed monthly archives for history older than the retention window.
+
+Each month lives in one read-only JSON-lines file under ``<path>.archive/``,
+gzip-compressed by default or zstd when the optional ``zstandard`` package
+is installed. Lines hold the same payloads as the document's ``history``
+array, sorted by history key. Adding entries to a month writes a new file
+next to the old one; the storage document maps each month to its current
+file under :data:`ARCHIVES_KEY`, so rewriting the document commits the
+change and stale files are pruned afterwards.
+"""
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, List, Mapping, Optional
+from uuid import uuid4
+
+from . import models
+from .durability import atomic_write_bytes
+from .history_segments import payload_key
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstd archives are optional
+    zstandard = None  # type: ignore
+
+ARCHIVES_KEY = "history_archives"
+COMPRESSIONS = ("gzip", "zstd")
+
+_SUFFIXES = {"gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+
+
+def month_key(when: datetime) -> str:
+    """Archive month a history key falls into, e.g. ``"2024-05"``."""
+    return f"{when:%Y-%m}"
+
+
+def _month_bounds(month: str) -> tuple:
+    year, number = (int(part) for part in month.split("-"))
+    start = datetime(year, number, 1)
+    following = datetime(year + number // 12, number % 12 + 1, 1)
+    return start, following - timedelta(microseconds=1)
+
+
+class ArchiveMonth:
+    """One archived month, read by streaming the compressed lines."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.month = self.path.name[:7]
+        self.min_key, self.max_key = _month_bounds(self.month)
+
+    def _open(self) -> IO[str]:
+        if self.path.name.endswith(_SUFFIXES["zstd"]):
+            if zstandard is None:
+                raise RuntimeError(f"Reading {self.path} needs the zstandard package")
+            raw = self.path.open("rb")
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+            return io.TextIOWrapper(stream, encoding="utf-8")
+        return gzip.open(self.path, "rt", encoding="utf-8")
+
+    def payloads(self) -> Iterator[Dict[str, Any]]:
+        with self._open() as handle:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+
+    def entries(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        medication_id: Optional[str] = None,
+        status: Optional[str] = None,
+        reverse: bool = False,
+    ) -> Iterator[models.DoseHistoryEntry]:
+        """Matching entries in key order; only months overlapping the range are read."""
+
+        low = models._to_local_naive(start) if start is not None else None
+        high = models._to_local_naive(end) if end is not None else None
+        if (low is not None and self.max_key < low) or (high is not None and self.min_key >= high):
+            return
+        matches = (
+            payload
+            for payload in self.payloads()
+            if (low is None or payload_key(payload) >= low)
+            and (high is None or payload_key(payload) < high)
+            and (medication_id is None or payload["medication_id"] == medication_id)
+            and (status is None or payload["status"] == status)
+        )
+        if reverse:
+            # Compressed streams only read forwards; one month is held at a time.
+            matches = reversed(list(matches))
+        for payload in matches:
+            yield models.DoseHistoryEntry.from_dict(payload)
+
+
+class HistoryArchive:
+    """The archive directory that belongs to one storage document."""
+
+    def __init__(self, directory: Path, compression: str = "gzip") -> None:
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown archive compression: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("zstd archives need the zstandard package")
+        self.directory = Path(directory)
+        self.compression = compression
+
+    def month(self, name: str) -> ArchiveMonth:
+        return ArchiveMonth(self.directory / name)
+
+    def write(
+        self,
+        month: str,
+        payloads: Iterable[Mapping[str, Any]],
+        previous: Optional[str] = None,
+        *,
+        fsync: bool = True,
+    ) -> str:
+        """Write ``month`` with ``payloads`` added to file ``previous``; return the new name."""
+
+        merged: List[Mapping[str, Any]] = list(self.month(previous).payloads()) if previous else []
+        merged.extend(payloads)
+        merged.sort(key=payload_key)
+        lines = "".join(json.dumps(payload, separators=(",", ":")) + "\n" for payload in merged)
+        data = lines.encode("utf-8")
+        if self.compression == "zstd":
+            data = zstandard.ZstdCompressor().compress(data)
+        else:
+            data = gzip.compress(data)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = f"{month}.{uuid4().hex[:12]}{_SUFFIXES[self.compression]}"
+        atomic_write_bytes(self.directory / name, data, fsync=fsync)
+        return name
+
+    def prune(self, keep: Iterable[str] = ()) -> None:
+        """Delete archive files not in ``keep``."""
+
+        keep = set(keep)
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if name.endswith(tuple(_SUFFIXES.values())) and name not in keep:
+                try:
+                    (self.directory / name).unlink()
+                except FileNotFoundError:
+                    pass
+
+
+__all__ = [
+    "ARCHIVES_KEY",
+    "ArchiveMonth",
+    "COMPRESSIONS",
+    "HistoryArchive",
+    "month_key",
+]
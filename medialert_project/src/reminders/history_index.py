@@ -0,0 +1,136 @@
+"""Timestamp-ordered index over dose history entries."""
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Any, Iterable, Iterator, List, Mapping, Optional, Sequence
+
+from .models import DoseHistoryEntry, _from_iso, _to_local_naive
+
+
+def history_key(entry: DoseHistoryEntry) -> datetime:
+    """Time a history entry is filed under: when it was recorded, else acted on."""
+    return entry.timestamp or entry.acted_at
+
+
+def payload_key(payload: Mapping[str, Any]) -> datetime:
+    """:func:`history_key` for a serialised entry, without decoding it."""
+    return _from_iso(payload.get("timestamp")) or _from_iso(payload["acted_at"])
+
+
+def query_payloads(
+    payloads: Sequence[Mapping[str, Any]],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    medication_id: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: Optional[int] = None,
+    reverse: bool = False,
+) -> List[DoseHistoryEntry]:
+    """:meth:`HistoryIndex.query` over serialised entries.
+
+    Only the keys are parsed up front; entries are decoded once they match,
+    so the newest ten of a long history cost ten decodes.
+    """
+
+    if limit is not None and limit <= 0:
+        return []
+    keys = [payload_key(payload) for payload in payloads]
+    order: Sequence[int] = range(len(keys))
+    if any(earlier > later for earlier, later in zip(keys, keys[1:])):
+        # sorted() is stable, so equal keys keep insertion order as in HistoryIndex.
+        order = sorted(order, key=keys.__getitem__)
+        keys = [keys[position] for position in order]
+    low = bisect_left(keys, _to_local_naive(start)) if start is not None else 0
+    high = bisect_left(keys, _to_local_naive(end), low) if end is not None else len(keys)
+    positions = range(high - 1, low - 1, -1) if reverse else range(low, high)
+
+    matches: List[DoseHistoryEntry] = []
+    for position in positions:
+        payload = payloads[order[position]]
+        if medication_id is not None and payload["medication_id"] != medication_id:
+            continue
+        if status is not None and payload["status"] != status:
+            continue
+        matches.append(DoseHistoryEntry.from_dict(payload))
+        if limit is not None and len(matches) >= limit:
+            break
+    return matches
+
+
+class HistoryIndex:
+    """History entries kept sorted by :func:`history_key`.
+
+    Entries with equal keys keep their insertion order. Appends in time order,
+    the normal case, are O(1); range queries bisect the key list, so they cost
+    O(log n) plus the number of entries scanned.
+    """
+
+    def __init__(self, entries: Iterable[DoseHistoryEntry] = ()) -> None:
+        # sorted() is stable and linear on the already-ordered input we expect.
+        self._entries: List[DoseHistoryEntry] = sorted(entries, key=history_key)
+        self._keys: List[datetime] = [history_key(entry) for entry in self._entries]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[DoseHistoryEntry]:
+        return iter(self._entries)
+
+    def append(self, entry: DoseHistoryEntry) -> None:
+        key = history_key(entry)
+        if not self._keys or key >= self._keys[-1]:
+            self._keys.append(key)
+            self._entries.append(entry)
+            return
+        position = bisect_right(self._keys, key)
+        self._keys.insert(position, key)
+        self._entries.insert(position, entry)
+
+    def extend(self, entries: Iterable[DoseHistoryEntry]) -> None:
+        for entry in entries:
+            self.append(entry)
+
+    def query(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        medication_id: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: Optional[int] = None,
+        reverse: bool = False,
+    ) -> List[DoseHistoryEntry]:
+        """Entries filed in ``[start, end)`` matching the given filters.
+
+        Results are in key order, newest first with ``reverse=True``, and
+        ``limit`` caps how many are returned.
+        """
+
+        if limit is not None and limit <= 0:
+            return []
+        low = bisect_left(self._keys, _to_local_naive(start)) if start is not None else 0
+        high = (
+            bisect_left(self._keys, _to_local_naive(end), low)
+            if end is not None
+            else len(self._keys)
+        )
+        positions = range(high - 1, low - 1, -1) if reverse else range(low, high)
+        if medication_id is None and status is None:
+            if limit is not None:
+                positions = positions[:limit]
+            return [self._entries[position] for position in positions]
+
+        matches: List[DoseHistoryEntry] = []
+        for position in positions:
+            entry = self._entries[position]
+            if medication_id is not None and entry.medication_id != medication_id:
+                continue
+            if status is not None and entry.status != status:
+                continue
+            matches.append(entry)
+            if limit is not None and len(matches) >= limit:
+                break
+        return matches
+
+
+__all__ = ["HistoryIndex", "history_key", "payload_key", "query_payloads"]
@@ -0,0 +1,316 @@
+"""Immutable, memory-mapped segments holding sealed dose history.
+
+Once the history in the storage document grows past twice the configured
+segment size, its oldest entries are moved into a segment file under
+``<path>.segments/``. The document lists the segments it owns under
+:data:`SEGMENTS_KEY`, so rewriting the document is what commits a new
+segment; files it does not list are leftovers and never read. A segment is
+laid out as::
+
+    header   magic "RSEG", u16 format version, u16 reserved, u32 record count
+    records  fixed 40-byte history records sorted by history key
+    strings  string table for ids, statuses and notes
+    counts   JSON object of status counts
+    trailer  i64 min key, i64 max key, u64 strings offset, u64 counts offset, "RSGE"
+
+Queries read the trailer first and skip segments outside the requested range
+or without the requested status or medication, then bisect the sorted keys
+and decode matching records one at a time.
+"""
+from __future__ import annotations
+
+import heapq
+import json
+import mmap
+import os
+import struct
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+from uuid import uuid4
+
+from . import models
+from .durability import atomic_write_bytes
+from .history_index import history_key, payload_key
+from .snapshot_codec import (
+    _HISTORY,
+    _NULL,
+    SnapshotFormatError,
+    _micros,
+    _stamp,
+    _StringTable,
+    _StringView,
+)
+
+SEGMENTS_KEY = "history_segments"
+SEGMENT_VERSION = 1
+SEGMENT_SUFFIX = ".seg"
+# Suggested size for applications; about eight months of four daily doses.
+DEFAULT_SEGMENT_SIZE = 1024
+
+_MAGIC = b"RSEG"
+_END = b"RSGE"
+_HEADER = struct.Struct("<4sHHI")
+_TRAILER = struct.Struct("<qqQQ4s")
+# Byte offset of the timestamp field; acted_at follows it.
+_KEY_OFFSET = 24
+_KEYS = struct.Struct("<qq")
+
+
+def encode_segment(payloads: Iterable[Mapping[str, Any]]) -> bytes:
+    """Serialise history payloads into a segment, sorted by history key."""
+
+    entries = sorted(payloads, key=payload_key)
+    if not entries:
+        raise ValueError("A history segment needs at least one entry")
+    strings = _StringTable()
+    counts: Dict[str, int] = {}
+    records = bytearray()
+    keys = []
+    for entry in entries:
+        timestamp = _micros(entry.get("timestamp"))
+        acted_at = _micros(entry.get("acted_at"))
+        keys.append(timestamp if timestamp != _NULL else acted_at)
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        records += _HISTORY.pack(
+            strings(entry["dose_id"]),
+            strings(entry["medication_id"]),
+            strings(entry["status"]),
+            strings(entry.get("notes", "")),
+            _micros(entry["scheduled_time"]),
+            timestamp,
+            acted_at,
+        )
+    header = _HEADER.pack(_MAGIC, SEGMENT_VERSION, 0, len(entries))
+    table = strings.encode()
+    strings_offset = len(header) + len(records)
+    counts_offset = strings_offset + len(table)
+    counts_blob = json.dumps(counts, separators=(",", ":")).encode("utf-8")
+    trailer = _TRAILER.pack(keys[0], keys[-1], strings_offset, counts_offset, _END)
+    return b"".join((header, records, table, counts_blob, trailer))
+
+
+class HistorySegment:
+    """Read-only mmap view of one segment file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        with self.path.open("rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parse()
+        except BaseException:
+            self._map.close()
+            raise
+
+    def _parse(self) -> None:
+        size = len(self._map)
+        if size < _HEADER.size + _TRAILER.size:
+            raise SnapshotFormatError(f"Truncated history segment: {self.path}")
+        magic, version, _, self.count = _HEADER.unpack_from(self._map, 0)
+        low, high, strings_offset, counts_offset, end = _TRAILER.unpack_from(
+            self._map, size - _TRAILER.size
+        )
+        if magic != _MAGIC or end != _END:
+            raise SnapshotFormatError(f"Not a history segment: {self.path}")
+        if version > SEGMENT_VERSION:
+            raise SnapshotFormatError(f"Unsupported segment version: {version}")
+        self.min_key = models._parse_epoch(low)
+        self.max_key = models._parse_epoch(high)
+        self._low, self._high = low, high
+        self._counts_span = (counts_offset, size - _TRAILER.size)
+        self._strings = _StringView(self._map, strings_offset)
+        self._status_counts: Optional[Dict[str, int]] = None
+
+    @property
+    def status_counts(self) -> Dict[str, int]:
+        if self._status_counts is None:
+            start, end = self._counts_span
+            self._status_counts = json.loads(self._map[start:end])
+        return self._status_counts
+
+    def close(self) -> None:
+        self._map.close()
+
+    def _key(self, position: int) -> int:
+        timestamp, acted_at = _KEYS.unpack_from(
+            self._map, _HEADER.size + position * _HISTORY.size + _KEY_OFFSET
+        )
+        return timestamp if timestamp != _NULL else acted_at
+
+    def _bisect(self, key: int) -> int:
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _entry(self, record: Sequence[int]) -> models.DoseHistoryEntry:
+        dose_id, medication_id, status, notes, scheduled, timestamp, acted_at = record
+        return models.DoseHistoryEntry.from_dict(
+            {
+                "dose_id": self._strings[dose_id],
+                "medication_id": self._strings[medication_id],
+                "scheduled_time": scheduled,
+                "timestamp": _stamp(timestamp),
+                "status": self._strings[status],
+                "acted_at": _stamp(acted_at),
+                "notes": self._strings[notes],
+            }
+        )
+
+    def entries(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        medication_id: Optional[str] = None,
+        status: Optional[str] = None,
+        reverse: bool = False,
+    ) -> Iterator[models.DoseHistoryEntry]:
+        """Matching entries in key order, decoded as they are consumed."""
+
+        low = models._to_epoch(start) if start is not None else None
+        high = models._to_epoch(end) if end is not None else None
+        if (low is not None and self._high < low) or (high is not None and self._low >= high):
+            return
+        if status is not None and not self.status_counts.get(status):
+            return
+        wanted_status = self._strings.index(status) if status is not None else None
+        wanted_medication = None
+        if medication_id is not None:
+            wanted_medication = self._strings.index(medication_id)
+            if wanted_medication is None:
+                return
+
+        first = self._bisect(low) if low is not None else 0
+        last = self._bisect(high) if high is not None else self.count
+        positions = range(last - 1, first - 1, -1) if reverse else range(first, last)
+        for position in positions:
+            record = _HISTORY.unpack_from(self._map, _HEADER.size + position * _HISTORY.size)
+            if wanted_medication is not None and record[1] != wanted_medication:
+                continue
+            if wanted_status is not None and record[2] != wanted_status:
+                continue
+            yield self._entry(record)
+
+
+class SegmentStore:
+    """The directory of segment files that belongs to one storage document.
+
+    Segments never change once written, so opened ones stay mapped and are
+    shared by every query until :meth:`close`.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._open: Dict[str, HistorySegment] = {}
+
+    def seal(self, payloads: Iterable[Mapping[str, Any]], *, fsync: bool = True) -> str:
+        """Write ``payloads`` to a new segment and return its name."""
+
+        data = encode_segment(payloads)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = uuid4().hex + SEGMENT_SUFFIX
+        atomic_write_bytes(self.directory / name, data, fsync=fsync)
+        return name
+
+    def segment(self, name: str) -> HistorySegment:
+        with self._lock:
+            segment = self._open.get(name)
+            if segment is None:
+                segment = self._open[name] = HistorySegment(self.directory / name)
+            return segment
+
+    def prune(self, keep: Iterable[str] = ()) -> None:
+        """Delete segment files not in ``keep``.
+
+        Mappings are not closed here, so queries still iterating over a
+        dropped segment finish normally; the file goes once they let go.
+        """
+
+        keep = set(keep)
+        with self._lock:
+            for name in list(self._open):
+                if name not in keep:
+                    del self._open[name]
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if name.endswith(SEGMENT_SUFFIX) and name not in keep:
+                try:
+                    (self.directory / name).unlink()
+                except FileNotFoundError:
+                    pass
+
+    def close(self) -> None:
+        with self._lock:
+            for segment in self._open.values():
+                segment.close()
+            self._open.clear()
+
+
+def merge_history(
+    segments: Sequence[Any],
+    tail: Iterable[models.DoseHistoryEntry],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    medication_id: Optional[str] = None,
+    status: Optional[str] = None,
+    reverse: bool = False,
+) -> Iterator[models.DoseHistoryEntry]:
+    """Merge sealed segments with the already filtered, key-ordered ``tail``.
+
+    ``segments`` are given oldest first and may be anything with ``min_key``,
+    ``max_key`` and an ``entries()`` generator like :class:`HistorySegment`,
+    such as archived months. A segment is only opened once its bound could
+    reach the next entry to yield, so reading the newest few entries never
+    touches older segments.
+    """
+
+    sign = -1 if reverse else 1
+    heap: List[tuple] = []
+
+    def push(priority: int, source: Iterator[models.DoseHistoryEntry]) -> None:
+        for entry in source:
+            key = sign * models._to_epoch(history_key(entry))
+            # One head per source, so priorities never tie and entries are never compared.
+            heapq.heappush(heap, (key, priority, entry, source))
+            return
+
+    # For equal keys, older sources come first going forward and last in reverse.
+    waiting = []
+    for index, segment in enumerate(segments):
+        bound = models._to_epoch(segment.max_key if reverse else segment.min_key)
+        waiting.append((sign * bound, sign * index, segment))
+    waiting.sort(key=lambda item: item[0])
+    push(sign * len(segments), iter(tail))
+    position = 0
+    while True:
+        while position < len(waiting) and (not heap or waiting[position][0] <= heap[0][0]):
+            _, priority, segment = waiting[position]
+            push(priority, segment.entries(start, end, medication_id, status, reverse))
+            position += 1
+        if not heap:
+            return
+        _, priority, entry, source = heapq.heappop(heap)
+        yield entry
+        push(priority, source)
+
+
+__all__ = [
+    "DEFAULT_SEGMENT_SIZE",
+    "HistorySegment",
+    "SEGMENTS_KEY",
+    "SEGMENT_VERSION",
+    "SegmentStore",
+    "encode_segment",
+    "merge_history",
+    "payload_key",
+]
@@ -0,0 +1,179 @@
+"""Append-only mutation journal used by the journaled storage mode."""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from . import aggregates, rollups
+
+LOGGER = logging.getLogger(__name__)
+
+UPSERT_MEDICATION = "upsert_medication"
+REPLACE_MEDICATIONS = "replace_medications"
+UPSERT_UPCOMING_DOSE = "upsert_upcoming_dose"
+REPLACE_UPCOMING_DOSES = "replace_upcoming_doses"
+REMOVE_UPCOMING_DOSE = "remove_upcoming_dose"
+APPEND_HISTORY = "append_history"
+EXTEND_HISTORY = "extend_history"
+PUT_ROLLUPS = "put_rollups"
+
+SEQ_KEY = "journal_seq"
+
+
+def _upsert(items: List[Dict[str, Any]], key: str, payload: Dict[str, Any]) -> None:
+    for index, item in enumerate(items):
+        if item.get(key) == payload[key]:
+            items[index] = payload
+            return
+    items.append(payload)
+
+
+@dataclass
+class MutationRecord:
+    """A single typed change to the reminder state document."""
+
+    op: str
+    payload: Any = None
+    seq: int = 0
+
+    def apply(self, state: Dict[str, Any]) -> None:
+        """Apply the mutation to an in-memory state document."""
+
+        if self.op == UPSERT_MEDICATION:
+            _upsert(state.setdefault("medications", []), "medication_id", self.payload)
+        elif self.op == REPLACE_MEDICATIONS:
+            state["medications"] = list(self.payload)
+        elif self.op == UPSERT_UPCOMING_DOSE:
+            _upsert(state.setdefault("upcoming_doses", []), "dose_id", self.payload)
+        elif self.op == REPLACE_UPCOMING_DOSES:
+            state["upcoming_doses"] = list(self.payload)
+        elif self.op == REMOVE_UPCOMING_DOSE:
+            state["upcoming_doses"] = [
+                item
+                for item in state.get("upcoming_doses", [])
+                if item.get("dose_id") != self.payload
+            ]
+        elif self.op == APPEND_HISTORY:
+            state.setdefault("history", []).append(self.payload)
+            aggregates.update_state(state, [self.payload])
+            rollups.invalidate_days(state.get(rollups.ROLLUPS_KEY), [self.payload])
+        elif self.op == EXTEND_HISTORY:
+            state.setdefault("history", []).extend(self.payload)
+            aggregates.update_state(state, self.payload)
+            rollups.invalidate_days(state.get(rollups.ROLLUPS_KEY), self.payload)
+        elif self.op == PUT_ROLLUPS:
+            stored = state.setdefault(rollups.ROLLUPS_KEY, {})
+            stored.update((item["day"], item) for item in self.payload)
+        else:
+            raise ValueError(f"Unknown journal operation: {self.op}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"seq": self.seq, "op": self.op, "payload": self.payload}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MutationRecord":
+        return cls(op=data["op"], payload=data.get("payload"), seq=int(data.get("seq", 0)))
+
+
+class StorageJournal:
+    """JSON-lines log of :class:`MutationRecord` entries next to a snapshot file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self.record_count = 0
+        # Byte offset up to which this process has read or written records.
+        self.offset = 0
+
+    def append(self, records: List[MutationRecord], fsync: bool = False) -> None:
+        """Append records to the end of the journal in a single write."""
+
+        if not records:
+            return
+        lines = "".join(
+            json.dumps(record.to_dict(), separators=(",", ":")) + "\n" for record in records
+        )
+        with self._lock:
+            with self.path.open("ab") as handle:
+                handle.write(lines.encode("utf-8"))
+                self.offset = handle.tell()
+                if fsync:
+                    handle.flush()
+                    os.fsync(handle.fileno())
+            self.record_count += len(records)
+
+    def replay(self, after_seq: int = 0) -> Iterator[MutationRecord]:
+        """Yield records with a sequence number greater than ``after_seq``.
+
+        A torn trailing line left behind by a crash mid-append is discarded and
+        the file is truncated back to the last complete record.
+        """
+
+        with self._lock:
+            self.record_count = 0
+            if not self.path.exists():
+                return
+            good_offset = 0
+            torn_offset: Optional[int] = None
+            with self.path.open("rb") as handle:
+                for raw in handle:
+                    try:
+                        if not raw.endswith(b"\n"):
+                            raise ValueError("incomplete journal line")
+                        record = MutationRecord.from_dict(json.loads(raw))
+                    except (ValueError, KeyError):
+                        torn_offset = good_offset
+                        break
+                    good_offset += len(raw)
+                    self.record_count += 1
+                    if record.seq > after_seq:
+                        yield record
+            self.offset = good_offset
+            if torn_offset is not None:
+                LOGGER.warning("Discarding torn journal tail in %s", self.path)
+                with self.path.open("r+b") as handle:
+                    handle.truncate(torn_offset)
+
+    def read_tail(self) -> Optional[List[MutationRecord]]:
+        """Records appended by other writers since this journal last read or wrote.
+
+        Returns ``None`` when the file shrank below the known offset, i.e. it
+        was truncated by a compaction and must be replayed from the snapshot.
+        """
+
+        with self._lock:
+            try:
+                size = os.path.getsize(self.path)
+            except FileNotFoundError:
+                size = 0
+            if size < self.offset:
+                return None
+            if size == self.offset:
+                return []
+            records: List[MutationRecord] = []
+            with self.path.open("rb") as handle:
+                handle.seek(self.offset)
+                for raw in handle:
+                    if not raw.endswith(b"\n"):
+                        break
+                    records.append(MutationRecord.from_dict(json.loads(raw)))
+                    self.offset += len(raw)
+            self.record_count += len(records)
+            return records
+
+    def truncate(self) -> None:
+        """Drop every record, typically right after a snapshot was written."""
+
+        with self._lock:
+            with self.path.open("w", encoding="utf-8"):
+                pass
+            self.record_count = 0
+            self.offset = 0
+
+
+__all__ = ["MutationRecord", "StorageJournal", "SEQ_KEY"]
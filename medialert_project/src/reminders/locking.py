@@ -0,0 +1,99 @@
+"""Advisory file locks that coordinate storage access across processes."""
+from __future__ import annotations
+
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no fcntl
+    fcntl = None  # type: ignore
+
+# The version stamp is written as a fixed-width number so a reader never sees
+# a half-written value next to stale digits.
+_STAMP_WIDTH = 20
+
+
+class FileLock:
+    """Reentrant ``flock`` on a sidecar file, shared by threads and processes.
+
+    Exclusive holders may nest shared acquisitions; asking for an exclusive
+    lock while only holding a shared one raises, because ``flock`` upgrades
+    are not atomic. The file also carries the storage version, so other
+    processes can check for changes without reading the data itself. Without
+    ``fcntl`` (e.g. on Windows) only threads in this process are serialised.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._thread_lock = threading.RLock()
+        self._handle: Optional[IO[bytes]] = None
+        self._depth = 0
+        self._exclusive = False
+
+    @property
+    def enabled(self) -> bool:
+        return fcntl is not None
+
+    @contextmanager
+    def acquire(self, shared: bool = False) -> Iterator[None]:
+        with self._thread_lock:
+            if self._depth:
+                if not shared and not self._exclusive:
+                    raise RuntimeError("Cannot upgrade a shared storage lock to exclusive")
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+                return
+            handle = self._open()
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            self._depth, self._exclusive = 1, not shared
+            try:
+                yield
+            finally:
+                self._depth, self._exclusive = 0, False
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+    def read_version(self) -> Optional[int]:
+        """The last stamped version, ``None`` when nothing was stamped yet."""
+        try:
+            with self.path.open("rb") as handle:
+                raw = handle.read(_STAMP_WIDTH)
+        except FileNotFoundError:
+            return None
+        try:
+            return int(raw) if len(raw) == _STAMP_WIDTH else None
+        except ValueError:
+            return None
+
+    def write_version(self, version: int) -> None:
+        """Stamp ``version``; call while holding the exclusive lock."""
+        # Not os.pwrite, which Windows lacks; the lock keeps the seek safe.
+        handle = self._open()
+        handle.seek(0)
+        handle.write(str(version).zfill(_STAMP_WIDTH).encode("ascii"))
+        handle.flush()
+
+    def close(self) -> None:
+        with self._thread_lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+
+    def _open(self) -> IO[bytes]:
+        if self._handle is None or self._handle.closed:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Not O_APPEND: the version stamp is rewritten in place at offset 0.
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._handle = os.fdopen(fd, "r+b")
+        return self._handle
+
+
+__all__ = ["FileLock"]
@@ -0,0 +1,111 @@
+"""Copy reminder data between storage engines.
+
+Usage::
+
+    python -m src.reminders.migrate data/reminders.json sqlite:///data/reminders.db
+    python -m src.reminders.migrate data/reminders.json data/reminders.rbin
+
+Copies between two snapshot files (``.json``/``.rbin``) convert the file
+losslessly, including aggregates and rollups.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Union
+
+from .durability import atomic_write_bytes
+from .history_archive import ARCHIVES_KEY
+from .history_segments import SEGMENTS_KEY
+from .snapshot_codec import codec_for_path
+from .storage import SQLITE_SUFFIXES, ReminderStorage, StorageEngine, open_storage
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class MigrationSummary:
+    """Number of records copied for each collection."""
+
+    medications: int
+    upcoming_doses: int
+    history: int
+
+
+def copy_storage(source: StorageEngine, target: StorageEngine) -> MigrationSummary:
+    """Replace the contents of ``target`` with everything stored in ``source``."""
+
+    medications = source.load_medications()
+    doses = source.load_upcoming_doses()
+    history = source.load_history()
+
+    target.reset()
+    target.save_medications(medications)
+    target.save_upcoming_doses(doses)
+    target.append_history_many(history)
+
+    summary = MigrationSummary(
+        medications=len(medications),
+        upcoming_doses=len(doses),
+        history=len(history),
+    )
+    LOGGER.info(
+        "Copied %s medications, %s upcoming doses and %s history entries",
+        summary.medications,
+        summary.upcoming_doses,
+        summary.history,
+    )
+    return summary
+
+
+def convert_snapshot(source: Union[str, Path], target: Union[str, Path]) -> None:
+    """Rewrite a :class:`ReminderStorage` snapshot in the encoding of ``target``.
+
+    Encodings follow the file extensions, so this converts JSON to ``.rbin``
+    and back. A journal next to ``source`` is compacted into it first, and
+    sealed history segments and archives are copied along. Run it while no
+    other process writes to either file.
+    """
+
+    source, target = Path(source), Path(target)
+    if source.with_name(source.name + ".journal").exists():
+        ReminderStorage(source, journal=True).compact()
+    state = codec_for_path(source).load(source)
+    sidecars = (
+        (".segments", state.get(SEGMENTS_KEY, [])),
+        (".archive", state.get(ARCHIVES_KEY, {}).values()),
+    )
+    for suffix, names in sidecars:
+        directory = target.with_name(target.name + suffix)
+        for name in names:
+            directory.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(source.with_name(source.name + suffix) / name, directory / name)
+    atomic_write_bytes(target, codec_for_path(target).dumps(state))
+    LOGGER.info("Converted %s to %s", source, target)
+
+
+def _is_snapshot(location: str) -> bool:
+    return "://" not in location and Path(location).suffix.lower() not in SQLITE_SUFFIXES
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="Path or URL of the storage to read from")
+    parser.add_argument("target", help="Path or URL of the storage to write to")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    if _is_snapshot(args.source) and _is_snapshot(args.target):
+        convert_snapshot(args.source, args.target)
+        return
+    copy_storage(open_storage(args.source), open_storage(args.target))
+
+
+if __name__ == "__main__":
+    main()
+
+
+__all__ = ["MigrationSummary", "convert_snapshot", "copy_storage"]
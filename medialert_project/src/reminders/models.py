@@ -1,30 +1,62 @@
 """Domain models for the medication reminder service."""
 from __future__ import annotations
 
+import sys
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass, field, asdict
 from datetime import datetime, time, timedelta
-from typing import Any, Dict, Iterable, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
 from uuid import uuid4
 
+try:
+    import numpy as np
+except Exception:  # pragma: no cover - NumPy is optional for bulk planning
+    np = None  # type: ignore
+
 ISO_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _to_local_naive(dt: datetime) -> datetime:
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(tz=None).replace(tzinfo=None)
+    return dt
 
 
 def _to_iso(dt: Optional[datetime]) -> Optional[str]:
     if dt is None:
         return None
-    if dt.tzinfo is not None:
-        dt = dt.astimezone(tz=None).replace(tzinfo=None)
-    return dt.strftime(ISO_FORMAT)
+    # Same layout as ISO_FORMAT without going through strftime.
+    return _to_local_naive(dt).isoformat(timespec="microseconds") + "Z"
 
 
-def _from_iso(value: Optional[str]) -> Optional[datetime]:
+def _to_epoch(dt: Optional[datetime]) -> Optional[int]:
+    """Microseconds between 1970-01-01 and the naive local wall-clock time."""
+    if dt is None:
+        return None
+    return (_to_local_naive(dt) - EPOCH) // _MICROSECOND
+
+
+@lru_cache(maxsize=65536)
+def _parse_iso(value: str) -> datetime:
+    # fromisoformat handles ISO_FORMAT and values stored without microseconds;
+    # datetimes are immutable, so repeated strings can share one instance.
+    return datetime.fromisoformat(value[:-1] if value.endswith("Z") else value)
+
+
+@lru_cache(maxsize=65536)
+def _parse_epoch(value: int) -> datetime:
+    return EPOCH + timedelta(0, 0, value)
+
+
+def _from_iso(value: Optional[Any]) -> Optional[datetime]:
     if value is None:
         return None
-    try:
-        return datetime.strptime(value, ISO_FORMAT)
-    except ValueError:
-        # Support datetimes stored without microseconds
-        return datetime.fromisoformat(value.replace("Z", ""))
+    if isinstance(value, int):
+        return _parse_epoch(value)
+    return _parse_iso(value)
 
 
 def _time_to_str(value: time) -> str:
@@ -35,6 +67,13 @@ def _time_from_str(value: str) -> time:
     return datetime.strptime(value, "%H:%M").time()
 
 
+def _micros_of_day(value: Any) -> int:
+    """Microseconds since midnight for a ``time`` or ``datetime``."""
+    return (
+        (value.hour * 60 + value.minute) * 60 + value.second
+    ) * 1_000_000 + value.microsecond
+
+
 @dataclass
 class DoseSchedule:
     """Defines how a medication repeats over time."""
@@ -44,22 +83,38 @@ class DoseSchedule:
     repeat_interval: Optional[timedelta] = None
     times_of_day: Optional[List[time]] = None
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        object.__setattr__(self, name, value)
+        if name == "times_of_day":
+            # Drop the compiled offsets; reassign the list rather than
+            # mutating it in place so this invalidation runs.
+            object.__setattr__(self, "_day_offsets_cache", None)
+
+    def _day_offsets(self) -> List[int]:
+        """Sorted, de-duplicated ``times_of_day`` as microseconds since midnight."""
+        offsets = self.__dict__.get("_day_offsets_cache")
+        if offsets is None:
+            offsets = sorted({_micros_of_day(value) for value in self.times_of_day or ()})
+            object.__setattr__(self, "_day_offsets_cache", offsets)
+        return offsets
+
     def next_due(self, after: datetime) -> Optional[datetime]:
         """Return the next scheduled time after the provided datetime."""
         if self.times_of_day:
-            # Handle daily specific times.
-            sorted_times = sorted(self.times_of_day)
-            search_date = after.date()
-            # Search forward for up to two weeks which is ample for daily schedules.
-            for _ in range(14):
-                for scheduled_time in sorted_times:
-                    candidate = datetime.combine(search_date, scheduled_time)
-                    if candidate < self.start_time:
-                        continue
-                    if candidate > after:
-                        return candidate
-                search_date = search_date + timedelta(days=1)
-            return None
+            # Daily specific times: bisect the sorted offsets on the first
+            # eligible day, which is the start date when ``after`` precedes it.
+            offsets = self._day_offsets()
+            if after < self.start_time:
+                bound = self.start_time
+                index = bisect_left(offsets, _micros_of_day(bound))
+            else:
+                bound = after
+                index = bisect_right(offsets, _micros_of_day(bound))
+            day = datetime.combine(bound.date(), time.min)
+            if index == len(offsets):
+                day += timedelta(days=1)
+                index = 0
+            return day + timedelta(microseconds=offsets[index])
 
         if not self.repeat_interval:
             # One-off schedule
@@ -69,13 +124,103 @@ class DoseSchedule:
             return self.start_time
 
         elapsed = after - self.start_time
-        intervals = int(elapsed / self.repeat_interval) + 1
+        intervals = elapsed // self.repeat_interval + 1
         return self.start_time + self.repeat_interval * intervals
 
-    def to_dict(self) -> Dict[str, Any]:
+    def next_due_many(self, afters: Sequence[datetime]) -> List[Optional[datetime]]:
+        """Vectorised :meth:`next_due` for many reference times at once."""
+        if np is None or not len(afters):
+            return [self.next_due(after) for after in afters]
+
+        values = np.array(afters, dtype="datetime64[us]")
+        start = np.datetime64(self.start_time, "us")
+        before_start = values < start
+
+        if self.times_of_day:
+            offsets = np.array(self._day_offsets(), dtype="int64")
+            bound = np.where(before_start, start, values)
+            days = bound.astype("datetime64[D]")
+            micros = (bound - days).astype("int64")
+            index = np.where(
+                before_start,
+                np.searchsorted(offsets, micros, side="left"),
+                np.searchsorted(offsets, micros, side="right"),
+            )
+            wrapped = index == len(offsets)
+            days = days + wrapped.astype("timedelta64[D]")
+            index = np.where(wrapped, 0, index)
+            result = days.astype("datetime64[us]") + offsets[index].astype("timedelta64[us]")
+        elif self.repeat_interval:
+            step = self.repeat_interval // timedelta(microseconds=1)
+            elapsed = (values - start).astype("int64")
+            following = start + ((elapsed // step + 1) * step).astype("timedelta64[us]")
+            result = np.where(before_start, start, following)
+        else:
+            result = np.where(before_start, start, np.datetime64("NaT", "us"))
+        return result.tolist()
+
+    def occurrences(self, start: datetime, end: datetime) -> Iterator[datetime]:
+        """Lazily yield every due time in the half-open window ``[start, end)``."""
+        if self.times_of_day:
+            offsets = self._day_offsets()
+            first = max(start, self.start_time)
+            day = datetime.combine(first.date(), time.min)
+            index = bisect_left(offsets, _micros_of_day(first))
+            while True:
+                if index == len(offsets):
+                    day += timedelta(days=1)
+                    index = 0
+                candidate = day + timedelta(microseconds=offsets[index])
+                if candidate >= end:
+                    return
+                yield candidate
+                index += 1
+
+        if not self.repeat_interval:
+            if start <= self.start_time < end:
+                yield self.start_time
+            return
+
+        candidate = self.start_time
+        if start > candidate:
+            # Ceiling division: the first repetition at or after ``start``.
+            candidate += self.repeat_interval * -((self.start_time - start) // self.repeat_interval)
+        while candidate < end:
+            yield candidate
+            candidate += self.repeat_interval
+
+    def occurrence_array(self, start: datetime, end: datetime) -> "np.ndarray":
+        """Every due time in ``[start, end)`` as a sorted ``datetime64[us]`` array."""
+        if np is None:
+            raise RuntimeError("NumPy is required for occurrence_array")
+        lower = np.datetime64(max(start, self.start_time), "us")
+        upper = np.datetime64(end, "us")
+        if lower >= upper:
+            return np.array([], dtype="datetime64[us]")
+
+        if self.times_of_day:
+            offsets = np.array(self._day_offsets(), dtype="int64").astype("timedelta64[us]")
+            days = np.arange(
+                lower.astype("datetime64[D]"),
+                upper.astype("datetime64[D]") + np.timedelta64(1, "D"),
+                dtype="datetime64[D]",
+            )
+            grid = (days.astype("datetime64[us]")[:, None] + offsets[None, :]).ravel()
+            return grid[(grid >= lower) & (grid < upper)]
+
+        first = np.datetime64(self.start_time, "us")
+        if not self.repeat_interval:
+            keep = start <= self.start_time
+            return np.array([first] if keep else [], dtype="datetime64[us]")
+        step = np.timedelta64(self.repeat_interval // timedelta(microseconds=1), "us")
+        skipped = -((first - lower) // step)
+        return np.arange(first + skipped * step, upper, step, dtype="datetime64[us]")
+
+    def to_dict(self, epoch: bool = False) -> Dict[str, Any]:
+        encode = _to_epoch if epoch else _to_iso
         payload: Dict[str, Any] = {
             "medication_id": self.medication_id,
-            "start_time": _to_iso(self.start_time),
+            "start_time": encode(self.start_time),
             "repeat_interval_minutes": (
                 int(self.repeat_interval.total_seconds() // 60)
                 if self.repeat_interval
@@ -114,10 +259,10 @@ class Medication:
     schedule: Optional[DoseSchedule] = None
     tags: List[str] = field(default_factory=list)
 
-    def to_dict(self) -> Dict[str, Any]:
+    def to_dict(self, epoch: bool = False) -> Dict[str, Any]:
         payload = asdict(self)
         if self.schedule:
-            payload["schedule"] = self.schedule.to_dict()
+            payload["schedule"] = self.schedule.to_dict(epoch)
         else:
             payload["schedule"] = None
         return payload
@@ -136,7 +281,7 @@ class Medication:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class UpcomingDose:
     """Represents a scheduled dose that is pending or recently actioned."""
 
@@ -151,15 +296,16 @@ class UpcomingDose:
     def effective_due_time(self) -> datetime:
         return self.snoozed_until or self.scheduled_time
 
-    def to_dict(self) -> Dict[str, Any]:
+    def to_dict(self, epoch: bool = False) -> Dict[str, Any]:
+        encode = _to_epoch if epoch else _to_iso
         return {
             "dose_id": self.dose_id,
             "medication_id": self.medication_id,
-            "scheduled_time": _to_iso(self.scheduled_time),
+            "scheduled_time": encode(self.scheduled_time),
             "status": self.status,
-            "snoozed_until": _to_iso(self.snoozed_until),
+            "snoozed_until": encode(self.snoozed_until),
             "notified": self.notified,
-            "taken_at": _to_iso(self.taken_at),
+            "taken_at": encode(self.taken_at),
         }
 
     @classmethod
@@ -183,9 +329,13 @@ class UpcomingDose:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class DoseHistoryEntry:
-    """Historical log of doses that have been taken, missed, or snoozed."""
+    """Historical log of doses that have been taken, missed, or snoozed.
+
+    Slotted, with interned medication ids and statuses, because whole
+    histories are materialised at once.
+    """
 
     dose_id: str
     medication_id: str
@@ -195,14 +345,15 @@ class DoseHistoryEntry:
     timestamp: Optional[datetime] = None
     notes: str = ""
 
-    def to_dict(self) -> Dict[str, Any]:
+    def to_dict(self, epoch: bool = False) -> Dict[str, Any]:
+        encode = _to_epoch if epoch else _to_iso
         return {
             "dose_id": self.dose_id,
             "medication_id": self.medication_id,
-            "scheduled_time": _to_iso(self.scheduled_time),
-            "timestamp": _to_iso(self.timestamp),
+            "scheduled_time": encode(self.scheduled_time),
+            "timestamp": encode(self.timestamp),
             "status": self.status,
-            "acted_at": _to_iso(self.acted_at),
+            "acted_at": encode(self.acted_at),
             "notes": self.notes,
         }
 
@@ -213,17 +364,17 @@ class DoseHistoryEntry:
             timestamp = _from_iso(data.get("acted_at"))
         return cls(
             dose_id=data["dose_id"],
-            medication_id=data["medication_id"],
+            medication_id=sys.intern(data["medication_id"]),
             scheduled_time=_from_iso(data["scheduled_time"]),
             timestamp=timestamp,
-            status=data["status"],
+            status=sys.intern(data["status"]),
             acted_at=_from_iso(data["acted_at"]),
-            notes=data.get("notes", ""),
+            notes=sys.intern(data.get("notes", "")),
         )
 
 
-def serialize_collection(items: Iterable[Any]) -> List[Dict[str, Any]]:
-    return [item.to_dict() for item in items]
+def serialize_collection(items: Iterable[Any], epoch: bool = False) -> List[Dict[str, Any]]:
+    return [item.to_dict(epoch) for item in items]
 
 
 def deserialize_medications(payload: Iterable[Dict[str, Any]]) -> List[Medication]:
@@ -0,0 +1,241 @@
+"""Host reminder scheduling for many patients in a single process."""
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from .analytics import AlertActionLogger
+from .models import UpcomingDose
+from .scheduler import DueHandler, ReminderScheduler
+from .storage import StorageEngine
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class TenantStats:
+    """Per-tenant reminder counters."""
+
+    queued: int = 0
+    fired: int = 0
+
+
+class _TenantScheduler(ReminderScheduler):
+    """Per-tenant transition engine feeding the shared due-time queue."""
+
+    def __init__(
+        self,
+        owner: "MultiTenantScheduler",
+        tenant_id: str,
+        storage: StorageEngine,
+        due_handler: Optional[DueHandler],
+        action_logger: Optional[AlertActionLogger],
+    ) -> None:
+        super().__init__(storage, due_handler=due_handler, action_logger=action_logger)
+        self._owner = owner
+        self.tenant_id = tenant_id
+
+    def _dose_changed(self, dose: UpcomingDose) -> None:
+        self._owner._dose_changed(self.tenant_id, dose)
+
+
+class _Tenant:
+    def __init__(self, scheduler: _TenantScheduler) -> None:
+        self.scheduler = scheduler
+        self.queued: Dict[str, datetime] = {}
+        self.fired = 0
+        self.last_sync = float("-inf")
+        self.syncing = False
+
+
+class MultiTenantScheduler:
+    """Schedule reminders for many storages behind one due-time queue.
+
+    A single dispatcher thread sleeps until the earliest due dose across all
+    tenants and hands due doses to a bounded worker pool, which also performs
+    storage reads. Each tenant keeps its own :class:`ReminderScheduler` for
+    dose transitions, so due handlers and action loggers never cross tenants.
+    Tenants are resynced from storage every ``resync_interval`` seconds to pick
+    up changes made outside this scheduler.
+    """
+
+    def __init__(self, max_workers: int = 8, resync_interval: float = 300.0) -> None:
+        self.max_workers = max_workers
+        self.resync_interval = resync_interval
+        self._tenants: Dict[str, _Tenant] = {}
+        self._queue: List[Tuple[datetime, int, str, str]] = []
+        self._counter = itertools.count()
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Created by start(): a shut-down executor cannot take new work.
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    # Tenant management --------------------------------------------------
+
+    def add_tenant(
+        self,
+        tenant_id: str,
+        storage: StorageEngine,
+        due_handler: Optional[DueHandler] = None,
+        action_logger: Optional[AlertActionLogger] = None,
+    ) -> ReminderScheduler:
+        """Register a tenant and return the scheduler used for its transitions."""
+
+        scheduler = _TenantScheduler(self, tenant_id, storage, due_handler, action_logger)
+        with self._lock:
+            if tenant_id in self._tenants:
+                raise ValueError(f"Tenant already registered: {tenant_id}")
+            self._tenants[tenant_id] = _Tenant(scheduler)
+        self._wakeup.set()
+        return scheduler
+
+    def remove_tenant(self, tenant_id: str) -> None:
+        with self._lock:
+            self._tenants.pop(tenant_id, None)
+
+    def tenant(self, tenant_id: str) -> ReminderScheduler:
+        with self._lock:
+            return self._tenants[tenant_id].scheduler
+
+    def tenant_stats(self, tenant_id: str) -> TenantStats:
+        with self._lock:
+            tenant = self._tenants[tenant_id]
+            return TenantStats(queued=len(tenant.queued), fired=tenant.fired)
+
+    def stats(self) -> Dict[str, TenantStats]:
+        with self._lock:
+            return {tenant_id: self.tenant_stats(tenant_id) for tenant_id in self._tenants}
+
+    # Lifecycle ----------------------------------------------------------
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="Tenant"
+        )
+        self._thread = threading.Thread(
+            target=self._run, args=(self._pool,), name="MultiTenantScheduler", daemon=True
+        )
+        self._thread.start()
+        LOGGER.info("Multi-tenant scheduler started")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        LOGGER.info("Multi-tenant scheduler stopped")
+
+    # Queue helpers ------------------------------------------------------
+
+    def _dose_changed(self, tenant_id: str, dose: UpcomingDose) -> None:
+        with self._lock:
+            tenant = self._tenants.get(tenant_id)
+            if tenant is None:
+                return
+            if dose.status != "pending" or dose.notified:
+                tenant.queued.pop(dose.dose_id, None)
+                return
+            due_time = dose.effective_due_time()
+            if tenant.queued.get(dose.dose_id) == due_time:
+                return
+            tenant.queued[dose.dose_id] = due_time
+            heapq.heappush(self._queue, (due_time, next(self._counter), tenant_id, dose.dose_id))
+        self._wakeup.set()
+
+    def _resync_tenant(self, tenant_id: str) -> None:
+        with self._lock:
+            tenant = self._tenants.get(tenant_id)
+        if tenant is None:
+            return
+        try:
+            doses = tenant.scheduler.storage.load_upcoming_doses()
+        except Exception:  # pragma: no cover - defensive, keep other tenants alive
+            LOGGER.exception("Failed to resync tenant %s", tenant_id)
+            doses = None
+        with self._lock:
+            tenant.syncing = False
+            tenant.last_sync = time.monotonic()
+            if doses is None:
+                return
+            tenant.queued.clear()
+        for dose in doses:
+            self._dose_changed(tenant_id, dose)
+
+    def _fire_entry(self, tenant_id: str, dose_id: str, due_time: datetime) -> None:
+        with self._lock:
+            tenant = self._tenants.get(tenant_id)
+        if tenant is None:
+            return
+        scheduler = tenant.scheduler
+        try:
+            dose = scheduler.storage.get_upcoming_dose(dose_id)
+            if dose is None or dose.status != "pending" or dose.notified:
+                return
+            if dose.effective_due_time() != due_time:
+                return
+            medication = scheduler.storage.get_medication(dose.medication_id)
+            if not medication:
+                return
+            scheduler._fire(dose, medication)
+            with self._lock:
+                tenant.fired += 1
+        except Exception:
+            LOGGER.exception("Failed to deliver dose %s for tenant %s", dose_id, tenant_id)
+
+    def _pop_due(self, now: datetime) -> List[Tuple[str, str, datetime]]:
+        due: List[Tuple[str, str, datetime]] = []
+        with self._lock:
+            while self._queue and self._queue[0][0] <= now:
+                due_time, _, tenant_id, dose_id = heapq.heappop(self._queue)
+                tenant = self._tenants.get(tenant_id)
+                # Stale entries: tenant removed, dose resolved or rescheduled.
+                if tenant is None or tenant.queued.get(dose_id) != due_time:
+                    continue
+                del tenant.queued[dose_id]
+                due.append((tenant_id, dose_id, due_time))
+        return due
+
+    def _tenants_to_resync(self) -> List[str]:
+        threshold = time.monotonic() - self.resync_interval
+        with self._lock:
+            stale = [
+                tenant_id
+                for tenant_id, tenant in self._tenants.items()
+                if not tenant.syncing and tenant.last_sync <= threshold
+            ]
+            for tenant_id in stale:
+                self._tenants[tenant_id].syncing = True
+        return stale
+
+    def _run(self, pool: ThreadPoolExecutor) -> None:
+        while not self._stop_event.is_set():
+            for tenant_id in self._tenants_to_resync():
+                pool.submit(self._resync_tenant, tenant_id)
+            for tenant_id, dose_id, due_time in self._pop_due(datetime.now()):
+                pool.submit(self._fire_entry, tenant_id, dose_id, due_time)
+
+            timeout = self.resync_interval
+            with self._lock:
+                if self._queue:
+                    until_due = (self._queue[0][0] - datetime.now()).total_seconds()
+                    timeout = min(max(until_due, 0.0), timeout)
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+
+__all__ = ["MultiTenantScheduler", "TenantStats"]
@@ -0,0 +1,129 @@
+"""How late doses are taken, per medication and time of day."""
+from __future__ import annotations
+
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional
+
+from .aggregates import status_key
+from .models import DoseHistoryEntry
+from .sketch import QuantileSketch
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .storage import StorageEngine
+
+# Histogram edges in minutes late; doses taken early land in the first bin.
+LATENESS_EDGES = (0, 5, 15, 30, 60, 120)
+HISTOGRAM_LABELS = ("early", "0-5", "5-15", "15-30", "30-60", "60-120", "120+")
+
+
+def lateness_minutes(entry: DoseHistoryEntry) -> float:
+    return (entry.acted_at - entry.scheduled_time).total_seconds() / 60.0
+
+
+def _grid(value: Any) -> List[List[Any]]:
+    return [[value] * 24 for _ in range(7)]
+
+
+@dataclass
+class LatenessProfile:
+    """Bounded-memory lateness statistics for a stream of taken doses.
+
+    Percentiles come from a :class:`QuantileSketch`. The histogram uses
+    :data:`LATENESS_EDGES` and the heatmap is a weekday x hour grid keyed
+    by scheduled time, so the footprint is fixed however long the history.
+    """
+
+    sketch: QuantileSketch = field(default_factory=QuantileSketch)
+    histogram: List[int] = field(default_factory=lambda: [0] * len(HISTOGRAM_LABELS))
+    heatmap_total: List[List[float]] = field(default_factory=lambda: _grid(0.0))
+    heatmap_count: List[List[int]] = field(default_factory=lambda: _grid(0))
+
+    def add(self, scheduled_time: datetime, minutes: float) -> None:
+        self.sketch.add(minutes)
+        self.histogram[bisect_right(LATENESS_EDGES, minutes)] += 1
+        weekday, hour = scheduled_time.weekday(), scheduled_time.hour
+        self.heatmap_total[weekday][hour] += minutes
+        self.heatmap_count[weekday][hour] += 1
+
+    def merge(self, other: "LatenessProfile") -> None:
+        self.sketch.merge(other.sketch)
+        for index, count in enumerate(other.histogram):
+            self.histogram[index] += count
+        for weekday in range(7):
+            for hour in range(24):
+                self.heatmap_total[weekday][hour] += other.heatmap_total[weekday][hour]
+                self.heatmap_count[weekday][hour] += other.heatmap_count[weekday][hour]
+
+    @property
+    def count(self) -> int:
+        return self.sketch.count
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sketch.mean
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Approximate minutes late at ``percent`` (0-100); early counts as 0."""
+        return self.sketch.quantile(percent / 100.0)
+
+    def heatmap(self) -> List[List[Optional[float]]]:
+        """Mean minutes late per ``[weekday][hour]``, ``None`` for empty cells."""
+        return [
+            [
+                total / count if count else None
+                for total, count in zip(self.heatmap_total[weekday], self.heatmap_count[weekday])
+            ]
+            for weekday in range(7)
+        ]
+
+
+@dataclass
+class PunctualityReport:
+    """Lateness of taken doses overall and per medication."""
+
+    overall: LatenessProfile = field(default_factory=LatenessProfile)
+    by_medication: Dict[str, LatenessProfile] = field(default_factory=dict)
+
+    def add(self, entry: DoseHistoryEntry) -> None:
+        if status_key(entry.status) != "taken":
+            return
+        minutes = lateness_minutes(entry)
+        self.overall.add(entry.scheduled_time, minutes)
+        profile = self.by_medication.get(entry.medication_id)
+        if profile is None:
+            profile = self.by_medication[entry.medication_id] = LatenessProfile()
+        profile.add(entry.scheduled_time, minutes)
+
+
+def analyze_punctuality(entries: Iterable[DoseHistoryEntry]) -> PunctualityReport:
+    """Stream ``entries`` into a :class:`PunctualityReport`."""
+
+    report = PunctualityReport()
+    for entry in entries:
+        report.add(entry)
+    return report
+
+
+def punctuality_for_range(
+    storage: StorageEngine,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    medication_id: Optional[str] = None,
+) -> PunctualityReport:
+    """Report on history filed in ``[start, end)``, optionally for one medication."""
+
+    entries = storage.load_history(start, end, medication_id=medication_id, status="taken")
+    return analyze_punctuality(entries)
+
+
+__all__ = [
+    "HISTOGRAM_LABELS",
+    "LATENESS_EDGES",
+    "LatenessProfile",
+    "PunctualityReport",
+    "analyze_punctuality",
+    "lateness_minutes",
+    "punctuality_for_range",
+]
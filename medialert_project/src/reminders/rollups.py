@@ -0,0 +1,213 @@
+"""Daily history rollups for long-range dashboards.
+
+Once a day is over its history rarely changes, so :func:`compact_rollups`
+folds each closed day into a :class:`DailyRollup` with status counts per
+medication and a sketch of how late taken doses were. :func:`summarize_range`
+answers a range from those rollups and reads raw history only for the
+partial days at its edges and for days that are not rolled up yet. Appending
+history to a rolled-up day drops that day's rollup until the next compaction.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from .aggregates import status_key
+from .history_index import history_key
+from .models import DoseHistoryEntry, _from_iso
+from .sketch import QuantileSketch
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .storage import StorageEngine
+
+ROLLUPS_KEY = "rollups"
+
+
+@dataclass
+class HistorySummary:
+    """Status counts per medication plus the delay of taken doses, in seconds."""
+
+    counts: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    delay: QuantileSketch = field(default_factory=QuantileSketch)
+
+    def add(self, entry: DoseHistoryEntry) -> None:
+        status = status_key(entry.status)
+        statuses = self.counts.setdefault(entry.medication_id, {})
+        statuses[status] = statuses.get(status, 0) + 1
+        if status == "taken":
+            self.delay.add((entry.acted_at - entry.scheduled_time).total_seconds())
+
+    def merge(self, other: "HistorySummary") -> None:
+        for medication_id, statuses in other.counts.items():
+            merged = self.counts.setdefault(medication_id, {})
+            for status, count in statuses.items():
+                merged[status] = merged.get(status, 0) + count
+        self.delay.merge(other.delay)
+
+    @property
+    def mean_delay(self) -> Optional[float]:
+        return self.delay.mean
+
+    @property
+    def p95_delay(self) -> Optional[float]:
+        return self.delay.quantile(0.95)
+
+
+@dataclass
+class DailyRollup(HistorySummary):
+    """Summary of one closed day of history."""
+
+    day: date = date.min
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "day": self.day.isoformat(),
+            "counts": self.counts,
+            "delay": self.delay.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "DailyRollup":
+        return cls(
+            day=date.fromisoformat(data["day"]),
+            counts={key: dict(value) for key, value in data.get("counts", {}).items()},
+            delay=QuantileSketch.from_dict(data.get("delay", {})),
+        )
+
+
+# State helpers -----------------------------------------------------------
+
+
+def payload_day(payload: Mapping[str, Any]) -> str:
+    """ISO day a serialized history entry is filed under."""
+    when = _from_iso(payload.get("timestamp")) or _from_iso(payload.get("acted_at"))
+    return when.date().isoformat()
+
+
+def rollups_from_data(
+    data: Mapping[str, Mapping[str, Any]],
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> Dict[date, DailyRollup]:
+    """Deserialize stored rollups for days in ``[start, end)``."""
+    low = start.isoformat() if start is not None else None
+    high = end.isoformat() if end is not None else None
+    return {
+        rollup.day: rollup
+        for rollup in (
+            DailyRollup.from_dict(item)
+            for day, item in sorted(data.items())
+            if (low is None or day >= low) and (high is None or day < high)
+        )
+    }
+
+
+def invalidate_days(data: Optional[Dict[str, Any]], payloads: Iterable[Mapping[str, Any]]) -> None:
+    """Drop rollups of the days that serialized history entries land in."""
+    if not data:
+        return
+    for payload in payloads:
+        data.pop(payload_day(payload), None)
+
+
+def _midnight(moment: datetime) -> datetime:
+    return datetime.combine(moment.date(), time.min)
+
+
+def _ceil_midnight(moment: datetime) -> datetime:
+    floor = _midnight(moment)
+    return floor if floor == moment else floor + timedelta(days=1)
+
+
+def build_rollups(entries: Iterable[DoseHistoryEntry]) -> Dict[date, DailyRollup]:
+    rollups: Dict[date, DailyRollup] = {}
+    for entry in entries:
+        day = history_key(entry).date()
+        rollup = rollups.get(day)
+        if rollup is None:
+            rollup = rollups[day] = DailyRollup(day=day)
+        rollup.add(entry)
+    return rollups
+
+
+# Storage-level operations ------------------------------------------------
+
+
+def compact_rollups(storage: StorageEngine, now: Optional[datetime] = None) -> int:
+    """Roll up every closed day that has history but no rollup yet.
+
+    Returns the number of days written. Days before today are closed. Only
+    days without a rollup are read: usually the ones since the last
+    compaction, plus any whose rollup a late entry invalidated.
+    """
+
+    today = _midnight(now or datetime.now())
+    oldest = storage.load_history(end=today, limit=1)
+    if not oldest:
+        return 0
+    existing = storage.load_rollups(end=today.date())
+    pending = [
+        entry
+        for low, high in _raw_ranges(_midnight(history_key(oldest[0])), today, existing)
+        for entry in storage.load_history(low, high)
+    ]
+    rollups = build_rollups(pending)
+    if rollups:
+        storage.save_rollups(rollups.values())
+    return len(rollups)
+
+
+def _raw_ranges(
+    start: datetime, end: datetime, rollups: Mapping[date, DailyRollup]
+) -> List[Tuple[datetime, datetime]]:
+    """Sub-ranges of ``[start, end)`` not covered by ``rollups``, merged."""
+
+    ranges: List[Tuple[datetime, datetime]] = []
+    first_full, last_full = _ceil_midnight(start), _midnight(end)
+    if first_full >= last_full:
+        return [(start, end)]
+
+    def _extend(low: datetime, high: datetime) -> None:
+        if low >= high:
+            return
+        if ranges and ranges[-1][1] == low:
+            ranges[-1] = (ranges[-1][0], high)
+        else:
+            ranges.append((low, high))
+
+    _extend(start, first_full)
+    cursor = first_full
+    while cursor < last_full:
+        following = cursor + timedelta(days=1)
+        if cursor.date() not in rollups:
+            _extend(cursor, following)
+        cursor = following
+    _extend(last_full, end)
+    return ranges
+
+
+def summarize_range(storage: StorageEngine, start: datetime, end: datetime) -> HistorySummary:
+    """Summarize history filed in ``[start, end)`` using rollups where possible."""
+
+    rollups = storage.load_rollups(_ceil_midnight(start).date(), _midnight(end).date())
+    summary = HistorySummary()
+    for rollup in rollups.values():
+        summary.merge(rollup)
+    for low, high in _raw_ranges(start, end, rollups):
+        for entry in storage.load_history(low, high):
+            summary.add(entry)
+    return summary
+
+
+__all__ = [
+    "DailyRollup",
+    "HistorySummary",
+    "ROLLUPS_KEY",
+    "build_rollups",
+    "compact_rollups",
+    "invalidate_days",
+    "payload_day",
+    "rollups_from_data",
+    "summarize_range",
+]
@@ -1,14 +1,17 @@
 """Scheduling engine for medication reminders."""
 from __future__ import annotations
 
+import heapq
+import itertools
 import logging
 import threading
+import time
 from datetime import datetime, timedelta
-from typing import Callable, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from .models import Medication, UpcomingDose
-from .storage import ReminderStorage
-from .analytics import AlertActionLogger
+from .storage import StorageEngine
+from .analytics import AlertAction, AlertActionLogger
 
 LOGGER = logging.getLogger(__name__)
 
@@ -24,24 +27,53 @@ DueHandler = Callable[
     None,
 ]
 
+MODES = ("poll", "event")
+RESOLVED_STATUSES = ("taken", "missed", "skipped")
+# Housekeeping only starts when the next dose is at least this many seconds away.
+IDLE_MARGIN = 30.0
+
 
 class ReminderScheduler:
-    """Service that polls for pending doses and triggers notifications."""
+    """Service that watches pending doses and triggers notifications.
+
+    In the default ``"poll"`` mode the worker rescans storage every
+    ``poll_interval`` seconds. In ``"event"`` mode pending doses are kept in a
+    min-heap keyed on their effective due time; the worker sleeps until the
+    earliest one is due and is woken early whenever this scheduler adds,
+    snoozes or resolves a dose. ``poll_interval`` then only bounds how long it
+    goes without resyncing with changes made outside this scheduler.
+
+    Between dispatches, when no dose is due within :data:`IDLE_MARGIN`
+    seconds, the worker archives expired history via the storage's
+    ``archive_history`` at most every ``maintenance_interval`` seconds
+    (``None`` turns this off).
+    """
 
     def __init__(
         self,
-        storage: ReminderStorage,
+        storage: StorageEngine,
         due_handler: Optional[DueHandler] = None,
         poll_interval: int = 60,
         action_logger: Optional[AlertActionLogger] = None,
+        mode: str = "poll",
+        maintenance_interval: Optional[float] = 3600.0,
     ) -> None:
+        if mode not in MODES:
+            raise ValueError(f"Unknown scheduler mode: {mode}")
         self.storage = storage
         self.due_handler = due_handler
         self.poll_interval = poll_interval
+        self.mode = mode
         self._stop_event = threading.Event()
         self._thread: Optional[threading.Thread] = None
         self._lock = threading.RLock()
         self.action_logger = action_logger or AlertActionLogger(storage)
+        self._queue: List[Tuple[datetime, int, str]] = []
+        self._queue_lock = threading.Lock()
+        self._queue_counter = itertools.count()
+        self._wakeup = threading.Event()
+        self.maintenance_interval = maintenance_interval
+        self._last_maintenance: Optional[float] = None
 
     # Lifecycle ----------------------------------------------------------
 
@@ -55,6 +87,7 @@ class ReminderScheduler:
 
     def stop(self) -> None:
         self._stop_event.set()
+        self._wakeup.set()
         if self._thread:
             self._thread.join()
             LOGGER.info("Reminder scheduler stopped")
@@ -81,77 +114,153 @@ class ReminderScheduler:
             return
         dose = UpcomingDose.create(medication.medication_id, next_due)
         self.storage.upsert_upcoming_dose(dose)
+        self._dose_changed(dose)
         LOGGER.debug("Created initial dose %s for medication %s", dose.dose_id, medication.name)
 
+    def plan(self, start: datetime, end: datetime) -> List[Tuple[datetime, Medication]]:
+        """Every due time in ``[start, end)`` across all scheduled medications."""
+
+        def _stream(index: int, medication: Medication) -> Iterator[tuple]:
+            for due in medication.schedule.occurrences(start, end):
+                yield due, index, medication
+
+        streams = [
+            _stream(index, medication)
+            for index, medication in enumerate(self.storage.load_medications())
+            if medication.schedule
+        ]
+        return [(due, medication) for due, _, medication in heapq.merge(*streams)]
+
     def snooze(self, dose_id: str, minutes: int) -> None:
-        with self._lock:
-            dose = self.storage.get_upcoming_dose(dose_id)
-            if not dose:
-                return
-            dose.snoozed_until = datetime.now() + timedelta(minutes=minutes)
-            dose.notified = False
-            self.storage.upsert_upcoming_dose(dose)
-            self.action_logger.log_action(
-                dose,
-                "snoozed",
-                notes=f"Snoozed for {minutes} minutes",
-            )
-            LOGGER.info("Snoozed dose %s for %s minutes", dose_id, minutes)
+        self.snooze_many([dose_id], minutes)
 
     def mark_taken(self, dose_id: str) -> None:
-        with self._lock:
-            dose = self.storage.get_upcoming_dose(dose_id)
-            if not dose:
-                return
-            dose.status = "taken"
-            dose.taken_at = datetime.now()
-            self.storage.upsert_upcoming_dose(dose)
-            self.action_logger.log_action(dose, "taken", acted_at=dose.taken_at)
-            self.storage.remove_upcoming_dose(dose.dose_id)
-            LOGGER.info("Marked dose %s as taken", dose_id)
-            self._schedule_follow_up(dose)
+        self.mark_many([dose_id], "taken")
 
     def mark_missed(self, dose_id: str) -> None:
-        with self._lock:
-            dose = self.storage.get_upcoming_dose(dose_id)
-            if not dose:
-                return
-            dose.status = "missed"
-            self.storage.upsert_upcoming_dose(dose)
-            self.action_logger.log_action(dose, "missed")
-            self.storage.remove_upcoming_dose(dose.dose_id)
-            LOGGER.info("Marked dose %s as missed", dose_id)
-            self._schedule_follow_up(dose)
+        self.mark_many([dose_id], "missed")
 
     def mark_skipped(self, dose_id: str) -> None:
-        with self._lock:
-            dose = self.storage.get_upcoming_dose(dose_id)
-            if not dose:
-                return
-            dose.status = "skipped"
+        self.mark_many([dose_id], "skipped")
+
+    def snooze_many(self, dose_ids: Iterable[str], minutes: int) -> List[UpcomingDose]:
+        """Snooze several doses with a single storage write.
+
+        Unknown dose ids are ignored; the snoozed doses are returned.
+        """
+
+        until = datetime.now() + timedelta(minutes=minutes)
+
+        def _snooze(dose: UpcomingDose) -> Tuple[AlertAction, Optional[UpcomingDose]]:
+            dose.snoozed_until = until
+            dose.notified = False
             self.storage.upsert_upcoming_dose(dose)
-            self.action_logger.log_action(dose, "skipped")
+            return AlertAction(dose, "snoozed", notes=f"Snoozed for {minutes} minutes"), None
+
+        doses = self._transition(dose_ids, _snooze)
+        for dose in doses:
+            LOGGER.info("Snoozed dose %s for %s minutes", dose.dose_id, minutes)
+        return doses
+
+    def mark_many(self, dose_ids: Iterable[str], status: str) -> List[UpcomingDose]:
+        """Resolve several doses as ``status`` with a single storage write.
+
+        Each dose is logged to history, removed from the upcoming list and
+        followed by its medication's next dose, as :meth:`mark_taken` does
+        for one. Unknown dose ids are ignored; the resolved doses are returned.
+        """
+
+        if status not in RESOLVED_STATUSES:
+            raise ValueError(f"Unknown dose status: {status}")
+        now = datetime.now()
+        medications: Dict[str, Optional[Medication]] = {}
+
+        def _resolve(dose: UpcomingDose) -> Tuple[AlertAction, Optional[UpcomingDose]]:
+            dose.status = status
+            acted_at = None
+            if status == "taken":
+                dose.taken_at = acted_at = now
             self.storage.remove_upcoming_dose(dose.dose_id)
-            LOGGER.info("Marked dose %s as skipped", dose_id)
-            self._schedule_follow_up(dose)
+            return AlertAction(dose, status, acted_at=acted_at), self._follow_up(dose, medications)
+
+        doses = self._transition(dose_ids, _resolve)
+        for dose in doses:
+            LOGGER.info("Marked dose %s as %s", dose.dose_id, status)
+        return doses
 
     # Internal helpers ---------------------------------------------------
 
-    def _schedule_follow_up(self, dose: UpcomingDose) -> None:
-        medication = self.storage.get_medication(dose.medication_id)
-        if not medication or not medication.schedule:
+    def _transition(
+        self,
+        dose_ids: Iterable[str],
+        change: Callable[[UpcomingDose], Tuple[AlertAction, Optional[UpcomingDose]]],
+    ) -> List[UpcomingDose]:
+        """Apply ``change`` to each known dose inside one storage transaction.
+
+        ``change`` mutates the dose in storage and returns the history action
+        to log plus an optional follow-up dose to schedule. The event queue is
+        only updated once the transaction has been written.
+        """
+
+        changed: List[UpcomingDose] = []
+        with self._lock:
+            with self.storage.transaction():
+                doses = self._load_doses(dose_ids)
+                actions = []
+                for dose in doses:
+                    action, follow_up = change(dose)
+                    actions.append(action)
+                    changed.append(dose)
+                    if follow_up is not None:
+                        self.storage.upsert_upcoming_dose(follow_up)
+                        changed.append(follow_up)
+                self._log_actions(actions)
+            for dose in changed:
+                self._dose_changed(dose)
+        return doses
+
+    def _log_actions(self, actions: List[AlertAction]) -> None:
+        log_many = getattr(self.action_logger, "log_many", None)
+        if log_many is not None:
+            log_many(actions)
             return
+        # Custom loggers written before batching only log one action at a time.
+        log = getattr(self.action_logger, "log", None)
+        for action in actions:
+            if log is not None:
+                log(action)
+            else:
+                self.action_logger.log_action(
+                    action.dose, action.status, notes=action.notes, acted_at=action.acted_at
+                )
+
+    def _load_doses(self, dose_ids: Iterable[str]) -> List[UpcomingDose]:
+        wanted = list(dict.fromkeys(dose_ids))
+        if len(wanted) == 1:
+            dose = self.storage.get_upcoming_dose(wanted[0])
+            return [dose] if dose else []
+        by_id = {dose.dose_id: dose for dose in self.storage.load_upcoming_doses()}
+        return [by_id[dose_id] for dose_id in wanted if dose_id in by_id]
+
+    def _follow_up(
+        self, dose: UpcomingDose, medications: Dict[str, Optional[Medication]]
+    ) -> Optional[UpcomingDose]:
+        if dose.medication_id not in medications:
+            medications[dose.medication_id] = self.storage.get_medication(dose.medication_id)
+        medication = medications[dose.medication_id]
+        if not medication or not medication.schedule:
+            return None
         next_due = medication.schedule.next_due(after=dose.scheduled_time)
         if next_due is None:
-            return
+            return None
         new_dose = UpcomingDose.create(dose.medication_id, next_due)
-        self.storage.upsert_upcoming_dose(new_dose)
         LOGGER.debug(
             "Scheduled follow up dose %s for medication %s at %s",
             new_dose.dose_id,
             medication.name,
             next_due,
         )
+        return new_dose
 
     def _emit_due(self, dose: UpcomingDose, medication: Medication) -> None:
         if not self.due_handler:
@@ -168,9 +277,27 @@ class ReminderScheduler:
 
         self.due_handler(dose, medication, _taken, _snooze, _skip)
 
+    def _fire(self, dose: UpcomingDose, medication: Medication) -> None:
+        LOGGER.debug(
+            "Dose %s for medication %s is due at %s",
+            dose.dose_id,
+            medication.name,
+            dose.effective_due_time(),
+        )
+        dose.notified = True
+        self.storage.upsert_upcoming_dose(dose)
+        self._emit_due(dose, medication)
+
     def _run(self) -> None:
+        if self.mode == "event":
+            self._run_event_driven()
+        else:
+            self._run_polling()
+
+    def _run_polling(self) -> None:
         while not self._stop_event.is_set():
             now = datetime.now()
+            next_due: Optional[datetime] = None
             medications = {m.medication_id: m for m in self.storage.load_medications()}
             for dose in self.storage.load_upcoming_doses():
                 medication = medications.get(dose.medication_id)
@@ -180,16 +307,100 @@ class ReminderScheduler:
                     continue
                 due_time = dose.effective_due_time()
                 if due_time <= now and not dose.notified:
-                    LOGGER.debug(
-                        "Dose %s for medication %s is due at %s",
-                        dose.dose_id,
-                        medication.name,
-                        due_time,
-                    )
-                    dose.notified = True
-                    self.storage.upsert_upcoming_dose(dose)
-                    self._emit_due(dose, medication)
+                    self._fire(dose, medication)
+                elif due_time > now and (next_due is None or due_time < next_due):
+                    next_due = due_time
+            self._maintain_if_idle(
+                None if next_due is None else (next_due - datetime.now()).total_seconds()
+            )
             self._stop_event.wait(self.poll_interval)
 
+    # Idle maintenance ---------------------------------------------------
+
+    def _maintain_if_idle(self, seconds_until_due: Optional[float]) -> None:
+        if self.maintenance_interval is None:
+            return
+        if seconds_until_due is not None and seconds_until_due < IDLE_MARGIN:
+            return
+        now = time.monotonic()
+        if (
+            self._last_maintenance is not None
+            and now - self._last_maintenance < self.maintenance_interval
+        ):
+            return
+        self._last_maintenance = now
+        archive = getattr(self.storage, "archive_history", None)
+        if archive is None:
+            return
+        try:
+            archive()
+        except Exception:
+            LOGGER.exception("Archiving expired history failed")
+
+    # Event-driven queue -------------------------------------------------
+
+    def _dose_changed(self, dose: UpcomingDose) -> None:
+        """Queue a new, rescheduled or resolved dose and wake the worker."""
+        if self.mode != "event":
+            return
+        if dose.status != "pending" or dose.notified:
+            return
+        with self._queue_lock:
+            heapq.heappush(
+                self._queue,
+                (dose.effective_due_time(), next(self._queue_counter), dose.dose_id),
+            )
+        self._wakeup.set()
+
+    def _rebuild_queue(self) -> None:
+        entries = [
+            (dose.effective_due_time(), next(self._queue_counter), dose.dose_id)
+            for dose in self.storage.load_upcoming_doses()
+            if dose.status == "pending" and not dose.notified
+        ]
+        heapq.heapify(entries)
+        with self._queue_lock:
+            self._queue = entries
+
+    def _seconds_until_next_due(self) -> Optional[float]:
+        with self._queue_lock:
+            if not self._queue:
+                return None
+            due_time = self._queue[0][0]
+        return max((due_time - datetime.now()).total_seconds(), 0.0)
+
+    def _dispatch_due(self, now: datetime) -> None:
+        while True:
+            with self._queue_lock:
+                if not self._queue or self._queue[0][0] > now:
+                    return
+                due_time, _, dose_id = heapq.heappop(self._queue)
+            # Entries are never removed eagerly; anything that was resolved,
+            # rescheduled or already notified since it was queued is stale.
+            dose = self.storage.get_upcoming_dose(dose_id)
+            if dose is None or dose.status != "pending" or dose.notified:
+                continue
+            if dose.effective_due_time() != due_time:
+                continue
+            medication = self.storage.get_medication(dose.medication_id)
+            if not medication:
+                continue
+            self._fire(dose, medication)
+
+    def _run_event_driven(self) -> None:
+        self._rebuild_queue()
+        last_sync = time.monotonic()
+        while not self._stop_event.is_set():
+            self._dispatch_due(datetime.now())
+            self._maintain_if_idle(self._seconds_until_next_due())
+            timeout = self._seconds_until_next_due()
+            if timeout is None or timeout > self.poll_interval:
+                timeout = self.poll_interval
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+            if time.monotonic() - last_sync >= self.poll_interval:
+                self._rebuild_queue()
+                last_sync = time.monotonic()
+
 
-__all__ = ["ReminderScheduler", "DueHandler"]
+__all__ = ["ReminderScheduler", "DueHandler", "IDLE_MARGIN", "MODES", "RESOLVED_STATUSES"]
@@ -0,0 +1,428 @@
+"""On-disk encodings for the :class:`~reminders.storage.ReminderStorage` snapshot.
+
+``.json`` files keep the human-readable document. ``.rbin`` files use a
+compact binary layout that can be memory-mapped, so single lookups and
+history range scans read only the records they touch::
+
+    header     magic "RBIN", u16 format version, u16 section count, u64 journal seq
+    directory  per section: 4-byte tag, u64 offset, u64 length
+    STRS       u32 count, count + 1 u32 offsets, UTF-8 blob (ids, statuses, notes)
+    META       JSON with aggregates, rollups and any other keys
+    MEDS       u32 count, (u32 id, u32 start, u32 end) per medication, JSON blob
+    DOSE       u32 count, fixed 40-byte upcoming dose records
+    DIDX       u32 count, (u32 dose id, u32 record number) per upcoming dose
+    HIST       u32 count, fixed 40-byte history records
+
+Integers are little-endian. Timestamps are epoch microseconds, as written by
+``timestamp_format="epoch"``, with ``INT64_MIN`` standing in for ``None``.
+Strings are interned: each distinct value is stored once and records refer
+to it by index. The MEDS and DIDX entries are sorted by the UTF-8 bytes of
+their id, so a lookup bisects them and decodes one record. Version 1 files,
+which kept medications in META and had no dose index, are still read.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import struct
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from . import models
+from .journal import SEQ_KEY
+
+BINARY_SUFFIXES = {".rbin"}
+FORMAT_VERSION = 2
+
+_MAGIC = b"RBIN"
+_HEADER = struct.Struct("<4sHHQ")
+_SECTION = struct.Struct("<4sQQ")
+_COUNT = struct.Struct("<I")
+# dose_id, medication_id, status, notified, scheduled_time, snoozed_until, taken_at
+_DOSE = struct.Struct("<IIIB3xqqq")
+# dose_id, medication_id, status, notes, scheduled_time, timestamp, acted_at
+_HISTORY = struct.Struct("<IIIIqqq")
+# medication_id, start and end of its JSON in the blob
+_MEDICATION = struct.Struct("<III")
+# dose_id, record number in DOSE
+_DOSE_KEY = struct.Struct("<II")
+_NULL = -(2**63)
+
+_STRINGS, _META, _DOSES, _HISTORY_TAG = b"STRS", b"META", b"DOSE", b"HIST"
+_MEDICATIONS, _DOSE_INDEX = b"MEDS", b"DIDX"
+_RECORD_KEYS = ("medications", "upcoming_doses", "history", SEQ_KEY)
+
+
+class SnapshotFormatError(ValueError):
+    """A binary snapshot is damaged or written by an unsupported version."""
+
+
+def _micros(value: Any) -> int:
+    if value is None:
+        return _NULL
+    if isinstance(value, int):
+        return value
+    return models._to_epoch(models._from_iso(value))
+
+
+def _stamp(value: int) -> Optional[int]:
+    return None if value == _NULL else value
+
+
+class _StringTable:
+    def __init__(self) -> None:
+        self.index: Dict[str, int] = {}
+
+    def __call__(self, value: str) -> int:
+        position = self.index.get(value)
+        if position is None:
+            position = self.index[value] = len(self.index)
+        return position
+
+    def encode(self) -> bytes:
+        blobs = [value.encode("utf-8") for value in self.index]
+        offsets = [0]
+        for blob in blobs:
+            offsets.append(offsets[-1] + len(blob))
+        return struct.pack(f"<I{len(offsets)}I", len(blobs), *offsets) + b"".join(blobs)
+
+
+class _StringView:
+    """Read access to a string table encoded by :class:`_StringTable`."""
+
+    def __init__(self, buffer: Any, offset: int) -> None:
+        self._buffer = buffer
+        self.count = _COUNT.unpack_from(buffer, offset)[0]
+        self._offsets = offset + _COUNT.size
+        self._blob = self._offsets + (self.count + 1) * _COUNT.size
+
+    def _span(self, index: int) -> Tuple[int, int]:
+        start, end = struct.unpack_from("<II", self._buffer, self._offsets + index * _COUNT.size)
+        return self._blob + start, self._blob + end
+
+    def __getitem__(self, index: int) -> str:
+        return self.raw(index).decode("utf-8")
+
+    def raw(self, index: int) -> bytes:
+        start, end = self._span(index)
+        return self._buffer[start:end]
+
+    def index(self, value: str) -> Optional[int]:
+        """Position of ``value`` in the table, compared without decoding."""
+        needle = value.encode("utf-8")
+        for position in range(self.count):
+            start, end = self._span(position)
+            if self._buffer[start:end] == needle:
+                return position
+        return None
+
+
+def _id_order(items: List[Dict[str, Any]], key: str) -> List[int]:
+    """Positions of ``items`` sorted by the UTF-8 bytes of ``item[key]``."""
+    return sorted(range(len(items)), key=lambda position: items[position][key].encode("utf-8"))
+
+
+def encode_binary(state: Dict[str, Any]) -> bytes:
+    """Serialise a storage document into the ``.rbin`` layout."""
+
+    strings = _StringTable()
+    medications = state.get("medications", [])
+    blobs = [json.dumps(item, separators=(",", ":")).encode("utf-8") for item in medications]
+    spans: List[Tuple[int, int]] = []
+    cursor = 0
+    for blob in blobs:
+        spans.append((cursor, cursor + len(blob)))
+        cursor += len(blob)
+    medication_block = bytearray(_COUNT.pack(len(medications)))
+    for position in _id_order(medications, "medication_id"):
+        medication_block += _MEDICATION.pack(
+            strings(medications[position]["medication_id"]), *spans[position]
+        )
+    medication_block += b"".join(blobs)
+
+    doses = state.get("upcoming_doses", [])
+    dose_block = bytearray(_COUNT.pack(len(doses)))
+    for dose in doses:
+        dose_block += _DOSE.pack(
+            strings(dose["dose_id"]),
+            strings(dose["medication_id"]),
+            strings(dose.get("status", "pending")),
+            bool(dose.get("notified", False)),
+            _micros(dose["scheduled_time"]),
+            _micros(dose.get("snoozed_until")),
+            _micros(dose.get("taken_at")),
+        )
+    # sorted() is stable, so a duplicated id finds its first record, as a scan would.
+    dose_index = bytearray(_COUNT.pack(len(doses)))
+    for position in _id_order(doses, "dose_id"):
+        dose_index += _DOSE_KEY.pack(strings(doses[position]["dose_id"]), position)
+    history = state.get("history", [])
+    history_block = bytearray(_COUNT.pack(len(history)))
+    for entry in history:
+        history_block += _HISTORY.pack(
+            strings(entry["dose_id"]),
+            strings(entry["medication_id"]),
+            strings(entry["status"]),
+            strings(entry.get("notes", "")),
+            _micros(entry["scheduled_time"]),
+            _micros(entry.get("timestamp")),
+            _micros(entry.get("acted_at")),
+        )
+    meta = {key: value for key, value in state.items() if key not in _RECORD_KEYS}
+    sections = [
+        (_STRINGS, strings.encode()),
+        (_META, json.dumps(meta, separators=(",", ":")).encode("utf-8")),
+        (_MEDICATIONS, bytes(medication_block)),
+        (_DOSES, bytes(dose_block)),
+        (_DOSE_INDEX, bytes(dose_index)),
+        (_HISTORY_TAG, bytes(history_block)),
+    ]
+
+    offset = _HEADER.size + _SECTION.size * len(sections)
+    parts = [_HEADER.pack(_MAGIC, FORMAT_VERSION, len(sections), int(state.get(SEQ_KEY, 0)))]
+    for tag, payload in sections:
+        parts.append(_SECTION.pack(tag, offset, len(payload)))
+        offset += len(payload)
+    parts.extend(payload for _, payload in sections)
+    return b"".join(parts)
+
+
+class SnapshotReader:
+    """Memory-mapped view of an ``.rbin`` snapshot.
+
+    Records are decoded on access, so looking up one dose or scanning a
+    history range never materialises the rest of the file. Snapshots are
+    replaced by rename, so an open reader keeps seeing the version it opened.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        with open(path, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parse_header()
+        except BaseException:
+            self._map.close()
+            raise
+
+    def _parse_header(self) -> None:
+        if len(self._map) < _HEADER.size:
+            raise SnapshotFormatError("Truncated snapshot header")
+        magic, version, count, self.seq = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC:
+            raise SnapshotFormatError("Not a reminder snapshot")
+        if version > FORMAT_VERSION:
+            raise SnapshotFormatError(f"Unsupported snapshot version: {version}")
+        self.format_version = version
+        self._sections: Dict[bytes, Tuple[int, int]] = {}
+        for position in range(count):
+            tag, offset, length = _SECTION.unpack_from(
+                self._map, _HEADER.size + position * _SECTION.size
+            )
+            if offset + length > len(self._map):
+                raise SnapshotFormatError(f"Section {tag!r} runs past the end of the file")
+            self._sections[tag] = (offset, length)
+        self._strings = _StringView(self._map, self._section(_STRINGS)[0])
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __enter__(self) -> "SnapshotReader":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _section(self, tag: bytes) -> Tuple[int, int]:
+        try:
+            return self._sections[tag]
+        except KeyError:
+            raise SnapshotFormatError(f"Missing section {tag!r}") from None
+
+    def _count(self, tag: bytes) -> int:
+        return _COUNT.unpack_from(self._map, self._section(tag)[0])[0]
+
+    def string(self, index: int) -> str:
+        return self._strings[index]
+
+    def _records(self, tag: bytes, layout: struct.Struct) -> Iterator[Tuple]:
+        base = self._section(tag)[0] + _COUNT.size
+        for position in range(self._count(tag)):
+            yield layout.unpack_from(self._map, base + position * layout.size)
+
+    def _record(self, tag: bytes, layout: struct.Struct, position: int) -> Tuple:
+        return layout.unpack_from(
+            self._map, self._section(tag)[0] + _COUNT.size + position * layout.size
+        )
+
+    def _lookup(self, tag: bytes, layout: struct.Struct, key: str) -> Optional[Tuple]:
+        """Bisect an id-sorted section for the record whose first field is ``key``."""
+
+        needle = key.encode("utf-8")
+        low, high = 0, self._count(tag)
+        while low < high:
+            middle = (low + high) // 2
+            if self._strings.raw(self._record(tag, layout, middle)[0]) < needle:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count(tag):
+            record = self._record(tag, layout, low)
+            if self._strings.raw(record[0]) == needle:
+                return record
+        return None
+
+    # Lookups ------------------------------------------------------------
+
+    @property
+    def upcoming_count(self) -> int:
+        return self._count(_DOSES)
+
+    @property
+    def history_count(self) -> int:
+        return self._count(_HISTORY_TAG)
+
+    def metadata(self) -> Dict[str, Any]:
+        offset, length = self._section(_META)
+        return json.loads(self._map[offset : offset + length])
+
+    def _medication(self, record: Tuple) -> Dict[str, Any]:
+        offset = self._section(_MEDICATIONS)[0]
+        blob = offset + _COUNT.size + self._count(_MEDICATIONS) * _MEDICATION.size
+        return json.loads(self._map[blob + record[1] : blob + record[2]])
+
+    def medications(self) -> List[Dict[str, Any]]:
+        if self.format_version < 2:
+            return self.metadata().get("medications", [])
+        # The index is sorted by id; blob order is the stored order.
+        records = sorted(self._records(_MEDICATIONS, _MEDICATION), key=lambda record: record[1])
+        return [self._medication(record) for record in records]
+
+    def medication(self, medication_id: str) -> Optional[Dict[str, Any]]:
+        if self.format_version < 2:
+            return next(
+                (item for item in self.medications() if item["medication_id"] == medication_id),
+                None,
+            )
+        record = self._lookup(_MEDICATIONS, _MEDICATION, medication_id)
+        return self._medication(record) if record is not None else None
+
+    def _dose(self, record: Tuple) -> Dict[str, Any]:
+        dose_id, medication_id, status, notified, scheduled, snoozed, taken = record
+        return {
+            "dose_id": self.string(dose_id),
+            "medication_id": self.string(medication_id),
+            "scheduled_time": scheduled,
+            "status": self.string(status),
+            "snoozed_until": _stamp(snoozed),
+            "notified": bool(notified),
+            "taken_at": _stamp(taken),
+        }
+
+    def upcoming_doses(self) -> Iterator[Dict[str, Any]]:
+        for record in self._records(_DOSES, _DOSE):
+            yield self._dose(record)
+
+    def upcoming_dose(self, dose_id: str) -> Optional[Dict[str, Any]]:
+        if self.format_version < 2:
+            return next((dose for dose in self.upcoming_doses() if dose["dose_id"] == dose_id), None)
+        key = self._lookup(_DOSE_INDEX, _DOSE_KEY, dose_id)
+        return self._dose(self._record(_DOSES, _DOSE, key[1])) if key is not None else None
+
+    def _entry(self, record: Tuple) -> Dict[str, Any]:
+        dose_id, medication_id, status, notes, scheduled, timestamp, acted_at = record
+        return {
+            "dose_id": self.string(dose_id),
+            "medication_id": self.string(medication_id),
+            "scheduled_time": scheduled,
+            "timestamp": _stamp(timestamp),
+            "status": self.string(status),
+            "acted_at": _stamp(acted_at),
+            "notes": self.string(notes),
+        }
+
+    def history(
+        self, start: Optional[datetime] = None, end: Optional[datetime] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """History entries, in stored order, filed in ``[start, end)``.
+
+        Entries are filed under their timestamp, falling back to ``acted_at``,
+        like :func:`~reminders.history_index.history_key`. Only matching
+        records have their strings decoded.
+        """
+
+        low = _NULL if start is None else models._to_epoch(start)
+        high = None if end is None else models._to_epoch(end)
+        for record in self._records(_HISTORY_TAG, _HISTORY):
+            key = record[5] if record[5] != _NULL else record[6]
+            if key >= low and (high is None or key < high):
+                yield self._entry(record)
+
+    def to_state(self) -> Dict[str, Any]:
+        """Decode the whole snapshot into a storage document."""
+        state = self.metadata()
+        state["medications"] = self.medications()
+        state["upcoming_doses"] = list(self.upcoming_doses())
+        state["history"] = [self._entry(record) for record in self._records(_HISTORY_TAG, _HISTORY)]
+        state[SEQ_KEY] = self.seq
+        return state
+
+
+class JsonCodec:
+    """The indented JSON document, readable and hand-editable."""
+
+    binary = False
+
+    def dumps(self, state: Dict[str, Any]) -> bytes:
+        return json.dumps(state, indent=2).encode("utf-8")
+
+    def load(self, path: Path) -> Dict[str, Any]:
+        with Path(path).open("r", encoding="utf-8") as handle:
+            return json.load(handle)
+
+    def read_seq(self, path: Path) -> int:
+        return int(self.load(path).get(SEQ_KEY, 0))
+
+
+class BinaryCodec:
+    """The memory-mappable ``.rbin`` layout described in the module docstring."""
+
+    binary = True
+
+    def dumps(self, state: Dict[str, Any]) -> bytes:
+        return encode_binary(state)
+
+    def load(self, path: Path) -> Dict[str, Any]:
+        with SnapshotReader(path) as reader:
+            return reader.to_state()
+
+    def read_seq(self, path: Path) -> int:
+        with Path(path).open("rb") as handle:
+            header = handle.read(_HEADER.size)
+        if len(header) < _HEADER.size or header[:4] != _MAGIC:
+            raise SnapshotFormatError("Not a reminder snapshot")
+        return _HEADER.unpack(header)[3]
+
+    def open(self, path: Path) -> SnapshotReader:
+        return SnapshotReader(path)
+
+
+SnapshotCodec = Union[JsonCodec, BinaryCodec]
+
+
+def codec_for_path(path: Union[str, Path]) -> SnapshotCodec:
+    """The codec for a snapshot file, chosen by its extension."""
+    return BinaryCodec() if Path(path).suffix.lower() in BINARY_SUFFIXES else JsonCodec()
+
+
+__all__ = [
+    "BINARY_SUFFIXES",
+    "BinaryCodec",
+    "FORMAT_VERSION",
+    "JsonCodec",
+    "SnapshotCodec",
+    "SnapshotFormatError",
+    "SnapshotReader",
+    "codec_for_path",
+    "encode_binary",
+]
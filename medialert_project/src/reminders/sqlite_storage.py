@@ -0,0 +1,352 @@
+"""SQLite-backed persistence engine for the reminder service."""
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import models
+from .aggregates import AdherenceAggregates, bucket_keys, status_key
+from .history_index import history_key
+from .rollups import DailyRollup
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS medications (
+    medication_id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS upcoming_doses (
+    dose_id TEXT PRIMARY KEY,
+    medication_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    due_time TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_upcoming_medication ON upcoming_doses (medication_id);
+CREATE INDEX IF NOT EXISTS idx_upcoming_status_due ON upcoming_doses (status, due_time);
+CREATE INDEX IF NOT EXISTS idx_upcoming_due ON upcoming_doses (due_time);
+
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dose_id TEXT NOT NULL,
+    medication_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    timestamp TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history (timestamp);
+CREATE INDEX IF NOT EXISTS idx_history_medication ON history (medication_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_history_status ON history (status, timestamp);
+
+CREATE TABLE IF NOT EXISTS history_rollup (
+    granularity TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    medication_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (granularity, bucket, medication_id, status)
+);
+
+CREATE TABLE IF NOT EXISTS daily_rollup (
+    day TEXT PRIMARY KEY,
+    payload TEXT NOT NULL
+);
+"""
+
+
+def _dumps(payload: Dict[str, Any]) -> str:
+    return json.dumps(payload, separators=(",", ":"))
+
+
+def _dose_row(dose: models.UpcomingDose) -> tuple:
+    payload = dose.to_dict()
+    due_time = payload["snoozed_until"] or payload["scheduled_time"]
+    return (
+        dose.dose_id,
+        dose.medication_id,
+        dose.status,
+        due_time,
+        _dumps(payload),
+    )
+
+
+def _history_row(entry: models.DoseHistoryEntry) -> tuple:
+    payload = entry.to_dict()
+    return (
+        entry.dose_id,
+        entry.medication_id,
+        entry.status,
+        payload["timestamp"] or payload["acted_at"],
+        _dumps(payload),
+    )
+
+
+def _rollup_rows(items: Iterable[Tuple[str, str, datetime]]) -> List[tuple]:
+    counts: Counter = Counter()
+    for medication_id, status, when in items:
+        status = status_key(status)
+        for granularity, bucket in bucket_keys(when.date()).items():
+            counts[(granularity, bucket, medication_id, status)] += 1
+    return [(*key, count) for key, count in counts.items()]
+
+
+class SQLiteReminderStorage:
+    """Persist reminder data in an indexed SQLite database running in WAL mode.
+
+    The public methods mirror :class:`~reminders.storage.ReminderStorage` so the
+    scheduler, analytics and CLI can use either engine unchanged.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._in_transaction = False
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._lock, self._connection:
+            self._connection.executescript(SCHEMA)
+            self._backfill_rollup()
+
+    def _query(self, sql: str, params: Iterable[Any] = ()) -> List[tuple]:
+        with self._lock:
+            return self._connection.execute(sql, tuple(params)).fetchall()
+
+    def _backfill_rollup(self) -> None:
+        """Count existing history into the rollup table of an older database."""
+        has_rollup = self._connection.execute("SELECT 1 FROM history_rollup LIMIT 1").fetchone()
+        if has_rollup:
+            return
+        rows = self._connection.execute("SELECT medication_id, status, timestamp FROM history")
+        self._write_rollup(
+            (medication_id, status, models._from_iso(timestamp))
+            for medication_id, status, timestamp in rows
+        )
+
+    def _write_rollup(self, items: Iterable[Tuple[str, str, datetime]]) -> None:
+        self._connection.executemany(
+            "INSERT INTO history_rollup (granularity, bucket, medication_id, status, count) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(granularity, bucket, medication_id, status) "
+            "DO UPDATE SET count = count + excluded.count",
+            _rollup_rows(items),
+        )
+
+    @contextmanager
+    def _write(self) -> Iterator[None]:
+        """Run statements in the open transaction, or in one of their own."""
+        with self._lock:
+            if self._in_transaction:
+                yield
+            else:
+                with self._connection:
+                    yield
+
+    @contextmanager
+    def transaction(self) -> Iterator["SQLiteReminderStorage"]:
+        """Commit every write made in the block at once; roll back if it raises."""
+        with self._lock:
+            if self._in_transaction:
+                yield self
+                return
+            self._in_transaction = True
+            try:
+                with self._connection:
+                    yield self
+            finally:
+                self._in_transaction = False
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    # Medication helpers -------------------------------------------------
+
+    def load_medications(self) -> List[models.Medication]:
+        rows = self._query("SELECT payload FROM medications ORDER BY rowid")
+        return models.deserialize_medications(json.loads(row[0]) for row in rows)
+
+    def save_medications(self, medications: Iterable[models.Medication]) -> None:
+        rows = [(item.medication_id, _dumps(item.to_dict())) for item in medications]
+        with self._write():
+            self._connection.execute("DELETE FROM medications")
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO medications (medication_id, payload) VALUES (?, ?)",
+                rows,
+            )
+
+    def upsert_medication(self, medication: models.Medication) -> None:
+        with self._write():
+            self._connection.execute(
+                "INSERT INTO medications (medication_id, payload) VALUES (?, ?) "
+                "ON CONFLICT(medication_id) DO UPDATE SET payload = excluded.payload",
+                (medication.medication_id, _dumps(medication.to_dict())),
+            )
+
+    def get_medication(self, medication_id: str) -> Optional[models.Medication]:
+        rows = self._query(
+            "SELECT payload FROM medications WHERE medication_id = ?", (medication_id,)
+        )
+        return models.Medication.from_dict(json.loads(rows[0][0])) if rows else None
+
+    # Upcoming dose helpers ---------------------------------------------
+
+    def load_upcoming_doses(self) -> List[models.UpcomingDose]:
+        rows = self._query("SELECT payload FROM upcoming_doses ORDER BY rowid")
+        return models.deserialize_upcoming_doses(json.loads(row[0]) for row in rows)
+
+    def save_upcoming_doses(self, doses: Iterable[models.UpcomingDose]) -> None:
+        rows = [_dose_row(dose) for dose in doses]
+        with self._write():
+            self._connection.execute("DELETE FROM upcoming_doses")
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO upcoming_doses "
+                "(dose_id, medication_id, status, due_time, payload) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def upsert_upcoming_dose(self, dose: models.UpcomingDose) -> None:
+        with self._write():
+            self._connection.execute(
+                "INSERT INTO upcoming_doses "
+                "(dose_id, medication_id, status, due_time, payload) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(dose_id) DO UPDATE SET medication_id = excluded.medication_id, "
+                "status = excluded.status, due_time = excluded.due_time, "
+                "payload = excluded.payload",
+                _dose_row(dose),
+            )
+
+    def remove_upcoming_dose(self, dose_id: str) -> None:
+        with self._write():
+            self._connection.execute("DELETE FROM upcoming_doses WHERE dose_id = ?", (dose_id,))
+
+    def get_upcoming_dose(self, dose_id: str) -> Optional[models.UpcomingDose]:
+        rows = self._query("SELECT payload FROM upcoming_doses WHERE dose_id = ?", (dose_id,))
+        return models.UpcomingDose.from_dict(json.loads(rows[0][0])) if rows else None
+
+    # History helpers ----------------------------------------------------
+
+    def load_history(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        *,
+        medication_id: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: Optional[int] = None,
+        reverse: bool = False,
+    ) -> List[models.DoseHistoryEntry]:
+        """History recorded in ``[start, end)``, oldest first unless ``reverse``."""
+
+        clauses: List[str] = []
+        params: List[Any] = []
+        # Timestamps are fixed-width ISO strings, so text order is time order.
+        if start is not None:
+            clauses.append("timestamp >= ?")
+            params.append(models._to_iso(start))
+        if end is not None:
+            clauses.append("timestamp < ?")
+            params.append(models._to_iso(end))
+        if medication_id is not None:
+            clauses.append("medication_id = ?")
+            params.append(medication_id)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+
+        sql = "SELECT payload FROM history"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        direction = "DESC" if reverse else "ASC"
+        sql += f" ORDER BY timestamp {direction}, id {direction}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(max(limit, 0))
+        rows = self._query(sql, params)
+        return models.deserialize_history(json.loads(row[0]) for row in rows)
+
+    def load_aggregates(self) -> AdherenceAggregates:
+        """Per-day/week/month status counts, kept up to date on every append."""
+
+        aggregates = AdherenceAggregates()
+        rows = self._query(
+            "SELECT granularity, bucket, medication_id, status, count FROM history_rollup"
+        )
+        for granularity, bucket, medication_id, status, count in rows:
+            statuses = (
+                aggregates.data.setdefault(granularity, {})
+                .setdefault(bucket, {})
+                .setdefault(medication_id, {})
+            )
+            statuses[status] = count
+        return aggregates
+
+    def load_rollups(
+        self, start: Optional[date] = None, end: Optional[date] = None
+    ) -> Dict[date, DailyRollup]:
+        """Daily rollups for days in ``[start, end)``, keyed by day."""
+
+        clauses: List[str] = []
+        params: List[Any] = []
+        if start is not None:
+            clauses.append("day >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            clauses.append("day < ?")
+            params.append(end.isoformat())
+        sql = "SELECT payload FROM daily_rollup"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        rows = self._query(sql + " ORDER BY day", params)
+        rollups = (DailyRollup.from_dict(json.loads(row[0])) for row in rows)
+        return {rollup.day: rollup for rollup in rollups}
+
+    def save_rollups(self, rollups: Iterable[DailyRollup]) -> None:
+        rows = [(rollup.day.isoformat(), _dumps(rollup.to_dict())) for rollup in rollups]
+        with self._write():
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO daily_rollup (day, payload) VALUES (?, ?)", rows
+            )
+
+    def append_history(self, entry: models.DoseHistoryEntry) -> None:
+        self.append_history_many([entry])
+
+    def append_history_many(self, entries: Iterable[models.DoseHistoryEntry]) -> None:
+        """Insert several history entries and their rollup counts in one transaction."""
+        entries = list(entries)
+        rows = [_history_row(entry) for entry in entries]
+        with self._write():
+            self._connection.executemany(
+                "INSERT INTO history (dose_id, medication_id, status, timestamp, payload) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._write_rollup(
+                (entry.medication_id, entry.status, history_key(entry)) for entry in entries
+            )
+            days = {(history_key(entry).date().isoformat(),) for entry in entries}
+            self._connection.executemany("DELETE FROM daily_rollup WHERE day = ?", days)
+
+    # Utilities ----------------------------------------------------------
+
+    def reset(self) -> None:
+        """Reset storage to an empty state."""
+        with self._write():
+            for table in (
+                "medications",
+                "upcoming_doses",
+                "history",
+                "history_rollup",
+                "daily_rollup",
+            ):
+                self._connection.execute(f"DELETE FROM {table}")
+
+
+__all__ = ["SQLiteReminderStorage"]
@@ -1,58 +1,581 @@
 """Persistence helpers for the reminder service."""
 from __future__ import annotations
 
-import json
+import logging
+import os
 import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from itertools import islice
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
 
-from . import models
+from . import journal, models
+from .aggregates import AGGREGATES_KEY, AdherenceAggregates, aggregates_from_state
+from .cache import CacheStats, Signature, StorageCache
+from .durability import FSYNC_POLICIES, DeferredSync, atomic_write_bytes, fsync_directory
+from .history_archive import ARCHIVES_KEY, HistoryArchive, month_key
+from .history_index import query_payloads
+from .history_segments import SEGMENTS_KEY, SegmentStore, merge_history, payload_key
+from .rollups import ROLLUPS_KEY, DailyRollup, rollups_from_data
+from .journal import SEQ_KEY, MutationRecord, StorageJournal
+from .locking import FileLock
+from .snapshot_codec import SnapshotReader, codec_for_path
+from .sqlite_storage import SQLiteReminderStorage
+
+SQLITE_SUFFIXES = {".db", ".sqlite", ".sqlite3"}
+TIMESTAMP_FORMATS = ("iso", "epoch")
+
+LOGGER = logging.getLogger(__name__)
+
+
+class StorageConflictError(RuntimeError):
+    """A compare-and-swap transaction found the storage at another version."""
+
+    def __init__(self, expected: int, actual: int) -> None:
+        super().__init__(f"Storage changed: expected version {expected}, found {actual}")
+        self.expected = expected
+        self.actual = actual
 
 
 class ReminderStorage:
-    """Persist reminder data to a local JSON document."""
+    """Persist reminder data to a local JSON document.
+
+    Paths ending in ``.rbin`` use the binary snapshot layout from
+    :mod:`reminders.snapshot_codec` instead of JSON. It is smaller and faster
+    to load, and single-dose lookups and history range queries read it
+    through ``mmap`` without decoding the whole file.
+
+    With ``journal=True`` the JSON document becomes a periodically compacted
+    snapshot and every mutation is appended to ``<path>.journal`` instead of
+    rewriting the whole document. Existing documents are picked up as the
+    initial snapshot, so switching modes needs no migration step.
+
+    With ``cache=True`` deserialized entities are kept in memory, keyed by id,
+    and mutations are written through to them. The files are only re-read when
+    their mtime or size changes, e.g. after another process wrote to them.
+
+    ``timestamp_format="epoch"`` writes datetimes as integer microseconds since
+    1970-01-01 instead of ISO strings. Both layouts are always readable, so the
+    setting can be changed on an existing file.
+
+    Mutations made inside :meth:`transaction` are written together, as one
+    document rewrite or one journal append.
+
+    Several processes may share the files: every read-modify-write holds an
+    advisory lock on ``<path>.lock`` and bumps :attr:`version`, which other
+    processes can poll cheaply and pass to ``transaction(expected_version=)``
+    for compare-and-swap updates. Journaled instances catch up by reading
+    only the journal records appended since they last looked.
+
+    The document is replaced atomically through a temporary file, so a crash
+    mid-write leaves the previous version intact. ``fsync`` decides when data
+    is forced to disk: on every write (``"always"``), at most every
+    ``fsync_interval`` seconds (``"batched"``) or never. A ``commit_window``
+    above zero groups mutations made within that many seconds, such as the
+    history append, dose removal and follow-up of one ``mark_taken``, into a
+    single write; they are visible to this instance at once and to other
+    processes after the window. :meth:`flush` and :meth:`close` write and
+    sync anything outstanding.
 
-    def __init__(self, path: Path):
+    With ``segment_size`` set, history beyond twice that many entries is
+    sealed, oldest first, into immutable segment files under
+    ``<path>.segments/`` (see :mod:`reminders.history_segments`). Only the
+    recent tail stays in the document, and :meth:`iter_history` streams
+    entries from the memory-mapped segments, so queries for the latest few
+    entries or one date range never decode the rest.
+
+    With ``retention_days`` set, :meth:`archive_history` moves older history
+    out of the document and segments into compressed monthly files under
+    ``<path>.archive/`` (see :mod:`reminders.history_archive`). They stay
+    part of :meth:`load_history` results, and aggregates keep counting them.
+    The scheduler calls it while idle.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        journal: bool = False,
+        compact_threshold: int = 1000,
+        cache: bool = False,
+        timestamp_format: str = "iso",
+        fsync: str = "batched",
+        fsync_interval: float = 1.0,
+        commit_window: float = 0.0,
+        segment_size: int = 0,
+        retention_days: Optional[int] = None,
+        archive_compression: str = "gzip",
+    ):
+        if timestamp_format not in TIMESTAMP_FORMATS:
+            raise ValueError(f"Unknown timestamp format: {timestamp_format}")
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
         self.path = Path(path)
         self.path.parent.mkdir(parents=True, exist_ok=True)
         self._lock = threading.RLock()
-        if not self.path.exists():
-            self._write_state(self._initial_state())
+        self.compact_threshold = compact_threshold
+        self._epoch = timestamp_format == "epoch"
+        self._journal: Optional[StorageJournal] = None
+        self._state: Optional[Dict[str, Any]] = None
+        self._seq = 0
+        self._cache: Optional[StorageCache] = StorageCache() if cache else None
+        self._pending: Optional[List[MutationRecord]] = None
+        self._pending_state: Optional[Dict[str, Any]] = None
+        self._pending_version = 0
+        self.fsync = fsync
+        self._deferred = DeferredSync(fsync_interval) if fsync == "batched" else None
+        self.commit_window = commit_window
+        self._group: Optional[List[MutationRecord]] = None
+        self._group_state: Optional[Dict[str, Any]] = None
+        self._group_timer: Optional[threading.Timer] = None
+        self._codec = codec_for_path(self.path)
+        self.segment_size = segment_size
+        self._segments = SegmentStore(self.path.with_name(self.path.name + ".segments"))
+        self.retention_days = retention_days
+        self._archive = HistoryArchive(
+            self.path.with_name(self.path.name + ".archive"), archive_compression
+        )
+        self._file_lock = FileLock(self.path.with_name(self.path.name + ".lock"))
+        self._snapshot_id: Optional[Signature] = None
+        with self._file_lock.acquire():
+            if not self.path.exists():
+                self._write_state(self._initial_state())
+        if journal:
+            self._open_journal()
 
     def _initial_state(self) -> Dict[str, List[Dict]]:
         return {
             "medications": [],
             "upcoming_doses": [],
             "history": [],
+            AGGREGATES_KEY: {},
         }
 
+    def _read_document(self) -> Dict[str, Any]:
+        with self._lock, self._file_lock.acquire(shared=True):
+            return self._codec.load(self.path)
+
+    def _read_seq(self) -> int:
+        with self._lock, self._file_lock.acquire(shared=True):
+            return self._codec.read_seq(self.path)
+
+    def _snapshot_reader(self) -> Optional[SnapshotReader]:
+        """An mmap view of the snapshot when it is binary and holds all the data."""
+        with self._lock:
+            if (
+                not self._codec.binary
+                or self._journal is not None
+                or self._pending is not None
+                or self._group is not None
+            ):
+                return None
+            with self._file_lock.acquire(shared=True):
+                return self._codec.open(self.path)
+
     def _load_state(self) -> Dict[str, List[Dict]]:
         with self._lock:
-            with self.path.open("r", encoding="utf-8") as handle:
-                return json.load(handle)
+            if self._pending_state is not None:
+                return self._pending_state
+            if self._group_state is not None:
+                return self._group_state
+            if self._journal is not None:
+                self._sync_journal()
+                return self._state
+            return self._read_document()
 
     def _write_state(self, state: Dict[str, List[Dict]]) -> None:
         with self._lock:
-            with self.path.open("w", encoding="utf-8") as handle:
-                json.dump(state, handle, indent=2)
+            data = self._codec.dumps(state)
+            atomic_write_bytes(self.path, data, fsync=self.fsync != "never")
+            self._synced(self.path, directory=True)
+
+    def _synced(self, path: Path, directory: bool = False) -> None:
+        """Apply the fsync policy after ``path`` was written."""
+        if self.fsync == "always":
+            if directory:
+                fsync_directory(path.parent)
+        elif self._deferred is not None:
+            self._deferred.mark(path)
+
+    def _commit(self, record: MutationRecord) -> None:
+        with self._lock:
+            if self._pending is not None:
+                record.apply(self._pending_state)
+                self._pending.append(record)
+                return
+            if self.commit_window > 0:
+                self._add_to_group(record)
+                return
+            self._write_records([record])
+
+    # Group commit -------------------------------------------------------
+
+    def _add_to_group(self, record: MutationRecord) -> None:
+        with self._lock:
+            if self._group is None:
+                if self._journal is None:
+                    self._group_state = self._read_document()
+                else:
+                    self._sync_journal()
+                    self._group_state = self._state
+                self._group = []
+                self._group_timer = threading.Timer(self.commit_window, self._flush_in_background)
+                self._group_timer.daemon = True
+                self._group_timer.start()
+            record.apply(self._group_state)
+            self._group.append(record)
+
+    def _flush_in_background(self) -> None:
+        try:
+            self._flush_group()
+        except Exception:
+            LOGGER.exception("Group commit to %s failed", self.path)
+
+    def _flush_group(self) -> None:
+        with self._lock:
+            if self._group_timer is not None:
+                self._group_timer.cancel()
+                self._group_timer = None
+            records, self._group, self._group_state = self._group, None, None
+            if not records:
+                return
+            if self._journal is None:
+                # Re-read and re-apply, so writes from other processes survive.
+                self._write_records(records)
+                return
+            with self._file_lock.acquire():
+                journal_size = (
+                    os.path.getsize(self._journal.path) if self._journal.path.exists() else 0
+                )
+                if (
+                    self._snapshot_id != self._snapshot_signature()
+                    or journal_size != self._journal.offset
+                ):
+                    # Others wrote during the window; put our records after theirs.
+                    self._open_journal()
+                    for record in records:
+                        record.apply(self._state)
+                self._write_records(records, self._state)
+
+    # History segments ---------------------------------------------------
+
+    def _seal_history(self, state: Dict[str, Any]) -> None:
+        """Move the oldest history into segments once it exceeds the limit.
+
+        Segments are written before ``state``, and only a written document
+        that lists them makes them part of the storage.
+        """
+
+        history = state.get("history", [])
+        if not self.segment_size or len(history) < 2 * self.segment_size:
+            return
+        ordered = sorted(history, key=payload_key)
+        names = list(state.get(SEGMENTS_KEY, []))
+        while len(ordered) >= 2 * self.segment_size:
+            chunk, ordered = ordered[: self.segment_size], ordered[self.segment_size :]
+            names.append(self._segments.seal(chunk, fsync=self.fsync != "never"))
+        state["history"] = ordered
+        state[SEGMENTS_KEY] = names
+        if self._cache is not None:
+            self._cache.invalidate()
+
+    def archive_history(self, now: Optional[datetime] = None) -> int:
+        """Move history older than ``retention_days`` into monthly archives.
+
+        Segments are archived whole once their newest entry has expired.
+        Returns how many entries were moved.
+        """
+
+        if not self.retention_days:
+            return 0
+        cutoff = (now or datetime.now()) - timedelta(days=self.retention_days)
+        with self._lock:
+            self._flush_group()
+            with self._file_lock.acquire():
+                if self._journal is None:
+                    state = self._read_document()
+                else:
+                    self._sync_journal()
+                    state = self._state
+                expired: List[Dict[str, Any]] = []
+                kept: List[Dict[str, Any]] = []
+                for payload in state.get("history", []):
+                    (expired if payload_key(payload) < cutoff else kept).append(payload)
+                segments = []
+                for name in state.get(SEGMENTS_KEY, []):
+                    segment = self._segments.segment(name)
+                    if segment.max_key < cutoff:
+                        expired.extend(entry.to_dict(self._epoch) for entry in segment.entries())
+                    else:
+                        segments.append(name)
+                if not expired:
+                    return 0
+
+                by_month: Dict[str, List[Dict[str, Any]]] = {}
+                for payload in expired:
+                    by_month.setdefault(month_key(payload_key(payload)), []).append(payload)
+                archives = dict(state.get(ARCHIVES_KEY, {}))
+                for month, payloads in sorted(by_month.items()):
+                    archives[month] = self._archive.write(
+                        month, payloads, archives.get(month), fsync=self.fsync != "never"
+                    )
+                state["history"] = kept
+                state[SEGMENTS_KEY] = segments
+                state[ARCHIVES_KEY] = archives
+                if self._journal is None:
+                    state[SEQ_KEY] = version = int(state.get(SEQ_KEY, 0)) + 1
+                    self._write_state(state)
+                else:
+                    self._seq = version = self._seq + 1
+                    self.compact()
+                self._file_lock.write_version(version)
+                # Only now that the document no longer lists them.
+                self._archive.prune(state[ARCHIVES_KEY].values())
+                self._segments.prune(state[SEGMENTS_KEY])
+            if self._cache is not None:
+                self._cache.invalidate()
+        LOGGER.info("Archived %s history entries older than %s", len(expired), cutoff)
+        return len(expired)
+
+    def flush(self) -> None:
+        """Write grouped mutations now and fsync everything written so far."""
+        self._flush_group()
+        if self._deferred is not None:
+            self._deferred.sync()
+
+    def close(self) -> None:
+        """Flush outstanding writes, unmap segments and release the lock file."""
+        self.flush()
+        self._segments.close()
+        self._file_lock.close()
+
+    def _write_records(
+        self, records: List[MutationRecord], state: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Persist ``records`` in one write; ``state`` already has them applied."""
+
+        with self._lock, self._file_lock.acquire():
+            cache_fresh = self._cache is not None and self._cache.is_fresh(
+                self._file_signature()
+            )
+            if self._journal is None:
+                if state is None:
+                    state = self._read_document()
+                    for record in records:
+                        record.apply(state)
+                version = int(state.get(SEQ_KEY, 0)) + 1
+                state[SEQ_KEY] = version
+                self._seal_history(state)
+                self._write_state(state)
+            else:
+                if state is None:
+                    # Pick up records other processes appended first.
+                    self._sync_journal()
+                for record in records:
+                    self._seq += 1
+                    record.seq = self._seq
+                self._journal.append(records, fsync=self.fsync == "always")
+                self._synced(self._journal.path)
+                if state is None:
+                    for record in records:
+                        record.apply(self._state)
+                else:
+                    self._state = state
+                version = self._seq
+                if self._journal.record_count >= self.compact_threshold:
+                    self.compact()
+            self._file_lock.write_version(version)
+            if self._cache is None:
+                return
+            # Sealing history invalidates the cache even if it was fresh.
+            if cache_fresh and self._cache.signature is not None:
+                for record in records:
+                    self._cache.apply(record)
+                self._cache.signature = self._file_signature()
+            else:
+                self._cache.invalidate()
+
+    @contextmanager
+    def transaction(self, expected_version: Optional[int] = None) -> Iterator["ReminderStorage"]:
+        """Buffer mutations made in the block and write them together on exit.
+
+        Reads inside the block see the buffered changes; other threads and
+        processes wait until it ends. Nothing is written if the block raises.
+        With ``expected_version`` the block only runs if :attr:`version`
+        still matches, otherwise :class:`StorageConflictError` is raised.
+        A nested block joins the outer transaction.
+        """
+
+        with self._lock:
+            if self._pending is not None:
+                self._check_version(expected_version, self._pending_version)
+                yield self
+                return
+            self._flush_group()
+            with self._file_lock.acquire():
+                if self._journal is None:
+                    state = self._read_document()
+                    version = int(state.get(SEQ_KEY, 0))
+                else:
+                    self._sync_journal()
+                    state, version = self._state, self._seq
+                self._check_version(expected_version, version)
+                self._pending, self._pending_state = [], state
+                self._pending_version = version
+                try:
+                    yield self
+                except BaseException:
+                    self._pending = self._pending_state = None
+                    if self._journal is not None:
+                        # Records were applied to the live state; rebuild it from disk.
+                        self._open_journal()
+                    raise
+                records = self._pending
+                self._pending = self._pending_state = None
+                if records:
+                    self._write_records(records, state)
+
+    @staticmethod
+    def _check_version(expected: Optional[int], actual: int) -> None:
+        if expected is not None and expected != actual:
+            raise StorageConflictError(expected, actual)
+
+    @property
+    def version(self) -> int:
+        """Counter bumped by every write from any process sharing the files.
+
+        Normally read from the lock file's stamp, so polling it never parses
+        the document or journal.
+        """
+
+        stamped = self._file_lock.read_version()
+        if stamped is not None:
+            return stamped
+        with self._lock:
+            if self._journal is not None:
+                self._sync_journal()
+                return self._seq
+            return self._read_seq()
+
+    def _cached(self) -> bool:
+        # Buffered mutations only live in the transaction or group state, so
+        # reads bypass the cache until they are written.
+        return self._cache is not None and self._pending is None and self._group is None
+
+    # Cache helpers ------------------------------------------------------
+
+    def _file_signature(self) -> Signature:
+        paths = [self.path]
+        if self._journal is not None:
+            paths.append(self._journal.path)
+        signature = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                signature.append((0, -1))
+                continue
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def _fresh_cache(self) -> StorageCache:
+        with self._lock:
+            signature = self._file_signature()
+            if self._cache.is_fresh(signature):
+                self._cache.stats.hits += 1
+            else:
+                # Loading may pick up newer writes than ``signature`` covers;
+                # that only costs one extra reload on the next read.
+                self._cache.stats.misses += 1
+                self._cache.load(self._load_state(), signature)
+            return self._cache
+
+    @property
+    def cache_stats(self) -> Optional[CacheStats]:
+        """Hit/miss counters for the cached mode, ``None`` when it is disabled."""
+        return self._cache.stats if self._cache is not None else None
+
+    # Journal helpers ----------------------------------------------------
+
+    def _snapshot_signature(self) -> Signature:
+        stat = os.stat(self.path)
+        return ((stat.st_mtime_ns, stat.st_size, stat.st_ino),)
+
+    def _open_journal(self) -> None:
+        with self._lock:
+            with self._file_lock.acquire(shared=True):
+                self._journal = StorageJournal(self.path.with_name(self.path.name + ".journal"))
+                state = self._read_document()
+                self._snapshot_id = self._snapshot_signature()
+                self._seq = int(state.get(SEQ_KEY, 0))
+                for record in self._journal.replay(after_seq=self._seq):
+                    record.apply(state)
+                    self._seq = record.seq
+                self._state = state
+            if self._journal.record_count >= self.compact_threshold:
+                self.compact()
+
+    def _sync_journal(self) -> None:
+        """Apply journal records other processes appended since the last look.
+
+        A snapshot rewritten by another process's compaction means the journal
+        was truncated under us, so everything is replayed from disk instead.
+        """
+
+        with self._lock:
+            with self._file_lock.acquire(shared=True):
+                if self._snapshot_id == self._snapshot_signature():
+                    records = self._journal.read_tail()
+                    if records is not None:
+                        for record in records:
+                            if record.seq > self._seq:
+                                record.apply(self._state)
+                                self._seq = record.seq
+                        return
+            self._open_journal()
+
+    @property
+    def journaled(self) -> bool:
+        return self._journal is not None
+
+    def compact(self) -> None:
+        """Fold the journal into a fresh snapshot and truncate it."""
+        with self._lock, self._file_lock.acquire():
+            if self._journal is None:
+                return
+            self._flush_group()
+            self._sync_journal()
+            self._state[SEQ_KEY] = self._seq
+            self._seal_history(self._state)
+            self._write_state(self._state)
+            self._journal.truncate()
+            self._snapshot_id = self._snapshot_signature()
 
     # Medication helpers -------------------------------------------------
 
     def load_medications(self) -> List[models.Medication]:
+        if self._cached():
+            return self._fresh_cache().medication_list()
         state = self._load_state()
         return models.deserialize_medications(state.get("medications", []))
 
     def save_medications(self, medications: Iterable[models.Medication]) -> None:
-        state = self._load_state()
-        state["medications"] = models.serialize_collection(medications)
-        self._write_state(state)
+        payload = models.serialize_collection(medications, self._epoch)
+        self._commit(MutationRecord(journal.REPLACE_MEDICATIONS, payload))
 
     def upsert_medication(self, medication: models.Medication) -> None:
-        medications = {item.medication_id: item for item in self.load_medications()}
-        medications[medication.medication_id] = medication
-        self.save_medications(medications.values())
+        payload = medication.to_dict(self._epoch)
+        self._commit(MutationRecord(journal.UPSERT_MEDICATION, payload))
 
     def get_medication(self, medication_id: str) -> Optional[models.Medication]:
+        if self._cached():
+            return self._fresh_cache().medication(medication_id)
+        reader = self._snapshot_reader()
+        if reader is not None:
+            with reader:
+                payload = reader.medication(medication_id)
+            return models.Medication.from_dict(payload) if payload else None
         return next(
             (item for item in self.load_medications() if item.medication_id == medication_id),
             None,
@@ -61,24 +584,30 @@ class ReminderStorage:
     # Upcoming dose helpers ---------------------------------------------
 
     def load_upcoming_doses(self) -> List[models.UpcomingDose]:
+        if self._cached():
+            return self._fresh_cache().upcoming_dose_list()
         state = self._load_state()
         return models.deserialize_upcoming_doses(state.get("upcoming_doses", []))
 
     def save_upcoming_doses(self, doses: Iterable[models.UpcomingDose]) -> None:
-        state = self._load_state()
-        state["upcoming_doses"] = models.serialize_collection(doses)
-        self._write_state(state)
+        payload = models.serialize_collection(doses, self._epoch)
+        self._commit(MutationRecord(journal.REPLACE_UPCOMING_DOSES, payload))
 
     def upsert_upcoming_dose(self, dose: models.UpcomingDose) -> None:
-        doses = {item.dose_id: item for item in self.load_upcoming_doses()}
-        doses[dose.dose_id] = dose
-        self.save_upcoming_doses(doses.values())
+        payload = dose.to_dict(self._epoch)
+        self._commit(MutationRecord(journal.UPSERT_UPCOMING_DOSE, payload))
 
     def remove_upcoming_dose(self, dose_id: str) -> None:
-        doses = [item for item in self.load_upcoming_doses() if item.dose_id != dose_id]
-        self.save_upcoming_doses(doses)
+        self._commit(MutationRecord(journal.REMOVE_UPCOMING_DOSE, dose_id))
 
     def get_upcoming_dose(self, dose_id: str) -> Optional[models.UpcomingDose]:
+        if self._cached():
+            return self._fresh_cache().upcoming_dose(dose_id)
+        reader = self._snapshot_reader()
+        if reader is not None:
+            with reader:
+                payload = reader.upcoming_dose(dose_id)
+            return models.UpcomingDose.from_dict(payload) if payload else None
         return next(
             (item for item in self.load_upcoming_doses() if item.dose_id == dose_id),
             None,
@@ -86,22 +615,166 @@ class ReminderStorage:
 
     # History helpers ----------------------------------------------------
 
-    def load_history(self) -> List[models.DoseHistoryEntry]:
-        state = self._load_state()
-        return models.deserialize_history(state.get("history", []))
+    def load_history(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        *,
+        medication_id: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: Optional[int] = None,
+        reverse: bool = False,
+    ) -> List[models.DoseHistoryEntry]:
+        """History recorded in ``[start, end)``, oldest first unless ``reverse``.
+
+        Entries are ordered by their timestamp (falling back to ``acted_at``).
+        The cached mode keeps the sorted index in memory between calls.
+        """
+
+        if limit is not None and limit <= 0:
+            return []
+        entries = self._iter_history(start, end, medication_id, status, limit, reverse)
+        return list(islice(entries, limit))
+
+    def iter_history(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        *,
+        medication_id: Optional[str] = None,
+        status: Optional[str] = None,
+        reverse: bool = False,
+    ) -> Iterator[models.DoseHistoryEntry]:
+        """Lazily yield what :meth:`load_history` returns.
+
+        Sealed segments whose footer rules out the filters are skipped, and
+        the rest are decoded one entry at a time, so stopping early, e.g.
+        after the newest ten entries, leaves older history untouched.
+        """
+
+        return self._iter_history(start, end, medication_id, status, None, reverse)
+
+    def _iter_history(
+        self,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        medication_id: Optional[str],
+        status: Optional[str],
+        limit: Optional[int],
+        reverse: bool,
+    ) -> Iterator[models.DoseHistoryEntry]:
+        # The first ``limit`` merged entries hold at most ``limit`` from the
+        # tail, so the tail query can stop there.
+        if self._cached():
+            cache = self._fresh_cache()
+            tail = cache.history_list(start, end, medication_id, status, limit, reverse)
+            names, archives = cache.segment_names, cache.archive_names
+        else:
+            reader = self._snapshot_reader()
+            if reader is not None:
+                # Only entries inside the range are decoded from the mapped file.
+                with reader:
+                    payload = list(reader.history(start, end))
+                    meta = reader.metadata()
+            else:
+                meta = self._load_state()
+                payload = meta.get("history", [])
+            names = list(meta.get(SEGMENTS_KEY, []))
+            archives = dict(meta.get(ARCHIVES_KEY, {}))
+            tail = query_payloads(payload, start, end, medication_id, status, limit, reverse)
+        if not names and not archives:
+            yield from tail
+            return
+        # Archived months hold the oldest entries, then segments in sealing order.
+        sources: List[Any] = [self._archive.month(archives[month]) for month in sorted(archives)]
+        sources.extend(self._segments.segment(name) for name in names)
+        yield from merge_history(sources, tail, start, end, medication_id, status, reverse)
+
+    def load_aggregates(self) -> AdherenceAggregates:
+        """Per-day/week/month status counts, kept up to date on every append."""
+
+        if self._cached():
+            return AdherenceAggregates(self._fresh_cache().aggregate_data())
+        return AdherenceAggregates(aggregates_from_state(self._load_state()))
+
+    def load_rollups(
+        self, start: Optional[date] = None, end: Optional[date] = None
+    ) -> Dict[date, DailyRollup]:
+        """Daily rollups for days in ``[start, end)``, keyed by day."""
+
+        if self._cached():
+            return rollups_from_data(self._fresh_cache().rollups, start, end)
+        return rollups_from_data(self._load_state().get(ROLLUPS_KEY, {}), start, end)
+
+    def save_rollups(self, rollups: Iterable[DailyRollup]) -> None:
+        payload = [rollup.to_dict() for rollup in rollups]
+        if payload:
+            self._commit(MutationRecord(journal.PUT_ROLLUPS, payload))
 
     def append_history(self, entry: models.DoseHistoryEntry) -> None:
-        state = self._load_state()
-        history = state.get("history", [])
-        history.append(entry.to_dict())
-        state["history"] = history
-        self._write_state(state)
+        payload = entry.to_dict(self._epoch)
+        self._commit(MutationRecord(journal.APPEND_HISTORY, payload))
+
+    def append_history_many(self, entries: Iterable[models.DoseHistoryEntry]) -> None:
+        """Append several history entries with a single write."""
+        payload = models.serialize_collection(entries, self._epoch)
+        if payload:
+            self._commit(MutationRecord(journal.EXTEND_HISTORY, payload))
 
     # Utilities ----------------------------------------------------------
 
     def reset(self) -> None:
         """Reset storage to an empty state."""
-        self._write_state(self._initial_state())
+        with self._lock, self._file_lock.acquire():
+            self._group = self._group_state = None
+            self._segments.prune()
+            self._archive.prune()
+            state = self._initial_state()
+            if self._journal is None:
+                state[SEQ_KEY] = version = self._read_seq() + 1
+                self._write_state(state)
+            else:
+                self._sync_journal()
+                self._seq = version = self._seq + 1
+                self._state = state
+                self.compact()
+            self._file_lock.write_version(version)
+        if self._cache is not None:
+            self._cache.invalidate()
+
+
+StorageEngine = Union[ReminderStorage, SQLiteReminderStorage]
+
+
+def open_storage(location: Union[str, Path], **options: Any) -> StorageEngine:
+    """Open a storage engine selected by URL scheme or file extension.
+
+    ``sqlite:///data/reminders.db`` and paths ending in ``.db``/``.sqlite`` open
+    :class:`SQLiteReminderStorage`; ``json:///data/reminders.json`` and any other
+    path open :class:`ReminderStorage` with ``options`` passed through.
+    """
+
+    text = str(location)
+    scheme, separator, remainder = text.partition("://")
+    if separator:
+        # Follow the SQLAlchemy convention: sqlite:///relative, sqlite:////absolute.
+        path = Path(remainder[1:] if remainder.startswith("/") else remainder)
+        scheme = scheme.lower()
+    else:
+        path = Path(text)
+        scheme = "sqlite" if path.suffix.lower() in SQLITE_SUFFIXES else "json"
+
+    if scheme == "sqlite":
+        return SQLiteReminderStorage(path)
+    if scheme == "json":
+        return ReminderStorage(path, **options)
+    raise ValueError(f"Unsupported storage scheme: {scheme}")
 
 
-__all__ = ["ReminderStorage"]
+__all__ = [
+    "ReminderStorage",
+    "SQLiteReminderStorage",
+    "StorageConflictError",
+    "StorageEngine",
+    "open_storage",
+]
@@ -1,3 +1,3 @@
 """User-interface helpers for the reminder system."""
 
-__all__ = ["alerts", "notifications", "app", "history"]
+__all__ = ["alerts", "notifications", "app", "history", "table", "loader", "dialogs"]
@@ -1,13 +1,16 @@
 """Tkinter application shell for managing medication reminders."""
 from __future__ import annotations
 
-from datetime import datetime, time as time_cls
-from typing import Any, Dict, Iterable, List, Mapping, Optional
+import threading
+from datetime import datetime, time as time_cls, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
 
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 
-from .history import HistoryMetrics, calculate_metrics, filter_history_entries
+from .history import ColumnarHistory, HistoryMetrics, metrics_from_summary
+from .loader import BackgroundLoader
+from .table import CallbackSource, VirtualTable
 from ..features import MedicationLabelScanner, OCRFailure
 
 
@@ -161,6 +164,10 @@ class ReminderApp:
 
         self.scanner = MedicationLabelScanner()
         self._medication_cache: Dict[str, Mapping[str, Any]] = {}
+        self._action_count = 0
+        self._history_columns: Optional[ColumnarHistory] = None
+        self._history_lock = threading.Lock()
+        self.loader = BackgroundLoader(self.root, on_busy_changed=self._on_loading_changed)
 
         self._build_layout()
         self.refresh_medications()
@@ -183,6 +190,10 @@ class ReminderApp:
         self._build_schedule_section(container)
         self._build_history_section(container)
 
+        self.status_var = tk.StringVar(value="Ready")
+        status_label = ttk.Label(self.root, textvariable=self.status_var, padding=(10, 0, 10, 6))
+        status_label.grid(row=1, column=0, sticky="ew")
+
     def _build_form_section(self, container: ttk.Frame) -> None:
         form_holder = ttk.Frame(container)
         form_holder.grid(row=0, column=0, rowspan=2, sticky="nsew", padx=(0, 12))
@@ -217,13 +228,13 @@ class ReminderApp:
         medications_frame.rowconfigure(0, weight=1)
 
         medication_columns = ("name", "dosage", "schedule", "medication_id")
-        self.medications_tree = ttk.Treeview(
+        self.medications_tree = VirtualTable(
             medications_frame,
             columns=medication_columns,
+            displaycolumns=("name", "dosage", "schedule"),
             show="headings",
             height=6,
         )
-        self.medications_tree["displaycolumns"] = ("name", "dosage", "schedule")
         self.medications_tree.heading("name", text="Name")
         self.medications_tree.heading("dosage", text="Dosage")
         self.medications_tree.heading("schedule", text="Schedule")
@@ -234,12 +245,6 @@ class ReminderApp:
         self.medications_tree.grid(row=0, column=0, sticky="nsew")
         self.medications_tree.bind("<<TreeviewSelect>>", self.on_medication_select)
 
-        medications_scroll = ttk.Scrollbar(
-            medications_frame, orient=tk.VERTICAL, command=self.medications_tree.yview
-        )
-        medications_scroll.grid(row=0, column=1, sticky="ns")
-        self.medications_tree.configure(yscrollcommand=medications_scroll.set)
-
     def _build_schedule_section(self, container: ttk.Frame) -> None:
         schedule_frame = ttk.LabelFrame(container, text="Upcoming Schedule")
         schedule_frame.grid(row=0, column=1, sticky="nsew")
@@ -293,8 +298,12 @@ class ReminderApp:
         tree_container.rowconfigure(0, weight=1)
 
         columns = ("medication", "due", "status", "medication_id")
-        self.schedule_tree = ttk.Treeview(tree_container, columns=columns, show="headings")
-        self.schedule_tree["displaycolumns"] = ("medication", "due", "status")
+        self.schedule_tree = VirtualTable(
+            tree_container,
+            columns=columns,
+            displaycolumns=("medication", "due", "status"),
+            show="headings",
+        )
         self.schedule_tree.heading("medication", text="Medication")
         self.schedule_tree.heading("due", text="Due")
         self.schedule_tree.heading("status", text="Status")
@@ -305,10 +314,6 @@ class ReminderApp:
         self.schedule_tree.grid(row=0, column=0, sticky="nsew")
         self.schedule_tree.bind("<<TreeviewSelect>>", self.on_schedule_select)
 
-        scrollbar = ttk.Scrollbar(tree_container, orient=tk.VERTICAL, command=self.schedule_tree.yview)
-        scrollbar.grid(row=0, column=1, sticky="ns")
-        self.schedule_tree.configure(yscrollcommand=scrollbar.set)
-
     def _build_history_section(self, container: ttk.Frame) -> None:
         history_frame = ttk.LabelFrame(container, text="Dose History")
         history_frame.grid(row=1, column=1, sticky="nsew", pady=(12, 0))
@@ -349,7 +354,7 @@ class ReminderApp:
         tree_container.rowconfigure(0, weight=1)
 
         history_columns = ("medication", "scheduled", "status", "acted", "notes")
-        self.history_tree = ttk.Treeview(tree_container, columns=history_columns, show="headings")
+        self.history_tree = VirtualTable(tree_container, columns=history_columns, show="headings")
         self.history_tree.heading("medication", text="Medication")
         self.history_tree.heading("scheduled", text="Scheduled")
         self.history_tree.heading("status", text="Status")
@@ -362,18 +367,12 @@ class ReminderApp:
         self.history_tree.column("notes", width=260, anchor=tk.W)
         self.history_tree.grid(row=0, column=0, sticky="nsew")
 
-        history_scroll = ttk.Scrollbar(
-            tree_container, orient=tk.VERTICAL, command=self.history_tree.yview
-        )
-        history_scroll.grid(row=0, column=1, sticky="ns")
-        self.history_tree.configure(yscrollcommand=history_scroll.set)
-
         missed_frame = ttk.LabelFrame(history_frame, text="Missed Doses by Medication")
         missed_frame.grid(row=3, column=0, sticky="ew", padx=8, pady=(0, 8))
         missed_frame.columnconfigure(0, weight=1)
 
         missed_columns = ("medication", "count")
-        self.history_missed_tree = ttk.Treeview(
+        self.history_missed_tree = VirtualTable(
             missed_frame,
             columns=missed_columns,
             show="headings",
@@ -416,20 +415,30 @@ class ReminderApp:
                 payload["times"] = list(times_of_day)
         return payload
 
+    # Controller calls run on the background loader; each refresh reads the
+    # Tk variables first, loads on a worker and applies the result on the
+    # main loop. A newer refresh of the same pane drops an older one.
     def refresh_medications(self) -> None:
         loader = getattr(self.controller, "list_medications", None)
-        medications: Iterable[Any]
-        if callable(loader):
-            medications = loader()
-        else:
-            medications = []
-
-        cache: Dict[str, Mapping[str, Any]] = {}
-        for item in medications:
-            payload = self._medication_payload(item)
-            if not payload:
-                continue
-            cache[payload["medication_id"]] = payload
+
+        def _load() -> Dict[str, Mapping[str, Any]]:
+            medications: Iterable[Any]
+            if callable(loader):
+                medications = loader()
+            else:
+                medications = []
+
+            cache: Dict[str, Mapping[str, Any]] = {}
+            for item in medications:
+                payload = self._medication_payload(item)
+                if not payload:
+                    continue
+                cache[payload["medication_id"]] = payload
+            return cache
+
+        self.loader.submit("medications", _load, self._apply_medications, self._on_load_failed)
+
+    def _apply_medications(self, cache: Dict[str, Mapping[str, Any]]) -> None:
         self._medication_cache = cache
         self._update_medication_tree()
 
@@ -445,10 +454,6 @@ class ReminderApp:
         if not selected_id:
             selected_id = self.form.current_medication_id
 
-        items = tree.get_children()
-        if items:
-            tree.delete(*items)
-
         def _schedule_summary(payload: Mapping[str, Any]) -> str:
             times_value = payload.get("times") or []
             formatted_times: List[str] = []
@@ -465,23 +470,23 @@ class ReminderApp:
                 return f"Every {frequency} min"
             return ""
 
-        for medication_id, payload in sorted(
-            self._medication_cache.items(), key=lambda item: item[1].get("name", "").lower()
-        ):
-            schedule_text = _schedule_summary(payload)
-            tree.insert(
-                "",
-                tk.END,
-                iid=medication_id,
-                values=(
+        rows = [
+            (
+                medication_id,
+                (
                     payload.get("name", ""),
                     payload.get("dosage", ""),
-                    schedule_text,
+                    _schedule_summary(payload),
                     medication_id,
                 ),
             )
+            for medication_id, payload in sorted(
+                self._medication_cache.items(), key=lambda item: item[1].get("name", "").lower()
+            )
+        ]
+        tree.set_rows(rows)
 
-        if selected_id and tree.exists(selected_id):
+        if selected_id and tree.exists(selected_id) and tree.selection() != (selected_id,):
             tree.selection_set(selected_id)
             tree.see(selected_id)
 
@@ -491,45 +496,53 @@ class ReminderApp:
         status_filter = self.schedule_status_var.get()
         status_value = status_filter if status_filter and status_filter != "All" else None
 
-        doses: Iterable[Any]
-        if callable(loader):
-            params: Dict[str, Any] = {}
-            if filter_text:
-                params["filter_text"] = filter_text
-            if status_value:
-                params["status"] = status_value
-            doses = loader(**params)
-        else:
-            doses = []
-
-        for child in self.schedule_tree.get_children():
-            self.schedule_tree.delete(child)
-
-        for index, dose in enumerate(doses):
-            dose_id = _from_mapping_or_attr(dose, "dose_id", f"dose-{index}")
-            medication = _from_mapping_or_attr(dose, "medication_name")
-            medication_id = _from_mapping_or_attr(dose, "medication_id", "")
-            if not medication:
-                medication = medication_id
-            due = _from_mapping_or_attr(dose, "effective_due_time")
-            if callable(due):
-                due = due()
-            if due is None:
-                due = _from_mapping_or_attr(dose, "scheduled_time")
-            due_dt = _coerce_datetime(due)
-            due_display = due_dt.strftime("%Y-%m-%d %H:%M") if due_dt else str(due or "")
-            status = _from_mapping_or_attr(dose, "status", "")
-
-            iid = dose_id or f"dose-{index}"
-            self.schedule_tree.insert(
-                "",
-                tk.END,
-                iid=iid,
-                values=(medication, due_display, status, medication_id),
-            )
+        params: Dict[str, Any] = {}
+        if filter_text:
+            params["filter_text"] = filter_text
+        if status_value:
+            params["status"] = status_value
+
+        def _load() -> List[Tuple[str, Tuple[Any, ...]]]:
+            doses: Iterable[Any]
+            if callable(loader):
+                doses = loader(**params)
+            else:
+                doses = []
+
+            rows = []
+            for index, dose in enumerate(doses):
+                dose_id = _from_mapping_or_attr(dose, "dose_id", f"dose-{index}")
+                medication = _from_mapping_or_attr(dose, "medication_name")
+                medication_id = _from_mapping_or_attr(dose, "medication_id", "")
+                if not medication:
+                    medication = medication_id
+                due = _from_mapping_or_attr(dose, "effective_due_time")
+                if callable(due):
+                    due = due()
+                if due is None:
+                    due = _from_mapping_or_attr(dose, "scheduled_time")
+                due_dt = _coerce_datetime(due)
+                due_display = due_dt.strftime("%Y-%m-%d %H:%M") if due_dt else str(due or "")
+                status = _from_mapping_or_attr(dose, "status", "")
+
+                iid = dose_id or f"dose-{index}"
+                rows.append((iid, (medication, due_display, status, medication_id)))
+            return rows
+
+        self.loader.submit("schedule", _load, self.schedule_tree.set_rows, self._on_load_failed)
 
     def refresh_history(self) -> None:
-        loader = getattr(self.controller, "list_history", None)
+        """Reload the history pane for the selected date range.
+
+        Controllers that implement ``count_history``, ``history_page`` and
+        ``history_metrics`` are paged lazily on the loader as the table
+        scrolls; only the count, metrics and first page are loaded up front.
+        Otherwise ``list_history`` is loaded into long-lived columns once and
+        each refresh only adds what was recorded since. Either way, a controller
+        with ``summarize_history`` supplies the metrics from daily rollups
+        instead of re-aggregating the raw entries.
+        """
+
         start_raw = self.history_start_var.get().strip()
         end_raw = self.history_end_var.get().strip()
 
@@ -546,50 +559,128 @@ class ReminderApp:
             except ValueError:
                 self._show_warning("Invalid end date format. Use YYYY-MM-DD.")
 
-        history: Iterable[Any]
-        if callable(loader):
-            params = {}
-            if start_dt:
-                params["start"] = start_dt
-            if end_dt:
-                params["end"] = end_dt
-            history = loader(**params)
+        params: Dict[str, Any] = {}
+        if start_dt:
+            params["start"] = start_dt
+        if end_dt:
+            # Storage ranges are half-open; the end date itself is included.
+            params["end"] = end_dt + timedelta(days=1)
+
+        rollups = getattr(self.controller, "summarize_history", None)
+
+        def _metrics(fallback: Callable[[], HistoryMetrics]) -> HistoryMetrics:
+            if not callable(rollups):
+                return fallback()
+            labels = {
+                medication_id: payload.get("name") or medication_id
+                for medication_id, payload in self._medication_cache.items()
+            }
+            return metrics_from_summary(rollups(**params), labels)
+
+        counter = getattr(self.controller, "count_history", None)
+        pager = getattr(self.controller, "history_page", None)
+        summarizer = getattr(self.controller, "history_metrics", None)
+        if callable(counter) and callable(pager) and (callable(summarizer) or callable(rollups)):
+
+            def _fetch(offset: int, limit: int) -> List[Any]:
+                seen: Dict[str, int] = {}
+                return [self._history_row(entry, seen) for entry in pager(offset, limit, **params)]
+
+            def _request_page(number: int) -> None:
+                # Pages scrolled into view load on the worker, never on the Tk thread.
+                source = self.history_tree.source
+
+                def _fill(rows: List[Any]) -> None:
+                    if self.history_tree.source is source:
+                        source.add_page(number, rows)
+                        self.history_tree.render()
+
+                size = source.page_size
+                self.loader.submit(
+                    f"history-page-{number}",
+                    lambda: _fetch(number * size, size),
+                    _fill,
+                    self._on_load_failed,
+                )
+
+            def _load_lazy() -> Tuple[HistoryMetrics, CallbackSource]:
+                metrics = _metrics(lambda: summarizer(**params))
+                total = counter(**params)
+                source = CallbackSource(lambda: total, _fetch, request_page=_request_page)
+                source.add_page(0, _fetch(0, source.page_size))
+                return metrics, source
+
+            def _apply_lazy(result: Tuple[HistoryMetrics, CallbackSource]) -> None:
+                metrics, source = result
+                self._update_history_summary(metrics)
+                self._update_missed_by_medication(metrics)
+                self.history_tree.set_source(source)
+
+            self.loader.submit("history", _load_lazy, _apply_lazy, self._on_load_failed)
+            return
+
+        loader = getattr(self.controller, "list_history", None)
+
+        def _load() -> Tuple[HistoryMetrics, List[Tuple[str, Tuple[Any, ...]]]]:
+            # A superseded refresh may still be running on another worker.
+            with self._history_lock:
+                columns = self._load_history_columns(loader)
+                filter_result = columns.filter(start_dt, end_dt)
+                metrics = _metrics(lambda: columns.metrics(start_dt, end_dt))
+            seen: Dict[str, int] = {}
+            rows = [self._history_row(entry, seen) for entry in filter_result.entries]
+            return metrics, rows
+
+        def _apply(result: Tuple[HistoryMetrics, List[Tuple[str, Tuple[Any, ...]]]]) -> None:
+            metrics, rows = result
+            self._update_history_summary(metrics)
+            self._update_missed_by_medication(metrics)
+            self.history_tree.set_rows(rows)
+
+        self.loader.submit("history", _load, _apply, self._on_load_failed)
+
+    def _load_history_columns(self, loader: Any) -> ColumnarHistory:
+        """The pane's history columns, topped up with entries recorded since the last load.
+
+        History is append-only and entries are recorded at the current time,
+        so only entries after the newest one held need converting.
+        """
+
+        if not callable(loader):
+            return ColumnarHistory()
+        columns = self._history_columns
+        newest = columns.newest if columns is not None else None
+        if newest is None:
+            self._history_columns = columns = ColumnarHistory(loader())
         else:
-            history = []
-
-        history_list = list(history)
-        filter_result = filter_history_entries(history_list, start_dt, end_dt)
-        metrics = calculate_metrics(filter_result)
-        filtered_history = filter_result.entries
-
-        self._update_history_summary(metrics)
-        self._update_missed_by_medication(metrics)
-
-        for child in self.history_tree.get_children():
-            self.history_tree.delete(child)
-
-        for index, entry in enumerate(filtered_history):
-            medication = _from_mapping_or_attr(entry, "medication_name")
-            if not medication:
-                medication = _from_mapping_or_attr(entry, "medication_id", "")
-            scheduled = _from_mapping_or_attr(entry, "scheduled_time")
-            scheduled_dt = _coerce_datetime(scheduled)
-            scheduled_display = (
-                scheduled_dt.strftime("%Y-%m-%d %H:%M") if scheduled_dt else str(scheduled or "")
-            )
-            status = _from_mapping_or_attr(entry, "status", "")
-            acted = _from_mapping_or_attr(entry, "acted_at")
-            acted_dt = _coerce_datetime(acted)
-            acted_display = acted_dt.strftime("%Y-%m-%d %H:%M") if acted_dt else str(acted or "")
-            notes = _from_mapping_or_attr(entry, "notes", "")
-
-            iid = f"history-{index}"
-            self.history_tree.insert(
-                "",
-                tk.END,
-                iid=iid,
-                values=(medication, scheduled_display, status, acted_display, notes),
-            )
+            columns.extend(loader(start=newest + timedelta(microseconds=1)))
+        return columns
+
+    def _history_row(self, entry: Any, seen: Dict[str, int]) -> Tuple[str, Tuple[Any, ...]]:
+        medication = _from_mapping_or_attr(entry, "medication_name")
+        if not medication:
+            medication = _from_mapping_or_attr(entry, "medication_id", "")
+        scheduled = _from_mapping_or_attr(entry, "scheduled_time")
+        scheduled_dt = _coerce_datetime(scheduled)
+        scheduled_display = (
+            scheduled_dt.strftime("%Y-%m-%d %H:%M") if scheduled_dt else str(scheduled or "")
+        )
+        status = _from_mapping_or_attr(entry, "status", "")
+        acted = _from_mapping_or_attr(entry, "acted_at")
+        acted_dt = _coerce_datetime(acted)
+        acted_display = acted_dt.strftime("%Y-%m-%d %H:%M") if acted_dt else str(acted or "")
+        notes = _from_mapping_or_attr(entry, "notes", "")
+
+        # Key rows by what they record rather than by position, so a refresh
+        # after one new entry leaves every other row untouched.
+        recorded = _from_mapping_or_attr(entry, "timestamp") or acted
+        base = "history|{}|{}|{}".format(
+            _from_mapping_or_attr(entry, "dose_id", ""), status, recorded or ""
+        )
+        duplicates = seen.get(base, 0)
+        seen[base] = duplicates + 1
+        key = base if not duplicates else f"{base}|{duplicates}"
+        return key, (medication, scheduled_display, status, acted_display, notes)
 
     def _update_history_summary(self, metrics: HistoryMetrics) -> None:
         if metrics.total == 0:
@@ -606,21 +697,23 @@ class ReminderApp:
             snoozed=metrics.snoozed,
             adherence=metrics.adherence_percent,
         )
+        if metrics.lateness_p50_minutes is not None:
+            summary_text += " | Late p50/p95: {p50:.0f}/{p95:.0f} min".format(
+                p50=metrics.lateness_p50_minutes,
+                p95=metrics.lateness_p95_minutes,
+            )
         self.history_summary_var.set(summary_text)
 
     def _update_missed_by_medication(self, metrics: HistoryMetrics) -> None:
         if not hasattr(self, "history_missed_tree"):
             return
 
-        for child in self.history_missed_tree.get_children():
-            self.history_missed_tree.delete(child)
-
-        if not metrics.missed_by_medication:
-            return
-
-        for index, (medication, count) in enumerate(metrics.missed_by_medication.items()):
-            iid = f"missed-{index}"
-            self.history_missed_tree.insert("", tk.END, iid=iid, values=(medication, count))
+        self.history_missed_tree.set_rows(
+            [
+                (f"missed|{medication}", (medication, count))
+                for medication, count in metrics.missed_by_medication.items()
+            ]
+        )
 
     # Event handlers -------------------------------------------------
     def on_scan_label(self) -> None:
@@ -687,10 +780,8 @@ class ReminderApp:
             self._show_warning("Add medication action is not available.")
             return
         payload = self.form.get_form_data()
-        action(payload)
+        self._run_action(lambda: action(payload), self.refresh_medications, self.refresh_schedule)
         self.form.reset()
-        self.refresh_medications()
-        self.refresh_schedule()
 
     def on_edit_medication(self) -> None:
         action = getattr(self.controller, "edit_medication", None)
@@ -702,9 +793,9 @@ class ReminderApp:
         if not medication_id:
             self._show_warning("Select a medication to edit.")
             return
-        action(medication_id, payload)
-        self.refresh_medications()
-        self.refresh_schedule()
+        self._run_action(
+            lambda: action(medication_id, payload), self.refresh_medications, self.refresh_schedule
+        )
 
     def on_delete_medication(self) -> None:
         action = getattr(self.controller, "delete_medication", None)
@@ -717,10 +808,8 @@ class ReminderApp:
             return
         if not messagebox.askyesno("Confirm", "Delete this medication?"):
             return
-        action(medication_id)
+        self._run_action(lambda: action(medication_id), self.refresh_medications, self.refresh_schedule)
         self.form.reset()
-        self.refresh_medications()
-        self.refresh_schedule()
 
     def on_mark_taken(self) -> None:
         action = getattr(self.controller, "mark_dose_taken", None)
@@ -730,9 +819,7 @@ class ReminderApp:
         dose_id = self._selected_dose_id()
         if not dose_id:
             return
-        action(dose_id)
-        self.refresh_schedule()
-        self.refresh_history()
+        self._run_action(lambda: action(dose_id), self.refresh_schedule, self.refresh_history)
 
     def on_mark_missed(self) -> None:
         action = getattr(self.controller, "mark_dose_missed", None)
@@ -742,9 +829,7 @@ class ReminderApp:
         dose_id = self._selected_dose_id()
         if not dose_id:
             return
-        action(dose_id)
-        self.refresh_schedule()
-        self.refresh_history()
+        self._run_action(lambda: action(dose_id), self.refresh_schedule, self.refresh_history)
 
     def on_schedule_select(self, _event: Any) -> None:
         selection = self.schedule_tree.selection()
@@ -804,6 +889,31 @@ class ReminderApp:
             self.medications_tree.selection_set(medication_id)
             self.medications_tree.see(medication_id)
 
+    def _run_action(self, work: Callable[[], Any], *refreshes: Callable[[], None]) -> None:
+        """Run a controller mutation in the background, then ``refreshes``."""
+
+        # Every action gets its own channel, so a second click must not cancel
+        # a write that is still queued; the serial worker keeps them in order.
+        self._action_count += 1
+
+        def _done(_result: Any) -> None:
+            for refresh in refreshes:
+                refresh()
+
+        self.loader.submit(
+            f"action-{self._action_count}", work, _done, self._on_action_failed, serial=True
+        )
+
+    def _on_loading_changed(self, busy: bool) -> None:
+        self.status_var.set("Loading…" if busy else "Ready")
+        self.root.configure(cursor="watch" if busy else "")
+
+    def _on_load_failed(self, error: BaseException) -> None:
+        self._show_warning(f"Could not load data: {error}")
+
+    def _on_action_failed(self, error: BaseException) -> None:
+        self._show_warning(f"The action failed: {error}")
+
     def _show_warning(self, message: str) -> None:
         messagebox.showwarning("Medication Reminder", message)
 
@@ -812,7 +922,10 @@ class ReminderApp:
 
     # Public API -----------------------------------------------------
     def run(self) -> None:
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            self.loader.shutdown()
 
 
 __all__ = ["ReminderApp", "MedicationFormFrame"]
@@ -0,0 +1,337 @@
+"""One long-lived Tk root that renders due-dose alerts from any thread."""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+try:
+    import tkinter as tk
+    from tkinter import ttk
+except Exception:  # pragma: no cover - Tk is optional in some environments
+    tk = None  # type: ignore
+    ttk = None  # type: ignore
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class DueAlert:
+    """A due dose and the callbacks that resolve it."""
+
+    dose: Any
+    medication: Any
+    on_taken: Callable[[], None]
+    on_snooze: Callable[[int], None]
+    on_skip: Callable[[], None]
+    skip_label: str = "Skip"
+
+
+def snooze_minutes(value: Any, default: int) -> int:
+    """Parse a snooze entry, falling back to ``default``; at least one minute."""
+    try:
+        minutes = int(value)
+    except (TypeError, ValueError):
+        minutes = default
+    return max(minutes, 1)
+
+
+class AlertBatch:
+    """Alerts shown in one dialog; each action resolves some of them."""
+
+    def __init__(self, alerts: Iterable[DueAlert]) -> None:
+        self.pending: List[DueAlert] = list(alerts)
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    @property
+    def done(self) -> bool:
+        return not self.pending
+
+    def resolve(
+        self,
+        action: str,
+        indices: Optional[Sequence[int]] = None,
+        minutes: int = 10,
+    ) -> List[DueAlert]:
+        """Apply ``action`` ("taken", "snoozed" or "skipped") to pending alerts.
+
+        ``indices`` picks alerts by position in :attr:`pending`; ``None``
+        means all of them. A failing callback is logged and does not stop
+        the rest of the batch. Returns the alerts that were resolved.
+        """
+
+        chosen = set(range(len(self.pending)) if indices is None else indices)
+        resolved = [alert for index, alert in enumerate(self.pending) if index in chosen]
+        self.pending = [alert for index, alert in enumerate(self.pending) if index not in chosen]
+        for alert in resolved:
+            try:
+                if action == "taken":
+                    alert.on_taken()
+                elif action == "snoozed":
+                    alert.on_snooze(minutes)
+                elif action == "skipped":
+                    alert.on_skip()
+                else:
+                    raise ValueError(f"Unknown alert action: {action}")
+                LOGGER.info(
+                    "User marked dose %s for %s as %s",
+                    alert.dose.dose_id,
+                    alert.medication.name,
+                    action,
+                )
+            except Exception:
+                LOGGER.exception("Handling %s for dose %s failed", action, alert.dose.dose_id)
+        return resolved
+
+
+def group_alerts(alerts: Iterable[DueAlert]) -> List[AlertBatch]:
+    """Group alerts that share a dismiss label, keeping arrival order."""
+
+    groups: Dict[str, List[DueAlert]] = {}
+    for alert in alerts:
+        groups.setdefault(alert.skip_label, []).append(alert)
+    return [AlertBatch(group) for group in groups.values()]
+
+
+class DialogService:
+    """Thread-safe queue of alerts rendered as ``Toplevel`` windows.
+
+    :meth:`submit` may be called from any thread, typically the scheduler's.
+    All Tk work happens on one root: either ``root`` (whose main loop must
+    be running, e.g. the app window) or a hidden root that the service runs
+    on its own thread. Alerts arriving within ``coalesce_ms`` of each other
+    are shown as one grouped dialog with batch actions.
+    """
+
+    def __init__(
+        self,
+        root: Any = None,
+        *,
+        default_snooze_minutes: int = 10,
+        coalesce_ms: int = 400,
+        poll_interval_ms: int = 100,
+    ) -> None:
+        self.root = root
+        self.default_snooze_minutes = default_snooze_minutes
+        self.coalesce_ms = coalesce_ms
+        self.poll_interval_ms = poll_interval_ms
+        self._requests: "queue.Queue[DueAlert]" = queue.Queue()
+        self._collecting: List[DueAlert] = []
+        self._first_arrival: Optional[float] = None
+        self._own_root = root is None
+        self._started = False
+        self._stopping = False
+        self._start_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Begin polling; with an external root, call this from its thread."""
+
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+            if not self._own_root:
+                self.root.after(self.poll_interval_ms, self._poll)
+                return
+            ready = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run_own_root, args=(ready,), name="DialogService", daemon=True
+            )
+            self._thread.start()
+        ready.wait(5)
+
+    def stop(self) -> None:
+        self._stopping = True
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def submit(self, alert: DueAlert) -> None:
+        """Queue ``alert`` for display; safe to call from any thread."""
+
+        self._requests.put(alert)
+        if self._own_root:
+            self.start()
+
+    # Tk thread ------------------------------------------------------
+
+    def _run_own_root(self, ready: threading.Event) -> None:
+        self.root = tk.Tk()  # type: ignore[call-arg]
+        self.root.withdraw()
+        self.root.after(self.poll_interval_ms, self._poll)
+        ready.set()
+        self.root.mainloop()
+        self.root.destroy()
+
+    def _take_ready(self, now: float) -> List[AlertBatch]:
+        """Move queued alerts into the coalescing window; return due batches."""
+
+        while True:
+            try:
+                alert = self._requests.get_nowait()
+            except queue.Empty:
+                break
+            if self._first_arrival is None:
+                self._first_arrival = now
+            self._collecting.append(alert)
+        if self._first_arrival is None or (now - self._first_arrival) * 1000 < self.coalesce_ms:
+            return []
+        batches = group_alerts(self._collecting)
+        self._collecting = []
+        self._first_arrival = None
+        return batches
+
+    def _poll(self) -> None:
+        if self._stopping:
+            if self._own_root:
+                self.root.quit()
+            return
+        for batch in self._take_ready(time.monotonic()):
+            try:
+                self._show(batch)
+            except Exception:
+                LOGGER.exception("Unable to render alert dialog")
+        self.root.after(self.poll_interval_ms, self._poll)
+
+    def _resolve(
+        self,
+        window: Any,
+        batch: AlertBatch,
+        action: str,
+        indices: Optional[Sequence[int]] = None,
+        minutes: Optional[int] = None,
+        refresh: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """Resolve alerts from a dialog and close it once none are left."""
+
+        try:
+            batch.resolve(
+                action,
+                indices,
+                self.default_snooze_minutes if minutes is None else minutes,
+            )
+        finally:
+            if batch.done:
+                window.destroy()
+            elif refresh is not None:
+                refresh()
+
+    def _show(self, batch: AlertBatch) -> None:
+        window = tk.Toplevel(self.root)
+        grouped = len(batch) > 1
+        window.title("Medication Alerts" if grouped else "Medication Alert")
+        window.resizable(False, grouped)
+        try:
+            window.attributes("-topmost", True)
+            window.after(200, lambda: window.attributes("-topmost", False))
+        except Exception:  # pragma: no cover - attributes may not be supported
+            LOGGER.debug("Unable to set topmost attribute for alert dialog")
+        window.protocol("WM_DELETE_WINDOW", lambda: self._resolve(window, batch, "skipped"))
+
+        frame = ttk.Frame(window, padding=12)
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        listbox = None
+        if grouped:
+            ttk.Label(frame, text=f"{len(batch)} doses are due:").pack(anchor=tk.W)
+            listbox = tk.Listbox(frame, selectmode=tk.EXTENDED, height=min(len(batch), 10), width=48)
+            listbox.pack(fill=tk.BOTH, expand=True, pady=(6, 0))
+        else:
+            alert = batch.pending[0]
+            ttk.Label(
+                frame,
+                text=(
+                    f"Medication: {alert.medication.name}\n"
+                    f"Dosage: {alert.medication.dosage}\n"
+                    f"Due: {alert.dose.effective_due_time():%Y-%m-%d %H:%M}"
+                ),
+                justify=tk.LEFT,
+            ).pack(anchor=tk.W)
+            instructions = (getattr(alert.medication, "instructions", "") or "").strip()
+            if instructions:
+                ttk.Label(
+                    frame, text=f"Instructions: {instructions}", wraplength=320, justify=tk.LEFT
+                ).pack(anchor=tk.W, pady=(8, 0))
+
+        def _fill() -> None:
+            if listbox is None:
+                return
+            listbox.delete(0, tk.END)
+            for alert in batch.pending:
+                listbox.insert(
+                    tk.END,
+                    f"{alert.medication.name} ({alert.medication.dosage})"
+                    f" due {alert.dose.effective_due_time():%H:%M}",
+                )
+            listbox.selection_set(0, tk.END)
+
+        def _selected() -> Optional[List[int]]:
+            if listbox is None:
+                return None
+            return list(listbox.curselection())
+
+        _fill()
+
+        snooze_frame = ttk.Frame(frame)
+        snooze_frame.pack(anchor=tk.W, pady=(12, 0))
+        ttk.Label(snooze_frame, text="Snooze for (minutes)").grid(row=0, column=0, sticky=tk.W)
+        snooze_var = tk.StringVar(master=window, value=str(self.default_snooze_minutes))
+        ttk.Spinbox(snooze_frame, from_=1, to=240, width=5, textvariable=snooze_var).grid(
+            row=0, column=1, padx=(8, 0)
+        )
+
+        button_frame = ttk.Frame(frame)
+        button_frame.pack(fill=tk.X, pady=(18, 0))
+        ttk.Button(
+            button_frame,
+            text="Taken",
+            command=lambda: self._resolve(window, batch, "taken", _selected(), refresh=_fill),
+        ).pack(side=tk.LEFT, expand=True, padx=4)
+        ttk.Button(
+            button_frame,
+            text="Snooze",
+            command=lambda: self._resolve(
+                window,
+                batch,
+                "snoozed",
+                _selected(),
+                snooze_minutes(snooze_var.get(), self.default_snooze_minutes),
+                refresh=_fill,
+            ),
+        ).pack(side=tk.LEFT, expand=True, padx=4)
+        ttk.Button(
+            button_frame,
+            text=batch.pending[0].skip_label,
+            command=lambda: self._resolve(window, batch, "skipped", _selected(), refresh=_fill),
+        ).pack(side=tk.LEFT, expand=True, padx=4)
+        window.focus_force()
+
+
+_SHARED: Optional[DialogService] = None
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_service() -> DialogService:
+    """Process-wide service with its own hidden root, created on first use."""
+
+    global _SHARED
+    with _SHARED_LOCK:
+        if _SHARED is None:
+            _SHARED = DialogService()
+        return _SHARED
+
+
+__all__ = [
+    "AlertBatch",
+    "DialogService",
+    "DueAlert",
+    "group_alerts",
+    "shared_service",
+    "snooze_minutes",
+]
@@ -3,7 +3,22 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Any, Dict, Iterable, List, Mapping, Optional
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover - NumPy is optional for vectorised metrics
+    np = None  # type: ignore
+
+try:
+    from ..reminders.sketch import QuantileSketch
+except ImportError:  # pragma: no cover - ``ui`` imported as a top-level package
+    from reminders.sketch import QuantileSketch
+
+_EPOCH = datetime(1970, 1, 1)
+_NAT = -(2**63)  # datetime64's NaT as a raw int64
 
 
 @dataclass
@@ -25,6 +40,8 @@ class HistoryMetrics:
     adherence_percent: float
     missed_by_medication: Dict[str, int]
     status_counts: Dict[str, int]
+    lateness_p50_minutes: Optional[float] = None
+    lateness_p95_minutes: Optional[float] = None
 
 
 def _coerce_datetime(value: Any) -> Optional[datetime]:
@@ -43,12 +60,72 @@ def _coerce_datetime(value: Any) -> Optional[datetime]:
     return None
 
 
+@lru_cache(maxsize=None)
+def _is_mapping_type(cls: type) -> bool:
+    # ABC subclass checks are slow and histories hold few distinct types.
+    return issubclass(cls, Mapping)
+
+
 def _value_from_entry(entry: Any, key: str) -> Any:
-    if isinstance(entry, Mapping):
+    if _is_mapping_type(type(entry)):
         return entry.get(key)
     return getattr(entry, key, None)
 
 
+def _effective_time(entry: Any) -> Optional[datetime]:
+    return (
+        _coerce_datetime(_value_from_entry(entry, "timestamp"))
+        or _coerce_datetime(_value_from_entry(entry, "acted_at"))
+        or _coerce_datetime(_value_from_entry(entry, "scheduled_time"))
+    )
+
+
+def _status_key(entry: Any) -> str:
+    return (_value_from_entry(entry, "status") or "").strip().lower() or "unknown"
+
+
+def _medication_label(entry: Any) -> str:
+    medication = (
+        _value_from_entry(entry, "medication_name")
+        or _value_from_entry(entry, "medication")
+        or _value_from_entry(entry, "medication_id")
+        or "Unknown"
+    )
+    return str(medication)
+
+
+def _lateness_minutes(entry: Any) -> Optional[float]:
+    """Minutes between scheduled and acted time for taken doses."""
+    if _status_key(entry) != "taken":
+        return None
+    scheduled = _coerce_datetime(_value_from_entry(entry, "scheduled_time"))
+    acted = _coerce_datetime(_value_from_entry(entry, "acted_at"))
+    if scheduled is None or acted is None:
+        return None
+    return (acted - scheduled).total_seconds() / 60.0
+
+
+def _lateness_percentiles(sketch: QuantileSketch) -> Tuple[Optional[float], Optional[float]]:
+    """p50/p95 minutes late; as in punctuality reports, early doses count as 0."""
+    return sketch.quantile(0.5), sketch.quantile(0.95)
+
+
+def _end_bound(end: Optional[datetime]) -> Tuple[Optional[datetime], bool]:
+    """Upper bound and inclusiveness; a bare date covers that whole day."""
+    if end is not None and end.time() == datetime.min.time():
+        return end + timedelta(days=1), False
+    return end, True
+
+
+def _sorted_missed(missed_by_medication: Dict[str, int]) -> Dict[str, int]:
+    return dict(
+        sorted(
+            missed_by_medication.items(),
+            key=lambda item: (-item[1], item[0].lower()),
+        )
+    )
+
+
 def filter_history_entries(
     entries: Iterable[Any],
     start: Optional[datetime] = None,
@@ -60,22 +137,10 @@ def filter_history_entries(
     filtered: List[Any] = []
     status_counts: Dict[str, int] = {}
 
-    end_bound = end
-    inclusive_upper = True
-    if end is not None and end.time() == datetime.min.time():
-        end_bound = end + timedelta(days=1)
-        inclusive_upper = False
+    end_bound, inclusive_upper = _end_bound(end)
 
     for entry in items:
-        timestamp = _value_from_entry(entry, "timestamp")
-        acted_at = _value_from_entry(entry, "acted_at")
-        fallback = _value_from_entry(entry, "scheduled_time")
-
-        effective_time = (
-            _coerce_datetime(timestamp)
-            or _coerce_datetime(acted_at)
-            or _coerce_datetime(fallback)
-        )
+        effective_time = _effective_time(entry)
 
         if start is not None and effective_time is not None and effective_time < start:
             continue
@@ -88,9 +153,7 @@ def filter_history_entries(
                     continue
 
         filtered.append(entry)
-        status_value = (_value_from_entry(entry, "status") or "").strip().lower()
-        if not status_value:
-            status_value = "unknown"
+        status_value = _status_key(entry)
         status_counts[status_value] = status_counts.get(status_value, 0) + 1
 
     return HistoryFilterResult(entries=filtered, status_counts=status_counts)
@@ -99,35 +162,87 @@ def filter_history_entries(
 def calculate_metrics(result: HistoryFilterResult) -> HistoryMetrics:
     """Calculate adherence and missed-dose summaries from the filter result."""
 
-    total = len(result.entries)
-    taken = result.status_counts.get("taken", 0)
-    missed = result.status_counts.get("missed", 0)
-    snoozed = result.status_counts.get("snoozed", 0)
-
-    denominator = taken + missed
-    adherence = (taken / denominator * 100.0) if denominator else 0.0
-
     missed_by_medication: Dict[str, int] = {}
+    lateness = QuantileSketch()
     for entry in result.entries:
-        status_value = (_value_from_entry(entry, "status") or "").strip().lower()
-        if status_value != "missed":
+        minutes = _lateness_minutes(entry)
+        if minutes is not None:
+            lateness.add(minutes)
+        if _status_key(entry) != "missed":
             continue
-        medication = (
-            _value_from_entry(entry, "medication_name")
-            or _value_from_entry(entry, "medication")
-            or _value_from_entry(entry, "medication_id")
-            or "Unknown"
-        )
-        medication_key = str(medication)
+        medication_key = _medication_label(entry)
         missed_by_medication[medication_key] = missed_by_medication.get(medication_key, 0) + 1
 
-    missed_by_medication = dict(
-        sorted(
-            missed_by_medication.items(),
-            key=lambda item: (-item[1], item[0].lower()),
-        )
+    return _build_metrics(
+        len(result.entries),
+        result.status_counts,
+        _sorted_missed(missed_by_medication),
+        *_lateness_percentiles(lateness),
+    )
+
+
+def metrics_from_counts(
+    counts: Mapping[str, Mapping[str, int]],
+    labels: Optional[Mapping[str, str]] = None,
+    lateness_p50_minutes: Optional[float] = None,
+    lateness_p95_minutes: Optional[float] = None,
+) -> HistoryMetrics:
+    """Build metrics from per-medication status counts, e.g. stored aggregates.
+
+    ``labels`` maps medication ids to the names shown for missed doses; the
+    lateness percentiles, e.g. from a punctuality report, are passed through.
+    """
+
+    status_counts: Dict[str, int] = {}
+    missed_by_medication: Dict[str, int] = {}
+    for medication_id, statuses in counts.items():
+        for status, count in statuses.items():
+            status_counts[status] = status_counts.get(status, 0) + count
+        missed = statuses.get("missed", 0)
+        if missed:
+            label = (labels or {}).get(medication_id) or medication_id or "Unknown"
+            missed_by_medication[label] = missed_by_medication.get(label, 0) + missed
+    return _build_metrics(
+        sum(status_counts.values()),
+        status_counts,
+        _sorted_missed(missed_by_medication),
+        lateness_p50_minutes,
+        lateness_p95_minutes,
     )
 
+
+def metrics_from_summary(
+    summary: Any, labels: Optional[Mapping[str, str]] = None
+) -> HistoryMetrics:
+    """Build metrics from a rollup summary such as ``summarize_range`` returns.
+
+    ``summary`` needs per-medication ``counts`` and a ``delay`` sketch of how
+    late taken doses were, in seconds.
+    """
+
+    p50, p95 = summary.delay.quantile(0.5), summary.delay.quantile(0.95)
+    return metrics_from_counts(
+        summary.counts,
+        labels,
+        p50 / 60.0 if p50 is not None else None,
+        p95 / 60.0 if p95 is not None else None,
+    )
+
+
+def _build_metrics(
+    total: int,
+    status_counts: Dict[str, int],
+    missed_by_medication: Dict[str, int],
+    lateness_p50_minutes: Optional[float] = None,
+    lateness_p95_minutes: Optional[float] = None,
+) -> HistoryMetrics:
+    taken = status_counts.get("taken", 0)
+    missed = status_counts.get("missed", 0)
+    snoozed = status_counts.get("snoozed", 0)
+
+    denominator = taken + missed
+    adherence = (taken / denominator * 100.0) if denominator else 0.0
+
     return HistoryMetrics(
         total=total,
         taken=taken,
@@ -135,13 +250,244 @@ def calculate_metrics(result: HistoryFilterResult) -> HistoryMetrics:
         snoozed=snoozed,
         adherence_percent=adherence,
         missed_by_medication=missed_by_medication,
-        status_counts=dict(result.status_counts),
+        status_counts=dict(status_counts),
+        lateness_p50_minutes=lateness_p50_minutes,
+        lateness_p95_minutes=lateness_p95_minutes,
+    )
+
+
+@lru_cache(maxsize=None)
+def _attribute_kind(cls: type, key: str) -> str:
+    """``"always"``, ``"never"`` or ``"maybe"`` for instances of ``cls`` having ``key``."""
+    if hasattr(cls, key):
+        return "always"
+    # Slotted records, like the history entries, cannot grow attributes.
+    if not any("__dict__" in vars(base) for base in cls.__mro__):
+        return "never"
+    return "maybe"
+
+
+def _field(entries: List[Any], key: str) -> List[Any]:
+    """One attribute or key of every entry, without per-entry type checks."""
+    types = set(map(type, entries))
+    if any(_is_mapping_type(cls) for cls in types):
+        return [_value_from_entry(entry, key) for entry in entries]
+    kinds = {_attribute_kind(cls, key) for cls in types}
+    if kinds == {"always"}:
+        return list(map(attrgetter(key), entries))
+    if kinds == {"never"}:
+        return [None] * len(entries)
+    return [getattr(entry, key, None) for entry in entries]
+
+
+def _to_naive(value: datetime) -> datetime:
+    # Aware values are bucketed by local wall-clock time, as storage does.
+    return value.astimezone().replace(tzinfo=None) if value.tzinfo is not None else value
+
+
+def _datetime_column(values: List[Any]) -> "np.ndarray":
+    """``datetime64[us]`` column; missing and unparseable values become NaT."""
+
+    types = set(map(type, values))
+    if not types <= {datetime, type(None)}:
+        values = [_coerce_datetime(value) for value in values]
+        types = set(map(type, values))
+    present = np.ones(len(values), dtype=bool)
+    dated = values
+    if type(None) in types:
+        present = np.not_equal(np.array(values, dtype=object), None)
+        dated = [value for value in values if value is not None]
+    if set(map(attrgetter("tzinfo"), dated)) - {None}:
+        dated = list(map(_to_naive, dated))
+
+    # Converting datetimes to datetime64 one by one is slow; their integer
+    # parts come out at C speed and combine as array arithmetic.
+    def part(getter: Any) -> "np.ndarray":
+        return np.fromiter(map(getter, dated), dtype=np.int64, count=len(dated))
+
+    days = part(datetime.toordinal) - _EPOCH.toordinal()
+    minutes = (days * 24 + part(attrgetter("hour"))) * 60 + part(attrgetter("minute"))
+    seconds = minutes * 60 + part(attrgetter("second"))
+    micros = np.full(len(values), _NAT, dtype=np.int64)
+    micros[present] = seconds * 1_000_000 + part(attrgetter("microsecond"))
+    return micros.view("datetime64[us]")
+
+
+def _first_present(*columns: "np.ndarray") -> "np.ndarray":
+    result = columns[-1]
+    for column in reversed(columns[:-1]):
+        result = np.where(np.isnat(column), result, column)
+    return result
+
+
+def _intern(values: List[Any], codes: Dict[Any, int], normalise: Any) -> "np.ndarray":
+    """Integer codes for ``values``; only the distinct raw values are normalised."""
+
+    raw = {value: index for index, value in enumerate(dict.fromkeys(values))}
+    raw_codes = np.array(list(map(raw.__getitem__, values)), dtype=np.int32)
+    lookup = np.array(
+        [codes.setdefault(normalise(value), len(codes)) for value in raw], dtype=np.int32
     )
+    return lookup[raw_codes]
+
+
+def _medication_labels(entries: List[Any]) -> Tuple[List[Any], Any]:
+    """Raw label values and how to normalise them, as :func:`_medication_label`."""
+
+    candidates = [
+        column
+        for column in (
+            _field(entries, "medication_name"),
+            _field(entries, "medication"),
+            _field(entries, "medication_id"),
+        )
+        if any(column)
+    ]
+    if len(candidates) > 1:
+        return list(zip(*candidates)), lambda names: str(next(filter(None, names), "Unknown"))
+    values = candidates[0] if candidates else [None] * len(entries)
+    return values, lambda name: str(name or "Unknown")
+
+
+class ColumnarHistory:
+    """Column-oriented copy of history entries for vectorised range queries.
+
+    Effective times become a ``datetime64[us]`` column, statuses and
+    medication labels become integer codes into interned label lists. The
+    columns are built with array operations and grow with :meth:`extend`, so
+    a long-lived instance only converts entries it has not seen. Filtering
+    and metrics for any range run as NumPy array operations and return the
+    same :class:`HistoryFilterResult` / :class:`HistoryMetrics` as
+    :func:`filter_history_entries` and :func:`calculate_metrics`, except that
+    lateness percentiles are exact rather than sketched. Without NumPy those
+    functions are used directly.
+    """
+
+    def __init__(self, entries: Iterable[Any] = ()) -> None:
+        self.entries: List[Any] = []
+        self._status_codes: Dict[str, int] = {}
+        self._medication_codes: Dict[str, int] = {}
+        if np is not None:
+            self.times = np.empty(0, dtype="datetime64[us]")
+            self.lateness = np.empty(0, dtype=np.float64)
+            self.statuses = np.empty(0, dtype=np.int32)
+            self.medications = np.empty(0, dtype=np.int32)
+            self._objects = np.empty(0, dtype=object)
+        self.extend(entries)
+
+    def extend(self, entries: Iterable[Any]) -> None:
+        """Append ``entries``, converting only them."""
+
+        added = list(entries)
+        self.entries.extend(added)
+        if np is None or not added:
+            return
+        timestamps = _datetime_column(_field(added, "timestamp"))
+        acted = _datetime_column(_field(added, "acted_at"))
+        scheduled = _datetime_column(_field(added, "scheduled_time"))
+        statuses = _intern(
+            _field(added, "status"),
+            self._status_codes,
+            lambda status: (status or "").strip().lower() or "unknown",
+        )
+        labels, normalise = _medication_labels(added)
+        medications = _intern(labels, self._medication_codes, normalise)
+        taken = statuses == self._status_codes.get("taken", -1)
+        lateness = (acted - scheduled) / np.timedelta64(1, "m")
+        lateness[~taken | np.isnat(acted) | np.isnat(scheduled)] = np.nan
+        objects = np.empty(len(added), dtype=object)
+        objects[:] = added
+
+        self.times = np.concatenate([self.times, _first_present(timestamps, acted, scheduled)])
+        self.lateness = np.concatenate([self.lateness, lateness])
+        self.statuses = np.concatenate([self.statuses, statuses])
+        self.medications = np.concatenate([self.medications, medications])
+        self._objects = np.concatenate([self._objects, objects])
+
+    @property
+    def status_labels(self) -> List[str]:
+        return list(self._status_codes)
+
+    @property
+    def medication_labels(self) -> List[str]:
+        return list(self._medication_codes)
+
+    @property
+    def newest(self) -> Optional[datetime]:
+        """Latest effective time held, or ``None`` when nothing is dated."""
+        if np is None:
+            times = [moment for moment in map(_effective_time, self.entries) if moment]
+            return max(map(_to_naive, times), default=None)
+        dated = self.times[~np.isnat(self.times)]
+        return dated.max().astype(datetime) if len(dated) else None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _mask(self, start: Optional[datetime], end: Optional[datetime]) -> "np.ndarray":
+        # NaT compares False, so undated entries are always kept, as in the
+        # row-by-row filter.
+        mask = np.ones(len(self.entries), dtype=bool)
+        if start is not None:
+            mask &= ~(self.times < np.datetime64(start, "us"))
+        end_bound, inclusive_upper = _end_bound(end)
+        if end_bound is not None:
+            bound = np.datetime64(end_bound, "us")
+            mask &= ~((self.times > bound) if inclusive_upper else (self.times >= bound))
+        return mask
+
+    def _status_counts(self, mask: "np.ndarray") -> Dict[str, int]:
+        labels = self.status_labels
+        counts = np.bincount(self.statuses[mask], minlength=len(labels))
+        return {labels[code]: int(count) for code, count in enumerate(counts) if count}
+
+    def filter(
+        self, start: Optional[datetime] = None, end: Optional[datetime] = None
+    ) -> HistoryFilterResult:
+        if np is None:
+            return filter_history_entries(self.entries, start, end)
+        mask = self._mask(start, end)
+        return HistoryFilterResult(
+            entries=self._objects[mask].tolist(),
+            status_counts=self._status_counts(mask),
+        )
+
+    def metrics(
+        self, start: Optional[datetime] = None, end: Optional[datetime] = None
+    ) -> HistoryMetrics:
+        if np is None:
+            return calculate_metrics(filter_history_entries(self.entries, start, end))
+        mask = self._mask(start, end)
+        labels = self.medication_labels
+        missed_counts = np.bincount(
+            self.medications[mask & (self.statuses == self._status_codes.get("missed", -1))],
+            minlength=len(labels),
+        )
+        missed_by_medication = {
+            labels[code]: int(count)
+            for code, count in enumerate(missed_counts)
+            if count
+        }
+        lateness = np.clip(self.lateness[mask & ~np.isnan(self.lateness)], 0, None)
+        percentiles: Tuple[Optional[float], ...] = (None, None)
+        if len(lateness):
+            # Nearest rank, as the row-by-row percentiles; early counts as 0.
+            ranked = np.percentile(lateness, [50, 95], method="lower")
+            percentiles = (float(ranked[0]), float(ranked[1]))
+        return _build_metrics(
+            int(mask.sum()),
+            self._status_counts(mask),
+            _sorted_missed(missed_by_medication),
+            *percentiles,
+        )
 
 
 __all__ = [
+    "ColumnarHistory",
     "HistoryFilterResult",
     "HistoryMetrics",
     "filter_history_entries",
     "calculate_metrics",
+    "metrics_from_counts",
+    "metrics_from_summary",
 ]
@@ -0,0 +1,149 @@
+"""Run slow controller calls off the Tk thread and deliver results back to it."""
+from __future__ import annotations
+
+import logging
+import queue
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+
+class BackgroundLoader:
+    """Worker pool whose results are applied on the Tk main loop.
+
+    Work is submitted on a named channel such as ``"history"``. Each submit
+    supersedes earlier work on the same channel: queued jobs are cancelled and
+    results that arrive late are dropped, so a slow old refresh can never
+    overwrite a newer one. Results travel through a queue that the main loop
+    polls with ``root.after`` while anything is pending; Tk itself is only
+    touched from the main thread. ``on_busy_changed(busy)`` is called
+    whenever the loader starts or stops having pending work.
+
+    Work submitted with ``serial=True`` skips the pool and runs on one
+    dedicated worker in submission order, so mutations apply in the order
+    the user made them.
+    """
+
+    def __init__(
+        self,
+        root: Any,
+        *,
+        max_workers: int = 2,
+        poll_interval_ms: int = 30,
+        on_busy_changed: Optional[Callable[[bool], None]] = None,
+    ) -> None:
+        self.root = root
+        self.poll_interval_ms = poll_interval_ms
+        self.on_busy_changed = on_busy_changed
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="UILoader")
+        self._serial = ThreadPoolExecutor(max_workers=1, thread_name_prefix="UILoaderSerial")
+        self._results: "queue.Queue[Tuple[str, int, Any, Optional[BaseException]]]" = queue.Queue()
+        self._generations: Dict[str, int] = {}
+        self._pending: Dict[str, Tuple[Future, Callable, Optional[Callable]]] = {}
+        self._polling = False
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._pending)
+
+    def is_loading(self, channel: str) -> bool:
+        return channel in self._pending
+
+    def submit(
+        self,
+        channel: str,
+        work: Callable[[], Any],
+        on_done: Callable[[Any], None],
+        on_error: Optional[Callable[[BaseException], None]] = None,
+        *,
+        serial: bool = False,
+    ) -> int:
+        """Run ``work`` on a worker and pass its result to ``on_done`` on the main loop.
+
+        Must be called from the Tk thread. Returns the channel generation.
+        """
+
+        was_busy = self.busy
+        generation = self._drop(channel)
+        future = (self._serial if serial else self._executor).submit(work)
+        self._pending[channel] = (future, on_done, on_error)
+        future.add_done_callback(
+            lambda done, channel=channel, generation=generation: self._collect(
+                channel, generation, done
+            )
+        )
+        if not was_busy:
+            self._notify_busy()
+        self._schedule_poll()
+        return generation
+
+    def cancel(self, channel: str) -> None:
+        """Forget pending work on ``channel``; a running job's result is dropped."""
+
+        was_busy = self.busy
+        self._drop(channel)
+        if was_busy and not self.busy:
+            self._notify_busy()
+
+    def shutdown(self) -> None:
+        for channel in list(self._pending):
+            self._drop(channel)
+        self._executor.shutdown(wait=False)
+        self._serial.shutdown(wait=False)
+
+    # Internals ------------------------------------------------------
+
+    def _drop(self, channel: str) -> int:
+        """Cancel pending work on ``channel`` and return its next generation."""
+
+        pending = self._pending.pop(channel, None)
+        if pending is not None:
+            pending[0].cancel()
+        generation = self._generations.get(channel, 0) + 1
+        self._generations[channel] = generation
+        return generation
+
+    def _collect(self, channel: str, generation: int, future: Future) -> None:
+        # Runs on the worker thread; hand the outcome to the main loop.
+        if future.cancelled():
+            return
+        error = future.exception()
+        result = None if error is not None else future.result()
+        self._results.put((channel, generation, result, error))
+
+    def _schedule_poll(self) -> None:
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_interval_ms, self._poll)
+
+    def _poll(self) -> None:
+        self._polling = False
+        while True:
+            try:
+                channel, generation, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self._generations.get(channel):
+                continue
+            _, on_done, on_error = self._pending.pop(channel)
+            if not self._pending:
+                self._notify_busy()
+            try:
+                if error is None:
+                    on_done(result)
+                elif on_error is not None:
+                    on_error(error)
+                else:
+                    LOGGER.error("Background load %s failed", channel, exc_info=error)
+            except Exception:
+                LOGGER.exception("Applying background load %s failed", channel)
+        if self._pending:
+            self._schedule_poll()
+
+    def _notify_busy(self) -> None:
+        if self.on_busy_changed is not None:
+            self.on_busy_changed(self.busy)
+
+
+__all__ = ["BackgroundLoader"]
@@ -0,0 +1,426 @@
+"""Virtualized table widget that only materializes the visible rows."""
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import tkinter as tk
+from tkinter import ttk
+
+Row = Tuple[str, Tuple[Any, ...]]
+# ("delete", key) | ("detach", key) | ("insert", key, index, values)
+# | ("move", key, index) | ("update", key, values)
+RowOp = Tuple[Any, ...]
+
+
+class ListSource:
+    """Rows held in memory, addressed by position and by key."""
+
+    def __init__(self, rows: Sequence[Row] = ()) -> None:
+        self._rows: List[Row] = list(rows)
+        self._positions: Dict[str, int] = {key: index for index, (key, _) in enumerate(self._rows)}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def rows(self, offset: int, limit: int) -> List[Row]:
+        return self._rows[offset : offset + limit]
+
+    def index_of(self, key: str) -> Optional[int]:
+        return self._positions.get(key)
+
+    def row(self, key: str) -> Optional[Row]:
+        index = self._positions.get(key)
+        return self._rows[index] if index is not None else None
+
+
+class CallbackSource:
+    """Rows fetched page by page from callbacks, e.g. a controller.
+
+    ``count`` returns the total number of rows and ``fetch(offset, limit)``
+    one page of ``(key, values)`` tuples. The most recently used
+    ``max_pages`` pages are kept so scrolling back and forth stays cheap.
+
+    With ``request_page`` set, missing pages are not fetched inline: the
+    page number is passed to ``request_page`` once, blank placeholder rows
+    stand in for it, and the caller hands the rows over with
+    :meth:`add_page` when they arrive, e.g. from a background loader.
+    """
+
+    def __init__(
+        self,
+        count: Callable[[], int],
+        fetch: Callable[[int, int], Sequence[Row]],
+        page_size: int = 200,
+        max_pages: int = 16,
+        request_page: Optional[Callable[[int], None]] = None,
+    ) -> None:
+        self._count = count
+        self._fetch = fetch
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self._request_page = request_page
+        self._total: Optional[int] = None
+        self._pages: "OrderedDict[int, List[Row]]" = OrderedDict()
+        self._requested: Set[int] = set()
+
+    def __len__(self) -> int:
+        if self._total is None:
+            self._total = int(self._count())
+        return self._total
+
+    def _page(self, number: int) -> List[Row]:
+        page = self._pages.get(number)
+        if page is not None:
+            self._pages.move_to_end(number)
+            return page
+        start = number * self.page_size
+        if self._request_page is None:
+            page = list(self._fetch(start, self.page_size))
+            self.add_page(number, page)
+            return page
+        if number not in self._requested:
+            self._requested.add(number)
+            self._request_page(number)
+        return [(f"pending|{start + index}", ()) for index in range(self.page_size)]
+
+    def add_page(self, number: int, rows: Sequence[Row]) -> None:
+        """Store page ``number``, evicting the least recently used page if full."""
+
+        self._requested.discard(number)
+        self._pages[number] = list(rows)
+        self._pages.move_to_end(number)
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+
+    def rows(self, offset: int, limit: int) -> List[Row]:
+        end = min(offset + limit, len(self))
+        rows: List[Row] = []
+        position = offset
+        while position < end:
+            number, start = divmod(position, self.page_size)
+            page = self._page(number)
+            chunk = page[start : start + end - position]
+            if not chunk:
+                break
+            rows.extend(chunk)
+            position += len(chunk)
+        return rows
+
+    def index_of(self, key: str) -> Optional[int]:
+        for number, page in self._pages.items():
+            for index, (row_key, _) in enumerate(page):
+                if row_key == key:
+                    return number * self.page_size + index
+        return None
+
+    def row(self, key: str) -> Optional[Row]:
+        index = self.index_of(key)
+        return self.rows(index, 1)[0] if index is not None else None
+
+
+def _stable_keys(old_order: Sequence[str], new_positions: Dict[str, int]) -> Set[str]:
+    """Longest run of ``old_order`` already in new order; those rows never move."""
+
+    tails: List[int] = []
+    tail_index: List[int] = []
+    previous: List[int] = [-1] * len(old_order)
+    for index, key in enumerate(old_order):
+        position = new_positions[key]
+        slot = bisect_left(tails, position)
+        if slot == len(tails):
+            tails.append(position)
+            tail_index.append(index)
+        else:
+            tails[slot] = position
+            tail_index[slot] = index
+        previous[index] = tail_index[slot - 1] if slot else -1
+    stable: Set[str] = set()
+    index = tail_index[-1] if tail_index else -1
+    while index >= 0:
+        stable.add(old_order[index])
+        index = previous[index]
+    return stable
+
+
+def diff_rows(current: Sequence[Row], new: Sequence[Row]) -> List[RowOp]:
+    """Treeview operations turning rows ``current`` into ``new``, matched by key.
+
+    Rows whose values are unchanged and whose relative order survives are
+    left alone. Rows that moved are detached and reattached at their new
+    index, so moving one row costs two calls rather than shifting every row
+    after it.
+    """
+
+    new_positions = {key: index for index, (key, _) in enumerate(new)}
+    old_values: Dict[str, Tuple[Any, ...]] = {}
+    ops: List[RowOp] = []
+    order: List[str] = []
+    for key, values in current:
+        if key in new_positions:
+            old_values[key] = values
+            order.append(key)
+        else:
+            ops.append(("delete", key))
+    stable = _stable_keys(order, new_positions)
+    detached: Set[str] = set()
+
+    for index, (key, values) in enumerate(new):
+        # Rows that will move later are parked so stable rows slide into place.
+        while index < len(order) and order[index] != key and order[index] not in stable:
+            ops.append(("detach", order[index]))
+            detached.add(order.pop(index))
+        if key not in old_values:
+            ops.append(("insert", key, index, values))
+            order.insert(index, key)
+            continue
+        if index >= len(order) or order[index] != key:
+            if key not in detached:
+                order.remove(key)
+            ops.append(("move", key, index))
+            order.insert(index, key)
+        if old_values[key] != tuple(values):
+            ops.append(("update", key, values))
+    return ops
+
+
+def clamp_offset(offset: int, visible: int, total: int) -> int:
+    """First row index that keeps a full window of ``visible`` rows in range."""
+    return max(0, min(offset, total - visible))
+
+
+def scroll_fractions(offset: int, visible: int, total: int) -> Tuple[float, float]:
+    """Scrollbar thumb position for a window starting at ``offset``."""
+    if total <= 0:
+        return 0.0, 1.0
+    return offset / total, min(offset + visible, total) / total
+
+
+def offset_for_scroll(
+    offset: int, visible: int, total: int, action: str, *args: str
+) -> int:
+    """New window offset for a Tk scrollbar ``moveto``/``scroll`` command."""
+
+    if action == "moveto":
+        offset = int(float(args[0]) * total)
+    elif action == "scroll":
+        step = int(args[0])
+        offset += step * max(visible - 1, 1) if args[1] == "pages" else step
+    return clamp_offset(offset, visible, total)
+
+
+class VirtualTable(ttk.Frame):
+    """A Treeview plus scrollbar that renders only the rows in view.
+
+    Rows come from a :class:`ListSource` or :class:`CallbackSource`. Only
+    the visible window is inserted into the underlying Treeview, so a refresh
+    costs the same for ten rows as for a hundred thousand. Selection is
+    tracked by row key and survives scrolling the row out of view.
+    """
+
+    def __init__(
+        self,
+        master: tk.Misc,
+        columns: Sequence[str],
+        *,
+        displaycolumns: Optional[Sequence[str]] = None,
+        height: int = 10,
+        **options: Any,
+    ) -> None:
+        super().__init__(master)
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+        self.columns = tuple(columns)
+        self.tree = ttk.Treeview(self, columns=self.columns, height=height, **options)
+        if displaycolumns is not None:
+            self.tree["displaycolumns"] = tuple(displaycolumns)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+
+        self._source: Any = ListSource()
+        self._displayed: List[Row] = []
+        self._offset = 0
+        self._visible = height
+        self._selected: List[str] = []
+
+        self.tree.bind("<<TreeviewSelect>>", self._on_tree_select, add="+")
+        self.tree.bind("<Configure>", self._on_configure, add="+")
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self._on_wheel)
+        self.tree.bind("<Up>", lambda _event: self._move_selection(-1))
+        self.tree.bind("<Down>", lambda _event: self._move_selection(1))
+        self.tree.bind("<Prior>", lambda _event: self._move_selection(-self._visible))
+        self.tree.bind("<Next>", lambda _event: self._move_selection(self._visible))
+
+    # Treeview passthrough ------------------------------------------
+
+    def heading(self, column: str, **options: Any) -> Any:
+        return self.tree.heading(column, **options)
+
+    def column(self, column: str, **options: Any) -> Any:
+        return self.tree.column(column, **options)
+
+    def bind(self, sequence: Optional[str] = None, func: Any = None, add: Any = "+") -> Any:
+        # Add rather than replace, so the table's own selection tracking stays bound.
+        return self.tree.bind(sequence, func, add)
+
+    # Data ----------------------------------------------------------
+
+    def set_source(self, source: Any) -> None:
+        """Show rows from ``source``, keeping scroll position and selection.
+
+        The view stays anchored on the first visible row when it still
+        exists, and selected keys that disappeared are dropped.
+        """
+        anchor = self._displayed[0][0] if self._displayed else None
+        self._source = source
+        anchor_index = source.index_of(anchor) if anchor is not None else None
+        if anchor_index is not None:
+            self._offset = anchor_index
+        self.render()
+        self._selected = [key for key in self._selected if self.exists(key)]
+
+    def set_rows(self, rows: Sequence[Row]) -> None:
+        self.set_source(ListSource(rows))
+
+    @property
+    def source(self) -> Any:
+        return self._source
+
+    @property
+    def row_count(self) -> int:
+        # Not __len__: an empty widget must not be falsy to Tk's own checks.
+        return len(self._source)
+
+    def render(self) -> None:
+        total = len(self._source)
+        self._offset = clamp_offset(self._offset, self._visible, total)
+        window = [
+            (key, tuple(values)) for key, values in self._source.rows(self._offset, self._visible)
+        ]
+        self._apply(diff_rows(self._displayed, window))
+        self._displayed = window
+        self._sync_tree_selection()
+        self.scrollbar.set(*scroll_fractions(self._offset, self._visible, total))
+
+    def _apply(self, ops: Sequence[RowOp]) -> None:
+        tree = self.tree
+        deleted = [op[1] for op in ops if op[0] == "delete"]
+        if deleted:
+            tree.delete(*deleted)
+        for op in ops:
+            kind, key = op[0], op[1]
+            if kind == "detach":
+                tree.detach(key)
+            elif kind == "insert":
+                tree.insert("", op[2], iid=key, values=op[3])
+            elif kind == "move":
+                tree.move(key, "", op[2])
+            elif kind == "update":
+                tree.item(key, values=op[2])
+
+    def _sync_tree_selection(self) -> None:
+        # Only touch the Treeview selection when it differs; every change
+        # fires <<TreeviewSelect>> at the app's handlers.
+        wanted = [key for key in self._selected if self.tree.exists(key)]
+        if set(wanted) != set(self.tree.selection()):
+            self.tree.selection_set(wanted)
+
+    # Treeview-like accessors used by the app ------------------------
+
+    def selection(self) -> Tuple[str, ...]:
+        return tuple(self._selected)
+
+    def selection_set(self, *keys: Any) -> None:
+        if len(keys) == 1 and isinstance(keys[0], (list, tuple)):
+            keys = tuple(keys[0])
+        self._selected = [key for key in keys if self.exists(key)]
+        self._sync_tree_selection()
+
+    def exists(self, key: str) -> bool:
+        return self.tree.exists(key) or self._source.index_of(key) is not None
+
+    def item(self, key: str) -> Dict[str, Any]:
+        row = self._source.row(key)
+        return {"values": list(row[1]) if row else []}
+
+    def set(self, key: str, column: str) -> Any:
+        row = self._source.row(key)
+        if row is None:
+            return ""
+        return row[1][self.columns.index(column)]
+
+    def see(self, key: str) -> None:
+        index = self._source.index_of(key)
+        if index is None:
+            return
+        if index < self._offset:
+            self._offset = index
+        elif index >= self._offset + self._visible:
+            self._offset = index - self._visible + 1
+        else:
+            return
+        self.render()
+
+    # Event handlers ------------------------------------------------
+
+    def _on_tree_select(self, _event: Any) -> None:
+        visible = set(self.tree.get_children())
+        current = list(self.tree.selection())
+        self._selected = [key for key in self._selected if key not in visible] + current
+
+    def _on_configure(self, event: Any) -> None:
+        style = ttk.Style(self)
+        row_height = int(style.lookup("Treeview", "rowheight") or 20)
+        # Leave room for the heading row.
+        visible = max(1, event.height // row_height - 1)
+        if visible != self._visible:
+            self._visible = visible
+            self.tree.configure(height=visible)
+            self.render()
+
+    def _scroll_to(self, offset: int) -> None:
+        offset = clamp_offset(offset, self._visible, len(self._source))
+        if offset != self._offset:
+            self._offset = offset
+            self.render()
+
+    def _on_scrollbar(self, action: str, *args: str) -> None:
+        total = len(self._source)
+        self._scroll_to(offset_for_scroll(self._offset, self._visible, total, action, *args))
+
+    def _on_wheel(self, event: Any) -> str:
+        if getattr(event, "num", None) == 4:
+            step = -1
+        elif getattr(event, "num", None) == 5:
+            step = 1
+        else:
+            step = -1 if event.delta > 0 else 1
+        self._scroll_to(self._offset + step * 3)
+        return "break"
+
+    def _move_selection(self, step: int) -> str:
+        total = len(self._source)
+        if not total:
+            return "break"
+        current = self._source.index_of(self._selected[-1]) if self._selected else None
+        index = 0 if current is None else max(0, min(current + step, total - 1))
+        key = self._source.rows(index, 1)[0][0]
+        self._selected = [key]
+        self.see(key)
+        self.tree.selection_set([key])
+        self.tree.focus(key)
+        return "break"
+
+
+__all__ = [
+    "CallbackSource",
+    "ListSource",
+    "VirtualTable",
+    "clamp_offset",
+    "diff_rows",
+    "offset_for_scroll",
+    "scroll_fractions",
+]
@@ -0,0 +1,83 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from ui.dialogs import AlertBatch, DialogService, DueAlert, group_alerts, snooze_minutes
+
+
+def _alert(index, calls, skip_label="Skip"):
+    dose = SimpleNamespace(dose_id=f"dose-{index}", effective_due_time=datetime.now)
+    medication = SimpleNamespace(name=f"Med {index}", dosage="5mg", instructions="")
+    return DueAlert(
+        dose,
+        medication,
+        on_taken=lambda: calls.append(("taken", index)),
+        on_snooze=lambda minutes: calls.append(("snoozed", index, minutes)),
+        on_skip=lambda: calls.append(("skipped", index)),
+        skip_label=skip_label,
+    )
+
+
+def test_simultaneous_alerts_are_coalesced_into_one_batch():
+    calls = []
+    service = DialogService(root=SimpleNamespace(), coalesce_ms=400)
+    for index in range(20):
+        service.submit(_alert(index, calls))
+
+    assert service._take_ready(now=10.0) == []  # window opens on first arrival
+    service.submit(_alert(20, calls))
+    assert service._take_ready(now=10.2) == []
+    (batch,) = service._take_ready(now=10.5)
+    assert [alert.dose.dose_id for alert in batch.pending] == [f"dose-{i}" for i in range(21)]
+    assert service._take_ready(now=11.0) == []
+
+
+def test_batch_actions_resolve_selected_alerts():
+    calls = []
+    batch = AlertBatch(_alert(index, calls) for index in range(4))
+
+    resolved = batch.resolve("snoozed", [1, 3], minutes=15)
+    assert [alert.dose.dose_id for alert in resolved] == ["dose-1", "dose-3"]
+    assert calls == [("snoozed", 1, 15), ("snoozed", 3, 15)]
+    assert [alert.dose.dose_id for alert in batch.pending] == ["dose-0", "dose-2"]
+
+    batch.resolve("taken")
+    assert calls[2:] == [("taken", 0), ("taken", 2)]
+    assert batch.done
+
+
+def test_failing_callback_does_not_block_the_rest_of_the_batch():
+    calls = []
+    broken = _alert(0, calls)
+    broken.on_skip = lambda: 1 / 0
+    batch = AlertBatch([broken, _alert(1, calls)])
+
+    batch.resolve("skipped")
+    assert calls == [("skipped", 1)]
+    assert batch.done
+
+
+def test_window_stays_open_until_batch_is_resolved():
+    calls = []
+    service = DialogService(root=SimpleNamespace())
+    batch = AlertBatch(_alert(index, calls) for index in range(2))
+    destroyed, refreshed = [], []
+    window = SimpleNamespace(destroy=lambda: destroyed.append(True))
+
+    service._resolve(window, batch, "taken", [0], refresh=lambda: refreshed.append(True))
+    assert destroyed == [] and refreshed == [True]
+    service._resolve(window, batch, "snoozed", [0], refresh=lambda: refreshed.append(True))
+    assert destroyed == [True]
+    assert calls == [("taken", 0), ("snoozed", 1, service.default_snooze_minutes)]
+
+
+def test_grouping_and_snooze_parsing():
+    calls = []
+    alerts = [_alert(0, calls), _alert(1, calls, "Missed"), _alert(2, calls)]
+    batches = group_alerts(alerts)
+    assert [[a.dose.dose_id for a in batch.pending] for batch in batches] == [
+        ["dose-0", "dose-2"],
+        ["dose-1"],
+    ]
+    assert snooze_minutes("25", 10) == 25
+    assert snooze_minutes("soon", 10) == 10
+    assert snooze_minutes("0", 10) == 1
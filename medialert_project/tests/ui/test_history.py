@@ -0,0 +1,118 @@
+import dataclasses
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from reminders.models import DoseHistoryEntry
+from ui import history
+from ui.history import ColumnarHistory, calculate_metrics, filter_history_entries
+
+
+def _sample_entries():
+    base = datetime(2024, 3, 1, 8, 0)
+    entries = []
+    statuses = ["taken", "missed", "Snoozed ", "", "missed"]
+    for index in range(40):
+        entries.append(
+            DoseHistoryEntry(
+                dose_id=f"dose-{index}",
+                medication_id=f"med-{index % 3}",
+                scheduled_time=base + timedelta(hours=6 * index),
+                status=statuses[index % len(statuses)],
+                acted_at=base + timedelta(hours=6 * index, minutes=index),
+                timestamp=base + timedelta(hours=6 * index) if index % 4 else None,
+            )
+        )
+    entries.append({"status": "missed", "medication_name": "Vitamin D"})
+    entries.append(
+        {"status": "taken", "acted_at": "2024-03-03T09:15:00", "medication": "Aspirin"}
+    )
+    return entries
+
+
+def _assert_same_metrics(columnar, rows):
+    # Row metrics sketch lateness; the columns rank it exactly.
+    for field in ("lateness_p50_minutes", "lateness_p95_minutes"):
+        assert getattr(columnar, field) == pytest.approx(getattr(rows, field), rel=0.02, abs=0.01)
+    assert dataclasses.replace(columnar, lateness_p50_minutes=None, lateness_p95_minutes=None) == (
+        dataclasses.replace(rows, lateness_p50_minutes=None, lateness_p95_minutes=None)
+    )
+
+
+def test_columnar_history_matches_row_filter():
+    entries = _sample_entries()
+    columns = ColumnarHistory(entries)
+    ranges = [
+        (None, None),
+        (datetime(2024, 3, 2), datetime(2024, 3, 4)),
+        (datetime(2024, 3, 3, 12), datetime(2024, 3, 5, 7, 30)),
+        (None, datetime(2024, 3, 1)),
+    ]
+
+    for start, end in ranges:
+        expected = filter_history_entries(entries, start, end)
+        result = columns.filter(start, end)
+        assert result.entries == expected.entries
+        assert result.status_counts == expected.status_counts
+        _assert_same_metrics(columns.metrics(start, end), calculate_metrics(expected))
+
+
+def test_columnar_history_without_numpy(monkeypatch):
+    monkeypatch.setattr(history, "np", None)
+    entries = _sample_entries()
+    columns = ColumnarHistory(entries)
+    start, end = datetime(2024, 3, 2), datetime(2024, 3, 3)
+
+    expected = filter_history_entries(entries, start, end)
+    assert columns.filter(start, end) == expected
+    assert columns.metrics(start, end) == calculate_metrics(expected)
+
+
+def test_early_doses_count_as_on_time_in_lateness_percentiles():
+    base = datetime(2024, 3, 1, 8, 0)
+    entries = [
+        DoseHistoryEntry(
+            dose_id=f"dose-{index}",
+            medication_id="med-1",
+            scheduled_time=base + timedelta(days=index),
+            status="taken",
+            acted_at=base + timedelta(days=index, minutes=-30 if index < 6 else 20),
+        )
+        for index in range(10)
+    ]
+    expected = filter_history_entries(entries)
+    metrics = calculate_metrics(expected)
+    assert metrics.lateness_p50_minutes == 0.0
+    assert metrics.lateness_p95_minutes == pytest.approx(20, rel=0.02)
+    assert ColumnarHistory(entries).metrics().lateness_p50_minutes == 0.0
+    assert ColumnarHistory(entries).metrics().lateness_p95_minutes == 20.0
+
+
+def test_columnar_history_extends_incrementally():
+    entries = _sample_entries()
+    grown = ColumnarHistory(entries[:10])
+    grown.extend(entries[10:25])
+    grown.extend([])
+    grown.extend(entries[25:])
+    full = ColumnarHistory(entries)
+
+    start, end = datetime(2024, 3, 2), datetime(2024, 3, 8)
+    assert grown.filter(start, end) == full.filter(start, end)
+    assert grown.metrics(start, end) == full.metrics(start, end)
+    assert grown.newest == datetime(2024, 3, 11, 2, 0)
+
+
+def test_columnar_history_buckets_aware_times_in_local_time():
+    local = datetime(2024, 3, 2, 23, 30)
+    entry = DoseHistoryEntry(
+        dose_id="dose-aware",
+        medication_id="med-1",
+        scheduled_time=local,
+        status="taken",
+        acted_at=local.astimezone(timezone.utc),
+        timestamp=local.astimezone(timezone.utc),
+    )
+    columns = ColumnarHistory([entry])
+    assert columns.newest == local
+    assert columns.filter(datetime(2024, 3, 2), datetime(2024, 3, 2)).entries == [entry]
+    assert columns.metrics().lateness_p50_minutes == 0.0
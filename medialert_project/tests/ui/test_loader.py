@@ -0,0 +1,131 @@
+import threading
+import time
+
+from ui.loader import BackgroundLoader
+
+
+class FakeRoot:
+    """Collects ``after`` callbacks so tests can run the poll loop by hand."""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, _delay, callback):
+        self.callbacks.append(callback)
+
+    def pump(self, until, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not until():
+            assert time.monotonic() < deadline, "loader did not deliver in time"
+            callbacks, self.callbacks = self.callbacks, []
+            for callback in callbacks:
+                callback()
+            time.sleep(0.005)
+
+
+def test_result_is_delivered_through_the_poll_loop():
+    root = FakeRoot()
+    busy = []
+    loader = BackgroundLoader(root, on_busy_changed=busy.append)
+    results = []
+    try:
+        loader.submit("history", lambda: 42, results.append)
+        assert loader.busy and loader.is_loading("history")
+        assert results == []  # nothing runs until the main loop polls
+        root.pump(lambda: results)
+    finally:
+        loader.shutdown()
+    assert results == [42]
+    assert busy == [True, False]
+    assert not loader.busy
+    assert root.callbacks == []  # polling stops once idle
+
+
+def test_newer_submit_drops_stale_result():
+    root = FakeRoot()
+    loader = BackgroundLoader(root, max_workers=2)
+    release = threading.Event()
+    results = []
+
+    def slow():
+        release.wait(5)
+        return "old"
+
+    finished = threading.Event()
+
+    def stale():
+        value = slow()
+        finished.set()
+        return value
+
+    try:
+        loader.submit("history", stale, results.append)
+        loader.submit("history", lambda: "new", results.append)
+        root.pump(lambda: results)
+        release.set()
+        assert finished.wait(5)
+        # The next poll drains the stale result and must ignore it.
+        loader.submit("schedule", lambda: "other", results.append)
+        root.pump(lambda: not loader.busy)
+    finally:
+        release.set()
+        loader.shutdown()
+    assert results == ["new", "other"]
+
+
+def test_cancel_and_channels_are_independent():
+    root = FakeRoot()
+    busy = []
+    loader = BackgroundLoader(root, on_busy_changed=busy.append)
+    results = []
+    try:
+        loader.submit("schedule", lambda: "schedule", results.append)
+        loader.submit("history", lambda: "history", results.append)
+        loader.cancel("history")
+        assert loader.is_loading("schedule") and not loader.is_loading("history")
+        root.pump(lambda: not loader.busy)
+    finally:
+        loader.shutdown()
+    assert results == ["schedule"]
+    assert busy == [True, False]
+
+
+def test_errors_go_to_the_error_callback():
+    root = FakeRoot()
+    loader = BackgroundLoader(root)
+    errors = []
+
+    def broken():
+        raise RuntimeError("storage offline")
+
+    try:
+        loader.submit("medications", broken, lambda _result: None, errors.append)
+        root.pump(lambda: errors)
+    finally:
+        loader.shutdown()
+    assert isinstance(errors[0], RuntimeError)
+    assert not loader.busy
+
+
+def test_serial_work_runs_in_submission_order():
+    root = FakeRoot()
+    loader = BackgroundLoader(root, max_workers=4)
+    started = []
+    results = []
+
+    def action(index):
+        def _run():
+            started.append(index)
+            time.sleep(0.01 if index == 0 else 0)
+            return index
+
+        return _run
+
+    try:
+        for index in range(5):
+            loader.submit(f"action-{index}", action(index), results.append, serial=True)
+        root.pump(lambda: not loader.busy)
+    finally:
+        loader.shutdown()
+    assert started == [0, 1, 2, 3, 4]
+    assert results == [0, 1, 2, 3, 4]
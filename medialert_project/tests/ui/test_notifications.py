@@ -2,6 +2,7 @@ from datetime import datetime
 from types import SimpleNamespace
 
 from ui import notifications
+from ui.dialogs import DialogService
 from ui.notifications import NotificationManager
 
 
@@ -36,20 +37,24 @@ def test_show_notification_without_tk_triggers_snooze(monkeypatch):
     assert calls == [("snoozed", 5)]
 
 
-def test_handle_action_invokes_callback_and_closes():
-    manager = NotificationManager()
-
-    destroyed = []
-    root = SimpleNamespace(destroy=lambda: destroyed.append(True))
-
+def test_notification_is_queued_and_closes_after_action():
+    service = DialogService(root=SimpleNamespace(), coalesce_ms=0)
+    manager = NotificationManager(service=service)
     calls = []
-    manager._handle_action(
-        root=root,
-        callback=lambda: calls.append("done"),
-        action="taken",
+
+    manager.show_notification(
         dose=DummyDose(),
         medication=DummyMedication(),
+        on_taken=lambda: calls.append("taken"),
+        on_snooze=lambda minutes: calls.append(("snoozed", minutes)),
+        on_missed=lambda: calls.append("missed"),
     )
+    (batch,) = service._take_ready(now=0.0)
+    assert batch.pending[0].skip_label == "Missed"
+
+    destroyed = []
+    window = SimpleNamespace(destroy=lambda: destroyed.append(True))
+    service._resolve(window, batch, "skipped")
 
-    assert calls == ["done"]
+    assert calls == ["missed"]
     assert destroyed == [True]
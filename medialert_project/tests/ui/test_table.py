@@ -0,0 +1,131 @@
+import random
+
+from ui.table import (
+    CallbackSource,
+    ListSource,
+    clamp_offset,
+    diff_rows,
+    offset_for_scroll,
+    scroll_fractions,
+)
+
+
+def _rows(count):
+    return [(f"row-{index}", (index, f"value {index}")) for index in range(count)]
+
+
+def test_list_source_pages_and_lookups():
+    source = ListSource(_rows(50))
+    assert len(source) == 50
+    assert [key for key, _ in source.rows(45, 10)] == [f"row-{index}" for index in range(45, 50)]
+    assert source.index_of("row-7") == 7
+    assert source.row("row-7") == ("row-7", (7, "value 7"))
+    assert source.row("missing") is None
+
+
+def test_callback_source_fetches_only_needed_pages():
+    rows = _rows(1000)
+    fetches = []
+
+    def fetch(offset, limit):
+        fetches.append(offset)
+        return rows[offset : offset + limit]
+
+    source = CallbackSource(lambda: len(rows), fetch, page_size=100, max_pages=2)
+    assert len(source) == 1000
+    window = source.rows(195, 10)
+    assert [key for key, _ in window] == [f"row-{index}" for index in range(195, 205)]
+    assert fetches == [100, 200]
+
+    source.rows(198, 5)
+    assert fetches == [100, 200]
+    source.rows(0, 5)
+    assert fetches == [100, 200, 0]
+    # Page 100 was evicted as least recently used.
+    assert source.index_of("row-150") is None
+    assert source.index_of("row-250") == 250
+
+
+def test_callback_source_requests_missing_pages_once():
+    rows = _rows(1000)
+    requested = []
+    source = CallbackSource(
+        lambda: len(rows), lambda *_: [], page_size=100, request_page=requested.append
+    )
+    source.add_page(0, rows[:100])
+
+    window = source.rows(95, 10)
+    assert [key for key, _ in window[:5]] == [f"row-{index}" for index in range(95, 100)]
+    assert window[5] == ("pending|100", ())
+    source.rows(100, 5)
+    assert requested == [1]
+
+    source.add_page(1, rows[100:200])
+    assert [key for key, _ in source.rows(98, 4)] == [f"row-{index}" for index in range(98, 102)]
+    assert requested == [1]
+
+
+def test_scroll_math_keeps_window_in_range():
+    assert clamp_offset(995, 20, 1000) == 980
+    assert clamp_offset(-3, 20, 1000) == 0
+    assert clamp_offset(5, 20, 10) == 0
+    assert scroll_fractions(100, 20, 1000) == (0.1, 0.12)
+    assert scroll_fractions(0, 20, 0) == (0.0, 1.0)
+    assert offset_for_scroll(0, 20, 1000, "moveto", "0.5") == 500
+    assert offset_for_scroll(500, 20, 1000, "scroll", "1", "pages") == 519
+    assert offset_for_scroll(500, 20, 1000, "scroll", "-1", "units") == 499
+
+
+def _replay(current, ops):
+    """Apply diff operations the way a Treeview would."""
+    order = [key for key, _ in current]
+    values = dict(current)
+    detached = set()
+    for op in ops:
+        kind, key = op[0], op[1]
+        if kind == "delete":
+            order.remove(key)
+        elif kind == "detach":
+            order.remove(key)
+            detached.add(key)
+        elif kind == "insert":
+            order.insert(op[2], key)
+            values[key] = op[3]
+        elif kind == "move":
+            if key not in detached:
+                order.remove(key)
+            order.insert(op[2], key)
+        elif kind == "update":
+            values[key] = op[2]
+    return [(key, values[key]) for key in order]
+
+
+def test_diff_rows_touches_only_changed_rows():
+    current = _rows(10)
+    assert diff_rows(current, current) == []
+
+    updated = list(current)
+    updated[3] = ("row-3", (3, "taken"))
+    assert diff_rows(current, updated) == [("update", "row-3", (3, "taken"))]
+
+    removed = current[:4] + current[5:]
+    assert diff_rows(current, removed) == [("delete", "row-4")]
+
+    moved = current[:2] + current[3:8] + [current[2]] + current[8:]
+    ops = diff_rows(current, moved)
+    assert ops == [("detach", "row-2"), ("move", "row-2", 7)]
+    assert _replay(current, ops) == moved
+
+
+def test_diff_rows_handles_arbitrary_reorders():
+    rng = random.Random(3)
+    for _ in range(200):
+        current = _rows(rng.randint(0, 12))
+        new = [row for row in current if rng.random() > 0.3]
+        new += [(f"new-{index}", (index,)) for index in range(rng.randint(0, 3))]
+        rng.shuffle(new)
+        new = [
+            (key, values + ("changed",)) if rng.random() < 0.2 else (key, values)
+            for key, values in new
+        ]
+        assert _replay(current, diff_rows(current, new)) == new
@@ -0,0 +1,93 @@
+import dataclasses
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from reminders.models import DoseHistoryEntry
+from reminders.sqlite_storage import SQLiteReminderStorage
+from reminders.storage import ReminderStorage
+from ui.history import calculate_metrics, filter_history_entries, metrics_from_counts
+
+
+def _entries():
+    base = datetime(2024, 1, 20, 9, 0)
+    statuses = ["taken", "missed", "snoozed", "skipped", "taken"]
+    return [
+        DoseHistoryEntry(
+            dose_id=f"dose-{index}",
+            medication_id=f"med-{index % 3}",
+            scheduled_time=base + timedelta(hours=13 * index),
+            status=statuses[index % len(statuses)],
+            acted_at=base + timedelta(hours=13 * index),
+            timestamp=base + timedelta(hours=13 * index, minutes=5),
+        )
+        for index in range(200)
+    ]
+
+
+def _raw_counts(entries, start, end):
+    counts = {}
+    for entry in entries:
+        if start <= entry.timestamp < end:
+            statuses = counts.setdefault(entry.medication_id, {})
+            statuses[entry.status] = statuses.get(entry.status, 0) + 1
+    return counts
+
+
+@pytest.mark.parametrize(
+    "make_storage",
+    [
+        lambda path: ReminderStorage(path / "plain.json"),
+        lambda path: ReminderStorage(path / "journal.json", journal=True),
+        lambda path: ReminderStorage(path / "cached.json", cache=True),
+        lambda path: SQLiteReminderStorage(path / "reminders.db"),
+    ],
+)
+def test_aggregates_match_raw_history(tmp_path, make_storage):
+    storage = make_storage(tmp_path)
+    entries = _entries()
+    storage.append_history_many(entries[:150])
+    for entry in entries[150:]:
+        storage.append_history(entry)
+
+    aggregates = storage.load_aggregates()
+    for start, end in [
+        (datetime(2024, 1, 20), datetime(2024, 5, 1)),
+        (datetime(2024, 2, 1), datetime(2024, 3, 1)),
+        (datetime(2024, 1, 29), datetime(2024, 3, 13)),
+    ]:
+        assert aggregates.counts(start, end) == _raw_counts(entries, start, end)
+
+    with pytest.raises(ValueError):
+        aggregates.counts(datetime(2024, 2, 1, 12), datetime(2024, 3, 1))
+
+
+def test_aggregates_are_rebuilt_for_older_documents(tmp_path):
+    path = tmp_path / "storage.json"
+    storage = ReminderStorage(path)
+    entries = _entries()
+    storage.append_history_many(entries[:-1])
+    document = json.loads(path.read_text())
+    del document["aggregates"]
+    path.write_text(json.dumps(document))
+
+    start, end = datetime(2024, 1, 1), datetime(2025, 1, 1)
+    assert storage.load_aggregates().counts(start, end) == _raw_counts(entries[:-1], start, end)
+    storage.append_history(entries[-1])
+    assert storage.load_aggregates().counts(start, end) == _raw_counts(entries, start, end)
+
+
+def test_metrics_from_counts_match_row_metrics(tmp_path):
+    storage = ReminderStorage(tmp_path / "storage.json")
+    entries = _entries()
+    storage.append_history_many(entries)
+    start, end = datetime(2024, 2, 1), datetime(2024, 3, 31)
+
+    counts = storage.load_aggregates().counts(start, end + timedelta(days=1))
+    expected = calculate_metrics(filter_history_entries(entries, start, end))
+    lateness = (expected.lateness_p50_minutes, expected.lateness_p95_minutes)
+    assert metrics_from_counts(counts, None, *lateness) == expected
+    assert metrics_from_counts(counts) == dataclasses.replace(
+        expected, lateness_p50_minutes=None, lateness_p95_minutes=None
+    )
@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from reminders.async_scheduler import AsyncReminderScheduler
+from reminders.models import DoseSchedule, Medication, UpcomingDose
+from reminders.storage import ReminderStorage
+
+
+def _make_medication(start_time: datetime) -> Medication:
+    return Medication(
+        medication_id="med-1",
+        name="Pain Reliever",
+        dosage="10mg",
+        schedule=DoseSchedule(
+            medication_id="med-1",
+            start_time=start_time,
+            repeat_interval=timedelta(hours=8),
+        ),
+    )
+
+
+def _seed_due_dose(storage: ReminderStorage) -> UpcomingDose:
+    storage.upsert_medication(_make_medication(datetime.now() - timedelta(hours=1)))
+    dose = UpcomingDose.create("med-1", datetime.now() - timedelta(minutes=1))
+    storage.upsert_upcoming_dose(dose)
+    return dose
+
+
+def test_coroutine_handler_can_await_transitions(tmp_path):
+    storage = ReminderStorage(tmp_path / "storage.json")
+    dose = _seed_due_dose(storage)
+
+    async def scenario():
+        handled = asyncio.Event()
+
+        async def handler(due_dose, medication, on_taken, on_snooze, on_skip):
+            await on_taken()
+            handled.set()
+
+        scheduler = AsyncReminderScheduler(storage, due_handler=handler)
+        await scheduler.start()
+        try:
+            await asyncio.wait_for(handled.wait(), timeout=2)
+        finally:
+            await scheduler.stop()
+
+    asyncio.run(scenario())
+
+    assert storage.get_upcoming_dose(dose.dose_id) is None
+    assert storage.load_history()[-1].status == "taken"
+    assert len(storage.load_upcoming_doses()) == 1
+
+
+def test_sync_handler_receives_threadsafe_callbacks(tmp_path):
+    storage = ReminderStorage(tmp_path / "storage.json")
+    dose = _seed_due_dose(storage)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        handled = asyncio.Event()
+
+        def handler(due_dose, medication, on_taken, on_snooze, on_skip):
+            on_snooze(15).result(timeout=2)
+            loop.call_soon_threadsafe(handled.set)
+
+        scheduler = AsyncReminderScheduler(storage, due_handler=handler)
+        await scheduler.start()
+        try:
+            await asyncio.wait_for(handled.wait(), timeout=2)
+        finally:
+            await scheduler.stop()
+
+    asyncio.run(scenario())
+
+    snoozed = storage.get_upcoming_dose(dose.dose_id)
+    assert snoozed.snoozed_until > datetime.now() + timedelta(minutes=10)
+    assert snoozed.notified is False
@@ -0,0 +1,25 @@
+from datetime import datetime, time
+
+from reminders.export import to_icalendar
+from reminders.models import DoseSchedule, Medication
+
+
+def test_to_icalendar_emits_one_event_per_occurrence():
+    medication = Medication(
+        medication_id="med-1",
+        name="Pain Reliever",
+        dosage="10mg",
+        instructions="Take with water, after food",
+        schedule=DoseSchedule(
+            medication_id="med-1",
+            start_time=datetime(2024, 1, 1),
+            times_of_day=[time(8, 0), time(20, 0)],
+        ),
+    )
+
+    document = to_icalendar([medication], datetime(2024, 1, 1), datetime(2024, 1, 3))
+
+    assert document.count("BEGIN:VEVENT") == 4
+    assert "DTSTART:20240102T200000" in document
+    assert "DESCRIPTION:Take with water\\, after food" in document
+    assert document.endswith("END:VCALENDAR\r\n")
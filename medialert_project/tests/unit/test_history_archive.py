@@ -0,0 +1,91 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from reminders.history_archive import ARCHIVES_KEY, HistoryArchive, zstandard
+from reminders.history_segments import SEGMENTS_KEY
+from reminders.models import DoseHistoryEntry
+from reminders.storage import ReminderStorage
+
+NOW = datetime(2024, 6, 15, 12, 0)
+
+
+def _entry(index: int) -> DoseHistoryEntry:
+    at = NOW - timedelta(days=100) + timedelta(hours=20 * index)
+    return DoseHistoryEntry(
+        dose_id=f"dose-{index}",
+        medication_id=f"med-{index % 2}",
+        scheduled_time=at,
+        status="missed" if index % 3 == 0 else "taken",
+        acted_at=at,
+        timestamp=at,
+    )
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"cache": True}, {"journal": True}, {"segment_size": 6}],
+    ids=["plain", "cache", "journal", "segments"],
+)
+def test_expired_history_moves_to_monthly_archives(tmp_path, options):
+    path = tmp_path / "storage.json"
+    storage = ReminderStorage(path, retention_days=30, **options)
+    reference = ReminderStorage(tmp_path / "reference.json")
+    for index in range(120):
+        storage.append_history(_entry(index))
+        reference.append_history(_entry(index))
+
+    moved = storage.archive_history(now=NOW)
+    assert moved > 60
+    assert storage.archive_history(now=NOW) == 0
+    if options.get("journal"):
+        storage.compact()
+    document = json.loads(path.read_text())
+    assert sorted(document[ARCHIVES_KEY]) == ["2024-03", "2024-04", "2024-05"]
+    assert len(document["history"]) + 6 * len(document.get(SEGMENTS_KEY, [])) <= 120 - moved
+    assert len(list((tmp_path / "storage.json.archive").iterdir())) == 3
+
+    queries = [
+        {},
+        {"reverse": True, "limit": 5},
+        {"start": NOW - timedelta(days=80), "end": NOW - timedelta(days=50)},
+        {"medication_id": "med-1", "status": "missed"},
+    ]
+    for query in queries:
+        expected = [entry.dose_id for entry in reference.load_history(**query)]
+        assert [entry.dose_id for entry in storage.load_history(**query)] == expected
+        reopened = ReminderStorage(path, **options)
+        assert [entry.dose_id for entry in reopened.load_history(**query)] == expected
+    assert storage.load_aggregates().data == reference.load_aggregates().data
+
+
+def test_archiving_again_rewrites_the_month_and_prunes_the_old_file(tmp_path):
+    path = tmp_path / "storage.json"
+    storage = ReminderStorage(path, retention_days=30)
+    storage.append_history_many(_entry(index) for index in range(10))
+    storage.archive_history(now=NOW)
+    first = json.loads(path.read_text())[ARCHIVES_KEY]["2024-03"]
+
+    storage.append_history_many(_entry(index) for index in range(10, 20))
+    storage.archive_history(now=NOW)
+    archives = json.loads(path.read_text())[ARCHIVES_KEY]
+    assert archives["2024-03"] != first
+    assert sorted(item.name for item in (tmp_path / "storage.json.archive").iterdir()) == sorted(
+        archives.values()
+    )
+    assert [entry.dose_id for entry in storage.load_history()] == [
+        f"dose-{index}" for index in range(20)
+    ]
+
+    storage.reset()
+    assert storage.load_history() == []
+    assert list((tmp_path / "storage.json.archive").iterdir()) == []
+
+
+@pytest.mark.skipif(zstandard is not None, reason="zstandard is installed")
+def test_zstd_archives_need_zstandard(tmp_path):
+    with pytest.raises(ValueError):
+        HistoryArchive(tmp_path, "zstd")
+    with pytest.raises(ValueError):
+        ReminderStorage(tmp_path / "storage.json", archive_compression="lz4")
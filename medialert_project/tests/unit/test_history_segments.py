@@ -0,0 +1,111 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from reminders.history_segments import SEGMENTS_KEY, HistorySegment
+from reminders.migrate import convert_snapshot
+from reminders.models import DoseHistoryEntry
+from reminders.storage import ReminderStorage
+
+BASE = datetime(2024, 1, 1, 8, 0)
+
+
+def _entry(index: int) -> DoseHistoryEntry:
+    at = BASE + timedelta(hours=6 * index)
+    return DoseHistoryEntry(
+        dose_id=f"dose-{index}",
+        medication_id=f"med-{index % 3}",
+        scheduled_time=at,
+        status="missed" if index % 4 == 0 else "taken",
+        acted_at=at + timedelta(minutes=index % 7),
+        timestamp=None if index % 5 == 0 else at + timedelta(minutes=index % 7),
+    )
+
+
+# Appended slightly out of order, as late confirmations are in practice.
+ORDER = [index ^ 1 if index % 6 < 2 else index for index in range(40)]
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"cache": True}, {"journal": True, "compact_threshold": 7}],
+    ids=["plain", "cache", "journal"],
+)
+def test_sealed_history_answers_queries_like_the_document(tmp_path, options):
+    path = tmp_path / "storage.json"
+    segmented = ReminderStorage(path, segment_size=5, **options)
+    reference = ReminderStorage(tmp_path / "reference.json")
+    for index in ORDER:
+        segmented.append_history(_entry(index))
+        reference.append_history(_entry(index))
+    if options.get("journal"):
+        segmented.compact()
+
+    document = json.loads(path.read_text())
+    assert len(document[SEGMENTS_KEY]) >= 6
+    assert len(document["history"]) < 10
+
+    queries = [
+        {},
+        {"reverse": True, "limit": 10},
+        {"start": BASE + timedelta(days=2), "end": BASE + timedelta(days=6)},
+        {"medication_id": "med-1", "status": "missed"},
+        {"status": "taken", "reverse": True, "limit": 3},
+    ]
+    for query in queries:
+        expected = [entry.dose_id for entry in reference.load_history(**query)]
+        assert [entry.dose_id for entry in segmented.load_history(**query)] == expected
+        reopened = ReminderStorage(path, **options)
+        assert [entry.dose_id for entry in reopened.load_history(**query)] == expected
+    assert segmented.load_aggregates().data == reference.load_aggregates().data
+
+
+def test_iter_history_skips_segments_outside_the_range(tmp_path, monkeypatch):
+    storage = ReminderStorage(tmp_path / "storage.json", segment_size=5)
+    storage.append_history_many(_entry(index) for index in range(40))
+    decoded = []
+    original = HistorySegment._entry
+
+    def counting_entry(segment, record):
+        decoded.append(segment.path.name)
+        return original(segment, record)
+
+    monkeypatch.setattr(HistorySegment, "_entry", counting_entry)
+
+    newest = storage.iter_history(reverse=True)
+    assert [next(newest).dose_id for _ in range(3)] == ["dose-39", "dose-38", "dose-37"]
+    assert decoded == []
+
+    window = storage.load_history(BASE, BASE + timedelta(days=1))
+    assert [entry.dose_id for entry in window] == ["dose-0", "dose-1", "dose-2", "dose-3"]
+    assert len(decoded) == 4 and len(set(decoded)) == 1
+
+
+def test_segment_footer_and_reset(tmp_path):
+    path = tmp_path / "storage.json"
+    storage = ReminderStorage(path, segment_size=4)
+    storage.append_history_many(_entry(index) for index in range(8))
+    (name,) = json.loads(path.read_text())[SEGMENTS_KEY]
+
+    segment = HistorySegment(tmp_path / "storage.json.segments" / name)
+    assert segment.count == 4
+    assert segment.min_key == BASE
+    assert segment.max_key == BASE + timedelta(hours=18, minutes=3)
+    assert segment.status_counts == {"missed": 1, "taken": 3}
+    segment.close()
+
+    storage.reset()
+    assert storage.load_history() == []
+    assert list((tmp_path / "storage.json.segments").iterdir()) == []
+
+
+def test_convert_snapshot_copies_segments(tmp_path):
+    source = tmp_path / "storage.json"
+    ReminderStorage(source, segment_size=4).append_history_many(_entry(i) for i in range(12))
+
+    convert_snapshot(source, tmp_path / "storage.rbin")
+    converted = ReminderStorage(tmp_path / "storage.rbin")
+    assert [entry.dose_id for entry in converted.load_history()] == [
+        f"dose-{index}" for index in range(12)
+    ]
@@ -0,0 +1,88 @@
+import json
+from datetime import datetime, timedelta
+
+from reminders.models import DoseHistoryEntry, DoseSchedule, Medication, UpcomingDose
+from reminders.storage import ReminderStorage
+
+
+def _make_medication() -> Medication:
+    return Medication(
+        medication_id="med-1",
+        name="Pain Reliever",
+        dosage="10mg",
+        schedule=DoseSchedule(
+            medication_id="med-1",
+            start_time=datetime.now(),
+            repeat_interval=timedelta(hours=8),
+        ),
+    )
+
+
+def _history_entry(dose: UpcomingDose) -> DoseHistoryEntry:
+    now = datetime.now()
+    return DoseHistoryEntry(
+        dose_id=dose.dose_id,
+        medication_id=dose.medication_id,
+        scheduled_time=dose.scheduled_time,
+        status="taken",
+        acted_at=now,
+        timestamp=now,
+    )
+
+
+def test_journal_mode_appends_without_rewriting_snapshot(tmp_path):
+    path = tmp_path / "reminders.json"
+    storage = ReminderStorage(path, journal=True)
+    snapshot_before = path.read_text()
+
+    storage.upsert_medication(_make_medication())
+    dose = UpcomingDose.create("med-1", datetime.now() + timedelta(minutes=5))
+    storage.upsert_upcoming_dose(dose)
+    storage.append_history(_history_entry(dose))
+    storage.remove_upcoming_dose(dose.dose_id)
+
+    assert path.read_text() == snapshot_before
+    lines = (tmp_path / "reminders.json.journal").read_text().splitlines()
+    assert [json.loads(line)["op"] for line in lines] == [
+        "upsert_medication",
+        "upsert_upcoming_dose",
+        "append_history",
+        "remove_upcoming_dose",
+    ]
+
+    reopened = ReminderStorage(path, journal=True)
+    assert reopened.get_medication("med-1") is not None
+    assert reopened.load_upcoming_doses() == []
+    assert len(reopened.load_history()) == 1
+
+
+def test_existing_document_migrates_and_compacts(tmp_path):
+    path = tmp_path / "reminders.json"
+    legacy = ReminderStorage(path)
+    legacy.upsert_medication(_make_medication())
+
+    storage = ReminderStorage(path, journal=True, compact_threshold=3)
+    assert storage.get_medication("med-1") is not None
+
+    dose = UpcomingDose.create("med-1", datetime.now())
+    for _ in range(3):
+        storage.append_history(_history_entry(dose))
+
+    assert (tmp_path / "reminders.json.journal").read_text() == ""
+    plain = ReminderStorage(path)
+    assert len(plain.load_history()) == 3
+    assert plain.get_medication("med-1") is not None
+
+
+def test_torn_journal_tail_is_discarded(tmp_path):
+    path = tmp_path / "reminders.json"
+    storage = ReminderStorage(path, journal=True)
+    storage.upsert_medication(_make_medication())
+    journal_path = tmp_path / "reminders.json.journal"
+    with journal_path.open("a", encoding="utf-8") as handle:
+        handle.write('{"seq": 2, "op": "append_hist')
+
+    reopened = ReminderStorage(path, journal=True)
+    assert reopened.get_medication("med-1") is not None
+    assert reopened.load_history() == []
+    assert journal_path.read_text().endswith("\n")
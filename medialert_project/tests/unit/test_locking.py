@@ -0,0 +1,108 @@
+import multiprocessing
+from datetime import datetime, timedelta
+
+import pytest
+
+from reminders import locking
+from reminders.locking import fcntl
+from reminders.models import UpcomingDose
+from reminders.storage import ReminderStorage, StorageConflictError
+
+PROCESSES = 4
+WRITES = 25
+
+
+def _hammer(path, options, worker):
+    storage = ReminderStorage(path, **options)
+    base = datetime(2024, 1, 1, 8, 0)
+    for index in range(WRITES):
+        dose = UpcomingDose.create(f"med-{worker}", base + timedelta(minutes=index))
+        dose.dose_id = f"dose-{worker}-{index}"
+        storage.upsert_upcoming_dose(dose)
+
+
+@pytest.mark.skipif(fcntl is None, reason="advisory locks need fcntl")
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"journal": True, "compact_threshold": 10}, {"journal": True, "cache": True}],
+    ids=["plain", "journal", "journal-cache"],
+)
+def test_concurrent_processes_do_not_lose_updates(tmp_path, options):
+    path = tmp_path / "storage.json"
+    storage = ReminderStorage(path, **options)
+    start_version = storage.version
+
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(target=_hammer, args=(path, options, worker))
+        for worker in range(PROCESSES)
+    ]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    expected = {f"dose-{w}-{i}" for w in range(PROCESSES) for i in range(WRITES)}
+    assert {dose.dose_id for dose in storage.load_upcoming_doses()} == expected
+    assert storage.version == start_version + PROCESSES * WRITES
+    reopened = ReminderStorage(path, **options)
+    assert {dose.dose_id for dose in reopened.load_upcoming_doses()} == expected
+
+
+@pytest.mark.parametrize("options", [{}, {"journal": True}], ids=["plain", "journal"])
+def test_compare_and_swap_transaction_detects_other_writers(tmp_path, options):
+    path = tmp_path / "storage.json"
+    first = ReminderStorage(path, **options)
+    second = ReminderStorage(path, **options)
+    dose = UpcomingDose.create("med-1", datetime(2024, 1, 1, 8, 0))
+
+    seen = first.version
+    second.upsert_upcoming_dose(dose)
+    assert first.version == seen + 1
+
+    with pytest.raises(StorageConflictError) as excinfo:
+        with first.transaction(expected_version=seen):
+            first.remove_upcoming_dose(dose.dose_id)
+    assert excinfo.value.actual == seen + 1
+    assert first.get_upcoming_dose(dose.dose_id) is not None
+
+    with first.transaction(expected_version=seen + 1):
+        first.remove_upcoming_dose(dose.dose_id)
+    assert second.get_upcoming_dose(dose.dose_id) is None
+    assert second.version == seen + 2
+
+
+def test_journaled_reader_catches_up_from_the_journal_tail(tmp_path):
+    path = tmp_path / "storage.json"
+    reader = ReminderStorage(path, journal=True)
+    writer = ReminderStorage(path, journal=True, compact_threshold=3)
+    doses = [UpcomingDose.create("med-1", datetime(2024, 1, 1, hour)) for hour in range(5)]
+
+    writer.upsert_upcoming_dose(doses[0])
+    assert [dose.dose_id for dose in reader.load_upcoming_doses()] == [doses[0].dose_id]
+
+    # The writer compacts after its third record, truncating the journal.
+    for dose in doses[1:]:
+        writer.upsert_upcoming_dose(dose)
+    assert [dose.dose_id for dose in reader.load_upcoming_doses()] == [
+        dose.dose_id for dose in doses
+    ]
+    reader.remove_upcoming_dose(doses[0].dose_id)
+    assert len(writer.load_upcoming_doses()) == 4
+
+
+def test_storage_works_without_pwrite_or_fcntl(tmp_path, monkeypatch):
+    # What Windows provides: no os.pwrite and no advisory locks.
+    monkeypatch.delattr(locking.os, "pwrite", raising=False)
+    monkeypatch.setattr(locking, "fcntl", None)
+    path = tmp_path / "storage.json"
+    first = ReminderStorage(path)
+    second = ReminderStorage(path)
+    dose = UpcomingDose.create("med-1", datetime(2024, 1, 1, 8, 0))
+
+    seen = first.version
+    first.upsert_upcoming_dose(dose)
+    second.remove_upcoming_dose(dose.dose_id)
+    assert first.version == second.version == seen + 2
+    assert first.get_upcoming_dose(dose.dose_id) is None
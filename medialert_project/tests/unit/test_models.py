@@ -0,0 +1,120 @@
+import random
+from datetime import datetime, time, timedelta
+
+from reminders import models
+from reminders.models import DoseSchedule
+
+
+def _brute_force_next_due(schedule: DoseSchedule, after: datetime):
+    search_date = after.date()
+    for _ in range(400):
+        for scheduled_time in sorted(schedule.times_of_day):
+            candidate = datetime.combine(search_date, scheduled_time)
+            if candidate >= schedule.start_time and candidate > after:
+                return candidate
+        search_date += timedelta(days=1)
+    return None
+
+
+def _times_schedule(start: datetime) -> DoseSchedule:
+    return DoseSchedule(
+        medication_id="med-1",
+        start_time=start,
+        times_of_day=[time(20, 0), time(8, 0), time(13, 30), time(8, 0)],
+    )
+
+
+def test_times_of_day_next_due_matches_exhaustive_search():
+    rng = random.Random(7)
+    base = datetime(2024, 3, 1, 0, 0)
+    for _ in range(500):
+        start = base + timedelta(minutes=rng.randrange(0, 60 * 24 * 60))
+        schedule = _times_schedule(start)
+        after = base + timedelta(minutes=rng.randrange(0, 60 * 24 * 60))
+        assert schedule.next_due(after) == _brute_force_next_due(schedule, after)
+
+
+def test_times_of_day_has_no_two_week_horizon():
+    schedule = _times_schedule(datetime(2024, 6, 1, 9, 0))
+    assert schedule.next_due(datetime(2024, 1, 1)) == datetime(2024, 6, 1, 13, 30)
+
+
+def test_reassigning_times_of_day_recompiles_offsets():
+    schedule = _times_schedule(datetime(2024, 1, 1))
+    assert schedule.next_due(datetime(2024, 1, 2, 8, 0)) == datetime(2024, 1, 2, 13, 30)
+    schedule.times_of_day = [time(9, 0)]
+    assert schedule.next_due(datetime(2024, 1, 2, 8, 0)) == datetime(2024, 1, 2, 9, 0)
+
+
+def test_next_due_many_matches_scalar(monkeypatch):
+    afters = [datetime(2024, 1, 1) + timedelta(minutes=37 * step) for step in range(200)]
+    schedules = [
+        _times_schedule(datetime(2024, 1, 2, 10, 0)),
+        DoseSchedule("med-2", datetime(2024, 1, 2, 10, 0), repeat_interval=timedelta(hours=7)),
+        DoseSchedule("med-3", datetime(2024, 1, 2, 10, 0)),
+    ]
+    for schedule in schedules:
+        expected = [schedule.next_due(after) for after in afters]
+        assert schedule.next_due_many(afters) == expected
+        monkeypatch.setattr(models, "np", None)
+        assert schedule.next_due_many(afters) == expected
+        monkeypatch.undo()
+
+
+def test_occurrences_cover_window_for_both_schedule_kinds():
+    start, end = datetime(2024, 1, 3, 9, 0), datetime(2024, 1, 5, 9, 0)
+    schedules = [
+        _times_schedule(datetime(2024, 1, 1)),
+        _times_schedule(datetime(2024, 1, 4, 12, 0)),
+        DoseSchedule("med-2", datetime(2024, 1, 1, 6, 0), repeat_interval=timedelta(hours=7)),
+        DoseSchedule("med-3", datetime(2024, 1, 4, 10, 0)),
+        DoseSchedule("med-4", datetime(2024, 1, 1, 10, 0)),
+    ]
+    for schedule in schedules:
+        expected = []
+        cursor = start - timedelta(microseconds=1)
+        while True:
+            cursor = schedule.next_due(cursor)
+            if cursor is None or cursor >= end:
+                break
+            expected.append(cursor)
+        assert list(schedule.occurrences(start, end)) == expected
+        assert schedule.occurrence_array(start, end).tolist() == expected
+
+
+def test_datetime_codec_round_trips_iso_and_epoch():
+    value = datetime(2024, 5, 6, 7, 8, 9, 123456)
+    assert models._to_iso(value) == value.strftime(models.ISO_FORMAT)
+    assert models._from_iso(models._to_iso(value)) == value
+    assert models._from_iso(models._to_epoch(value)) == value
+    assert models._from_iso("2024-05-06T07:08:09Z") == datetime(2024, 5, 6, 7, 8, 9)
+
+
+def test_epoch_payloads_deserialize_like_iso_payloads():
+    dose = models.UpcomingDose.create("med-1", datetime(2024, 5, 6, 7, 8, 9, 5))
+    payload = dose.to_dict(epoch=True)
+    assert isinstance(payload["scheduled_time"], int)
+    assert models.UpcomingDose.from_dict(payload) == dose
+
+
+def test_history_records_are_slotted_and_round_trip():
+    now = datetime(2024, 5, 6, 7, 8, 9)
+    entry = models.DoseHistoryEntry(
+        dose_id="dose-1",
+        medication_id="med-1",
+        scheduled_time=now,
+        status="taken",
+        acted_at=now,
+    )
+    assert not hasattr(entry, "__dict__")
+    assert not hasattr(models.UpcomingDose.create("med-1", now), "__dict__")
+
+    restored = models.DoseHistoryEntry.from_dict(entry.to_dict())
+    assert restored == models.DoseHistoryEntry(
+        dose_id="dose-1",
+        medication_id="med-1",
+        scheduled_time=now,
+        status="taken",
+        acted_at=now,
+        timestamp=now,
+    )
@@ -0,0 +1,74 @@
+import threading
+from datetime import datetime, timedelta
+
+from reminders.models import DoseSchedule, Medication, UpcomingDose
+from reminders.multi_tenant import MultiTenantScheduler
+from reminders.storage import ReminderStorage
+
+
+def _seed_due_dose(storage: ReminderStorage, medication_id: str) -> UpcomingDose:
+    storage.upsert_medication(
+        Medication(
+            medication_id=medication_id,
+            name=medication_id.title(),
+            dosage="10mg",
+            schedule=DoseSchedule(
+                medication_id=medication_id,
+                start_time=datetime.now() - timedelta(hours=1),
+                repeat_interval=timedelta(hours=8),
+            ),
+        )
+    )
+    dose = UpcomingDose.create(medication_id, datetime.now() - timedelta(minutes=1))
+    storage.upsert_upcoming_dose(dose)
+    return dose
+
+
+def test_tenants_fire_through_their_own_handlers(tmp_path):
+    scheduler = MultiTenantScheduler(max_workers=2)
+    received = {"alice": [], "bob": []}
+    done = threading.Semaphore(0)
+
+    def handler_for(tenant_id):
+        def handler(dose, medication, on_taken, *_):
+            received[tenant_id].append(medication.medication_id)
+            on_taken()
+            done.release()
+
+        return handler
+
+    doses = {}
+    for tenant_id in received:
+        storage = ReminderStorage(tmp_path / f"{tenant_id}.json")
+        doses[tenant_id] = _seed_due_dose(storage, f"{tenant_id}-med")
+        scheduler.add_tenant(tenant_id, storage, due_handler=handler_for(tenant_id))
+
+    scheduler.start()
+    try:
+        assert done.acquire(timeout=2) and done.acquire(timeout=2)
+    finally:
+        scheduler.stop()
+
+    assert received == {"alice": ["alice-med"], "bob": ["bob-med"]}
+    for tenant_id, stats in scheduler.stats().items():
+        assert stats.fired == 1
+        # The follow-up dose scheduled by on_taken is queued for later.
+        assert stats.queued == 1
+        storage = scheduler.tenant(tenant_id).storage
+        assert storage.load_history()[-1].medication_id == f"{tenant_id}-med"
+
+
+def test_scheduler_can_restart_after_stop(tmp_path):
+    scheduler = MultiTenantScheduler(max_workers=1, resync_interval=0.05)
+    fired = threading.Semaphore(0)
+    storage = ReminderStorage(tmp_path / "tenant.json")
+    scheduler.add_tenant("alice", storage, due_handler=lambda *args: fired.release())
+
+    scheduler.start()
+    scheduler.stop()
+    _seed_due_dose(storage, "alice-med")
+    scheduler.start()
+    try:
+        assert fired.acquire(timeout=2)
+    finally:
+        scheduler.stop()
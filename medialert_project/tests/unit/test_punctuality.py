@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from reminders.models import DoseHistoryEntry
+from reminders.punctuality import analyze_punctuality, punctuality_for_range
+from reminders.storage import ReminderStorage
+
+
+def _entry(index, minutes_late, status="taken", medication_id="med-1"):
+    scheduled = datetime(2024, 6, 3, 8, 0) + timedelta(days=index)
+    acted = scheduled + timedelta(minutes=minutes_late)
+    return DoseHistoryEntry(
+        dose_id=f"dose-{index}",
+        medication_id=medication_id,
+        scheduled_time=scheduled,
+        status=status,
+        acted_at=acted,
+        timestamp=acted,
+    )
+
+
+def test_punctuality_report_tracks_lateness_per_medication():
+    entries = [_entry(index, index) for index in range(100)]
+    entries.append(_entry(100, -10, medication_id="med-2"))
+    entries.append(_entry(101, 500, status="missed"))
+
+    report = analyze_punctuality(entries)
+    profile = report.by_medication["med-1"]
+    assert profile.count == 100
+    assert profile.percentile(50) == pytest.approx(49, rel=0.02)
+    assert profile.percentile(95) == pytest.approx(94, rel=0.02)
+    assert profile.histogram == [0, 5, 10, 15, 30, 40, 0]
+    assert report.by_medication["med-2"].histogram[0] == 1
+    assert report.overall.count == 101
+
+    heatmap = profile.heatmap()
+    # 2024-06-03 is a Monday; every dose is scheduled at 08:00.
+    assert heatmap[0][8] == pytest.approx(sum(range(0, 100, 7)) / len(range(0, 100, 7)))
+    assert heatmap[0][9] is None
+
+
+def test_punctuality_for_range_reads_storage_window(tmp_path):
+    storage = ReminderStorage(tmp_path / "storage.json")
+    storage.append_history_many(_entry(index, 30) for index in range(10))
+
+    report = punctuality_for_range(storage, datetime(2024, 6, 5), datetime(2024, 6, 8))
+    assert report.overall.count == 3
+    assert report.overall.percentile(50) == pytest.approx(30, rel=0.02)
@@ -0,0 +1,126 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from reminders.models import DoseHistoryEntry
+from reminders.rollups import HistorySummary, compact_rollups, summarize_range
+from reminders.sketch import QuantileSketch
+from reminders.sqlite_storage import SQLiteReminderStorage
+from reminders.storage import ReminderStorage
+from ui.history import calculate_metrics, filter_history_entries, metrics_from_summary
+
+
+def _entries(days=20):
+    base = datetime(2024, 3, 1, 7, 30)
+    entries = []
+    for index in range(days * 4):
+        scheduled = base + timedelta(hours=6 * index)
+        entries.append(
+            DoseHistoryEntry(
+                dose_id=f"dose-{index}",
+                medication_id=f"med-{index % 2}",
+                scheduled_time=scheduled,
+                status="missed" if index % 5 == 0 else "taken",
+                acted_at=scheduled + timedelta(minutes=index % 45),
+                timestamp=scheduled + timedelta(minutes=index % 45),
+            )
+        )
+    return entries
+
+
+def _raw_summary(entries, start, end):
+    summary = HistorySummary()
+    for entry in entries:
+        if start <= entry.timestamp < end:
+            summary.add(entry)
+    return summary
+
+
+def test_quantile_sketch_stays_within_relative_accuracy():
+    rng = random.Random(7)
+    values = [rng.expovariate(1 / 600) for _ in range(5000)]
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+    exact = sorted(values)[int(0.95 * (len(values) - 1))]
+    assert sketch.quantile(0.95) == pytest.approx(exact, rel=0.02)
+    assert QuantileSketch.from_dict(sketch.to_dict()).quantile(0.5) == sketch.quantile(0.5)
+
+
+@pytest.mark.parametrize(
+    "make_storage",
+    [
+        lambda path: ReminderStorage(path / "plain.json"),
+        lambda path: ReminderStorage(path / "cached.json", cache=True, journal=True),
+        lambda path: SQLiteReminderStorage(path / "reminders.db"),
+    ],
+)
+def test_summaries_combine_rollups_with_raw_edges(tmp_path, make_storage):
+    storage = make_storage(tmp_path)
+    entries = _entries()
+    storage.append_history_many(entries)
+
+    assert compact_rollups(storage, now=datetime(2024, 3, 15, 12)) == 14
+    assert compact_rollups(storage, now=datetime(2024, 3, 15, 12)) == 0
+    # A late entry for a closed day invalidates that day's rollup only.
+    late = DoseHistoryEntry(
+        dose_id="late",
+        medication_id="med-0",
+        scheduled_time=datetime(2024, 3, 4, 8),
+        status="taken",
+        acted_at=datetime(2024, 3, 4, 9),
+        timestamp=datetime(2024, 3, 4, 9),
+    )
+    storage.append_history(late)
+    entries.append(late)
+    assert datetime(2024, 3, 4).date() not in storage.load_rollups()
+    assert len(storage.load_rollups()) == 13
+
+    start, end = datetime(2024, 3, 2, 13, 0), datetime(2024, 3, 18, 5, 0)
+    summary = summarize_range(storage, start, end)
+    expected = _raw_summary(entries, start, end)
+    assert summary.counts == expected.counts
+    assert summary.delay.count == expected.delay.count
+    assert summary.mean_delay == pytest.approx(expected.mean_delay)
+    assert summary.p95_delay == expected.p95_delay
+
+    assert compact_rollups(storage, now=datetime(2024, 3, 15, 12)) == 1
+    assert summarize_range(storage, start, end).counts == expected.counts
+
+
+def test_compaction_reads_only_days_without_rollups(tmp_path):
+    storage = ReminderStorage(tmp_path / "storage.json")
+    storage.append_history_many(_entries())
+    compact_rollups(storage, now=datetime(2024, 3, 15, 12))
+
+    ranges = []
+    original = storage.load_history
+
+    def recording_load_history(start=None, end=None, **kwargs):
+        ranges.append((start, end, kwargs.get("limit")))
+        return original(start, end, **kwargs)
+
+    storage.load_history = recording_load_history
+    assert compact_rollups(storage, now=datetime(2024, 3, 17, 12)) == 2
+    assert [item for item in ranges if item[2] is None] == [
+        (datetime(2024, 3, 15), datetime(2024, 3, 17), None)
+    ]
+
+
+def test_history_metrics_from_rollup_summary(tmp_path):
+    storage = ReminderStorage(tmp_path / "storage.json")
+    entries = _entries()
+    storage.append_history_many(entries)
+    compact_rollups(storage, now=datetime(2024, 3, 15, 12))
+
+    start, end = datetime(2024, 3, 2), datetime(2024, 3, 18)
+    metrics = metrics_from_summary(summarize_range(storage, start, end), {"med-1": "Aspirin"})
+    expected = calculate_metrics(filter_history_entries(entries, start, end - timedelta(days=1)))
+    assert metrics.status_counts == expected.status_counts
+    assert metrics.adherence_percent == expected.adherence_percent
+    assert metrics.missed_by_medication == {
+        "Aspirin" if medication == "med-1" else medication: count
+        for medication, count in expected.missed_by_medication.items()
+    }
+    assert metrics.lateness_p95_minutes == pytest.approx(expected.lateness_p95_minutes, rel=0.05)
@@ -1,8 +1,11 @@
 import threading
 from datetime import datetime, timedelta
 
+import pytest
+
 from reminders.models import DoseSchedule, Medication, UpcomingDose
 from reminders.scheduler import ReminderScheduler
+from reminders.sqlite_storage import SQLiteReminderStorage
 from reminders.storage import ReminderStorage
 
 
@@ -80,3 +83,168 @@ def test_scheduler_triggers_due_handler(tmp_path):
         scheduler.stop()
 
     assert calls == [(dose.dose_id, medication.medication_id)]
+
+
+def test_event_mode_wakes_for_newly_added_dose(tmp_path):
+    storage = ReminderStorage(tmp_path / "storage.json")
+    triggered = threading.Event()
+    calls = []
+
+    def handler(d, med, *_callbacks):
+        calls.append(d.dose_id)
+        triggered.set()
+
+    scheduler = ReminderScheduler(storage, due_handler=handler, poll_interval=60, mode="event")
+    scheduler.start()
+    try:
+        scheduler.add_medication(_make_medication(datetime.now() + timedelta(milliseconds=200)))
+        assert triggered.wait(timeout=2), "Event-driven scheduler did not wake for the dose"
+    finally:
+        scheduler.stop()
+
+    assert len(calls) == 1
+    assert storage.load_upcoming_doses()[0].notified is True
+
+
+def test_event_mode_skips_stale_queue_entries(tmp_path):
+    storage = ReminderStorage(tmp_path / "storage.json")
+    medication = _make_medication(datetime.now() - timedelta(hours=1))
+    storage.upsert_medication(medication)
+    dose = UpcomingDose.create(medication.medication_id, datetime.now() - timedelta(minutes=1))
+    storage.upsert_upcoming_dose(dose)
+
+    calls = []
+    scheduler = ReminderScheduler(
+        storage, due_handler=lambda d, *_: calls.append(d.dose_id), mode="event"
+    )
+    scheduler._rebuild_queue()
+    scheduler.snooze(dose.dose_id, 30)
+    scheduler._dispatch_due(datetime.now())
+
+    assert calls == []
+    assert scheduler._seconds_until_next_due() > 60
+
+
+def test_plan_merges_occurrences_across_medications(tmp_path):
+    storage = ReminderStorage(tmp_path / "storage.json")
+    start = datetime(2024, 1, 1, 8, 0)
+    storage.upsert_medication(_make_medication(start, repeat_hours=8))
+    other = _make_medication(start + timedelta(hours=1), repeat_hours=12)
+    other.medication_id = other.schedule.medication_id = "med-2"
+    storage.upsert_medication(other)
+
+    plan = ReminderScheduler(storage).plan(start, start + timedelta(hours=24))
+
+    assert [(due.hour, med.medication_id) for due, med in plan] == [
+        (8, "med-1"),
+        (9, "med-2"),
+        (16, "med-1"),
+        (21, "med-2"),
+        (0, "med-1"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "factory",
+    [
+        lambda path: ReminderStorage(path / "storage.json"),
+        lambda path: ReminderStorage(path / "storage.json", journal=True, cache=True),
+        lambda path: SQLiteReminderStorage(path / "storage.db"),
+    ],
+    ids=["json", "journal-cache", "sqlite"],
+)
+def test_batch_actions_apply_in_one_transaction(tmp_path, factory):
+    storage = factory(tmp_path)
+    medications = []
+    doses = []
+    for index in range(5):
+        medication = _make_medication(datetime.now() - timedelta(hours=1))
+        medication.medication_id = medication.schedule.medication_id = f"med-{index}"
+        storage.upsert_medication(medication)
+        dose = UpcomingDose.create(medication.medication_id, datetime.now() - timedelta(minutes=5))
+        storage.upsert_upcoming_dose(dose)
+        medications.append(medication)
+        doses.append(dose)
+
+    transactions = []
+    original = storage.transaction
+
+    def counting_transaction():
+        transactions.append(True)
+        return original()
+
+    storage.transaction = counting_transaction
+    scheduler = ReminderScheduler(storage)
+
+    taken = scheduler.mark_many([dose.dose_id for dose in doses[:3]] + ["unknown"], "taken")
+    snoozed = scheduler.snooze_many([dose.dose_id for dose in doses[3:]], 15)
+
+    assert [dose.dose_id for dose in taken] == [dose.dose_id for dose in doses[:3]]
+    assert len(snoozed) == 2
+    assert len(transactions) == 2
+    upcoming = {dose.dose_id: dose for dose in storage.load_upcoming_doses()}
+    assert all(dose.dose_id not in upcoming for dose in doses[:3])
+    assert all(upcoming[dose.dose_id].snoozed_until for dose in doses[3:])
+    # Each resolved dose got its follow-up.
+    assert len(upcoming) == 5
+    history = storage.load_history()
+    assert [entry.status for entry in history].count("taken") == 3
+    assert [entry.status for entry in history].count("snoozed") == 2
+    with pytest.raises(ValueError):
+        scheduler.mark_many([doses[3].dose_id], "pending")
+
+
+def test_batch_mark_rewrites_json_document_once(tmp_path):
+    storage = ReminderStorage(tmp_path / "storage.json")
+    medication = _make_medication(datetime.now() - timedelta(hours=1))
+    storage.upsert_medication(medication)
+    doses = [
+        UpcomingDose.create(medication.medication_id, datetime.now() - timedelta(minutes=m))
+        for m in range(1, 11)
+    ]
+    storage.save_upcoming_doses(doses)
+
+    writes = []
+    original = storage._write_state
+    storage._write_state = lambda state: (writes.append(True), original(state))
+
+    ReminderScheduler(storage).mark_many([dose.dose_id for dose in doses], "missed")
+
+    assert len(writes) == 1
+    assert len(storage.load_history()) == 10
+
+
+def test_idle_maintenance_archives_history_between_doses(tmp_path):
+    storage = ReminderStorage(tmp_path / "storage.json", retention_days=1)
+    calls = []
+    storage.archive_history = lambda: calls.append("archive") or 0
+    scheduler = ReminderScheduler(storage, maintenance_interval=3600)
+
+    scheduler._maintain_if_idle(5.0)
+    assert calls == []
+    scheduler._maintain_if_idle(None)
+    scheduler._maintain_if_idle(600.0)
+    assert calls == ["archive"]
+
+    scheduler.maintenance_interval = 0
+    scheduler._maintain_if_idle(600.0)
+    assert calls == ["archive", "archive"]
+    ReminderScheduler(SQLiteReminderStorage(tmp_path / "db.sqlite"))._maintain_if_idle(None)
+
+
+def test_batch_actions_fall_back_to_single_entry_loggers(tmp_path):
+    class LegacyLogger:
+        def __init__(self):
+            self.logged = []
+
+        def log_action(self, dose, status, *, notes="", acted_at=None):
+            self.logged.append((dose.dose_id, status))
+
+    storage = ReminderStorage(tmp_path / "storage.json")
+    logger = LegacyLogger()
+    scheduler = ReminderScheduler(storage, action_logger=logger)
+    doses = [UpcomingDose.create("med-1", datetime(2024, 1, 1, hour)) for hour in (8, 9)]
+    storage.save_upcoming_doses(doses)
+
+    scheduler.mark_many([dose.dose_id for dose in doses], "missed")
+    assert logger.logged == [(doses[0].dose_id, "missed"), (doses[1].dose_id, "missed")]
@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from reminders.migrate import convert_snapshot, main
+from reminders.models import DoseHistoryEntry, DoseSchedule, Medication, UpcomingDose
+from reminders import snapshot_codec
+from reminders.snapshot_codec import SnapshotFormatError, SnapshotReader
+from reminders.storage import ReminderStorage
+
+BASE = datetime(2024, 3, 1, 8, 0)
+
+
+def _populate(storage: ReminderStorage) -> None:
+    schedule = DoseSchedule("med-1", BASE, repeat_interval=timedelta(hours=8))
+    storage.upsert_medication(Medication("med-1", "Aspirin", "10mg", "", schedule, ["am"]))
+    dose = UpcomingDose.create("med-1", BASE + timedelta(days=2))
+    dose.dose_id = "dose-next"
+    dose.snoozed_until = BASE + timedelta(days=2, minutes=10)
+    storage.upsert_upcoming_dose(dose)
+    storage.append_history_many(
+        DoseHistoryEntry(
+            dose_id=f"dose-{day}",
+            medication_id="med-1",
+            scheduled_time=BASE + timedelta(days=day),
+            status="taken" if day % 2 else "missed",
+            acted_at=BASE + timedelta(days=day, minutes=5),
+            timestamp=None if day == 0 else BASE + timedelta(days=day, minutes=5),
+            notes="late" if day == 1 else "",
+        )
+        for day in range(4)
+    )
+
+
+@pytest.mark.parametrize("options", [{}, {"journal": True}, {"cache": True}])
+def test_binary_storage_round_trips_all_entities(tmp_path, options):
+    path = tmp_path / "storage.rbin"
+    _populate(ReminderStorage(path, **options))
+    reference = ReminderStorage(tmp_path / "storage.json")
+    _populate(reference)
+
+    reopened = ReminderStorage(path, **options)
+    assert reopened.load_medications() == reference.load_medications()
+    assert reopened.load_upcoming_doses()[0] == reference.load_upcoming_doses()[0]
+    assert reopened.load_history() == reference.load_history()
+    assert reopened.load_aggregates().data == reference.load_aggregates().data
+    assert reopened.version == reference.version
+    assert path.read_bytes()[:4] == b"RBIN"
+
+
+def test_reader_looks_up_records_without_full_decode(tmp_path):
+    path = tmp_path / "storage.rbin"
+    storage = ReminderStorage(path)
+    _populate(storage)
+
+    with SnapshotReader(path) as reader:
+        assert reader.history_count == 4
+        assert reader.upcoming_dose("dose-next")["medication_id"] == "med-1"
+        assert reader.upcoming_dose("dose-missing") is None
+        assert reader.medication("med-1")["tags"] == ["am"]
+        in_range = list(reader.history(BASE + timedelta(days=1), BASE + timedelta(days=3)))
+    assert [entry["dose_id"] for entry in in_range] == ["dose-1", "dose-2"]
+
+    history = storage.load_history(BASE + timedelta(days=1), status="taken")
+    assert [entry.dose_id for entry in history] == ["dose-1", "dose-3"]
+    assert storage.get_upcoming_dose("dose-next").snoozed_until == BASE + timedelta(
+        days=2, minutes=10
+    )
+    assert storage.get_medication("med-1").name == "Aspirin"
+
+
+def test_reader_bisects_id_indexes(tmp_path, monkeypatch):
+    path = tmp_path / "storage.rbin"
+    storage = ReminderStorage(path)
+    schedule = DoseSchedule("med-1", BASE, repeat_interval=timedelta(hours=8))
+    # Stored order differs from id order; both must survive.
+    names = [f"med-{index}" for index in (7, 3, 9, 1, 5)] + ["méd-ü"]
+    storage.save_medications([Medication(name, name, "10mg", "", schedule) for name in names])
+    doses = [UpcomingDose.create("med-1", BASE + timedelta(hours=hour)) for hour in range(200)]
+    storage.save_upcoming_doses(doses)
+
+    reads = []
+    raw = snapshot_codec._StringView.raw
+
+    def counting_raw(view, index):
+        reads.append(index)
+        return raw(view, index)
+
+    monkeypatch.setattr(snapshot_codec._StringView, "raw", counting_raw)
+    monkeypatch.setattr(SnapshotReader, "metadata", lambda reader: pytest.fail("decoded META"))
+    with SnapshotReader(path) as reader:
+        for dose in (doses[0], doses[137], doses[-1]):
+            reads.clear()
+            assert UpcomingDose.from_dict(reader.upcoming_dose(dose.dose_id)) == dose
+            # Eight probes and a match, then the record's three strings.
+            assert len(reads) <= 12
+        assert reader.upcoming_dose("dose-missing") is None
+        assert reader.medication("méd-ü")["name"] == "méd-ü"
+        assert reader.medication("med-5")["name"] == "med-5"
+        assert reader.medication("med-2") is None
+        assert [item["medication_id"] for item in reader.medications()] == names
+    monkeypatch.undo()
+    assert [item.medication_id for item in ReminderStorage(path).load_medications()] == names
+
+
+def test_reader_rejects_foreign_and_newer_files(tmp_path):
+    path = tmp_path / "storage.rbin"
+    path.write_bytes(b"{}" * 16)
+    with pytest.raises(SnapshotFormatError):
+        SnapshotReader(path)
+
+    ReminderStorage(tmp_path / "other.rbin")
+    data = bytearray((tmp_path / "other.rbin").read_bytes())
+    data[4] = 99
+    path.write_bytes(bytes(data))
+    with pytest.raises(SnapshotFormatError):
+        SnapshotReader(path)
+
+
+def test_convert_snapshot_round_trips_json_and_binary(tmp_path):
+    source = tmp_path / "storage.json"
+    storage = ReminderStorage(source, journal=True)
+    _populate(storage)
+    expected = ReminderStorage(source, journal=True).load_history()
+
+    convert_snapshot(source, tmp_path / "storage.rbin")
+    main([str(tmp_path / "storage.rbin"), str(tmp_path / "back.json")])
+
+    # Timestamps come back as epoch integers, which every reader accepts.
+    back = ReminderStorage(tmp_path / "back.json")
+    assert back.load_history() == expected
+    assert back.load_medications() == storage.load_medications()
+    assert back.load_aggregates().data == storage.load_aggregates().data
+    assert ReminderStorage(tmp_path / "storage.rbin").load_history() == expected
@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+
+from reminders.migrate import copy_storage
+from reminders.models import DoseHistoryEntry, DoseSchedule, Medication, UpcomingDose
+from reminders.scheduler import ReminderScheduler
+from reminders.sqlite_storage import SQLiteReminderStorage
+from reminders.storage import ReminderStorage, open_storage
+
+
+def _make_medication() -> Medication:
+    return Medication(
+        medication_id="med-1",
+        name="Pain Reliever",
+        dosage="10mg",
+        schedule=DoseSchedule(
+            medication_id="med-1",
+            start_time=datetime.now() - timedelta(hours=1),
+            repeat_interval=timedelta(hours=8),
+        ),
+    )
+
+
+def test_sqlite_storage_persists_entities(tmp_path):
+    storage = SQLiteReminderStorage(tmp_path / "reminders.db")
+    medication = _make_medication()
+    storage.upsert_medication(medication)
+    storage.upsert_medication(medication)
+    assert [item.medication_id for item in storage.load_medications()] == ["med-1"]
+
+    dose = UpcomingDose.create(medication.medication_id, datetime.now())
+    storage.upsert_upcoming_dose(dose)
+    dose.status = "taken"
+    storage.upsert_upcoming_dose(dose)
+    assert storage.get_upcoming_dose(dose.dose_id).status == "taken"
+
+    storage.remove_upcoming_dose(dose.dose_id)
+    assert storage.get_upcoming_dose(dose.dose_id) is None
+
+    mode = storage._query("PRAGMA journal_mode")[0][0]
+    assert mode == "wal"
+
+    storage.reset()
+    assert storage.load_medications() == []
+
+
+def test_scheduler_runs_against_sqlite(tmp_path):
+    storage = SQLiteReminderStorage(tmp_path / "reminders.db")
+    medication = _make_medication()
+    storage.upsert_medication(medication)
+    dose = UpcomingDose.create(medication.medication_id, datetime.now() - timedelta(minutes=5))
+    storage.upsert_upcoming_dose(dose)
+
+    ReminderScheduler(storage).mark_taken(dose.dose_id)
+
+    assert storage.load_history()[-1].status == "taken"
+    assert len(storage.load_upcoming_doses()) == 1
+
+
+def test_open_storage_selects_engine(tmp_path):
+    assert isinstance(open_storage(f"sqlite:///{tmp_path}/a.db"), SQLiteReminderStorage)
+    assert isinstance(open_storage(tmp_path / "b.sqlite"), SQLiteReminderStorage)
+    assert isinstance(open_storage(tmp_path / "c.json"), ReminderStorage)
+    journaled = open_storage(f"json:///{tmp_path}/d.json", journal=True)
+    assert journaled.journaled
+
+
+def test_copy_storage_imports_json_document(tmp_path):
+    source = ReminderStorage(tmp_path / "reminders.json")
+    source.upsert_medication(_make_medication())
+    dose = UpcomingDose.create("med-1", datetime.now())
+    source.upsert_upcoming_dose(dose)
+    now = datetime.now()
+    source.append_history(
+        DoseHistoryEntry(
+            dose_id=dose.dose_id,
+            medication_id="med-1",
+            scheduled_time=dose.scheduled_time,
+            status="taken",
+            acted_at=now,
+            timestamp=now,
+        )
+    )
+
+    target = SQLiteReminderStorage(tmp_path / "reminders.db")
+    summary = copy_storage(source, target)
+
+    assert (summary.medications, summary.upcoming_doses, summary.history) == (1, 1, 1)
+    assert target.get_upcoming_dose(dose.dose_id) is not None
+    assert target.load_history()[0].status == "taken"
+
+
+def test_sqlite_history_queries_push_filters_into_sql(tmp_path):
+    storage = SQLiteReminderStorage(tmp_path / "reminders.db")
+    base = datetime(2024, 5, 1, 8, 0)
+    storage.append_history_many(
+        DoseHistoryEntry(
+            dose_id=f"dose-{index}",
+            medication_id="med-1" if index % 2 else "med-2",
+            scheduled_time=base + timedelta(hours=index),
+            status="taken",
+            acted_at=base + timedelta(hours=index),
+            timestamp=base + timedelta(hours=index),
+        )
+        for index in reversed(range(6))
+    )
+
+    window = storage.load_history(base + timedelta(hours=1), base + timedelta(hours=4))
+    assert [entry.dose_id for entry in window] == ["dose-1", "dose-2", "dose-3"]
+    latest = storage.load_history(medication_id="med-1", limit=2, reverse=True)
+    assert [entry.dose_id for entry in latest] == ["dose-5", "dose-3"]
@@ -1,6 +1,8 @@
 from datetime import datetime, timedelta
 
-from reminders.models import DoseSchedule, Medication, UpcomingDose
+import pytest
+
+from reminders.models import DoseHistoryEntry, DoseSchedule, Medication, UpcomingDose
 from reminders.storage import ReminderStorage
 
 
@@ -45,3 +47,191 @@ def test_storage_persists_entities(tmp_path):
     assert storage.load_medications() == []
     assert storage.load_upcoming_doses() == []
     assert storage.load_history() == []
+
+
+def test_cached_storage_serves_reads_from_memory(tmp_path):
+    path = tmp_path / "storage.json"
+    storage = ReminderStorage(path, cache=True)
+    medication = _make_medication(datetime.now())
+    storage.upsert_medication(medication)
+
+    assert storage.get_medication(medication.medication_id) is not None
+    assert storage.load_medications()[0].name == medication.name
+    assert storage.cache_stats.misses == 1
+    assert storage.cache_stats.hits == 1
+
+    dose = UpcomingDose.create(medication.medication_id, datetime.now())
+    storage.upsert_upcoming_dose(dose)
+    loaded = storage.get_upcoming_dose(dose.dose_id)
+    loaded.status = "taken"
+    assert storage.get_upcoming_dose(dose.dose_id).status == "pending"
+    assert storage.cache_stats.misses == 1
+
+
+def test_cached_storage_reloads_after_external_write(tmp_path):
+    path = tmp_path / "storage.json"
+    storage = ReminderStorage(path, cache=True)
+    assert storage.load_medications() == []
+
+    other = ReminderStorage(path)
+    other.upsert_medication(_make_medication(datetime.now()))
+
+    assert [item.medication_id for item in storage.load_medications()] == ["med-1"]
+    assert storage.cache_stats.reloads == 2
+
+
+def test_epoch_timestamp_format_is_readable_by_default_storage(tmp_path):
+    path = tmp_path / "storage.json"
+    medication = _make_medication(datetime(2024, 1, 1, 8, 0))
+    ReminderStorage(path, timestamp_format="epoch").upsert_medication(medication)
+
+    assert '"start_time": 17040' in path.read_text()
+    assert ReminderStorage(path).get_medication("med-1") == medication
+
+
+def _history_entry(medication_id: str, status: str, at: datetime) -> DoseHistoryEntry:
+    return DoseHistoryEntry(
+        dose_id=f"{medication_id}-{at:%H%M}",
+        medication_id=medication_id,
+        scheduled_time=at,
+        status=status,
+        acted_at=at,
+        timestamp=at,
+    )
+
+
+def test_history_range_queries_use_half_open_ranges(tmp_path):
+    base = datetime(2024, 5, 1, 8, 0)
+    entries = [
+        _history_entry(
+            "med-1" if index % 2 else "med-2",
+            "taken" if index % 3 else "missed",
+            base + timedelta(hours=index),
+        )
+        for index in range(12)
+    ]
+    for cached in (False, True):
+        storage = ReminderStorage(tmp_path / f"history-{cached}.json", cache=cached)
+        # Out-of-order appends still come back sorted by timestamp.
+        storage.append_history_many(entries[6:])
+        storage.append_history_many(entries[:6])
+
+        window = storage.load_history(base + timedelta(hours=2), base + timedelta(hours=5))
+        assert [entry.scheduled_time.hour for entry in window] == [10, 11, 12]
+
+        latest = storage.load_history(limit=3, reverse=True)
+        assert [entry.scheduled_time.hour for entry in latest] == [19, 18, 17]
+
+        missed = storage.load_history(medication_id="med-2", status="missed")
+        assert [entry.scheduled_time.hour for entry in missed] == [8, 14]
+
+
+def test_uncached_history_queries_decode_only_matches(tmp_path, monkeypatch):
+    base = datetime(2024, 5, 1, 8, 0)
+    storage = ReminderStorage(tmp_path / "storage.json")
+    storage.append_history_many(
+        _history_entry("med-1", "taken", base + timedelta(hours=index)) for index in range(50)
+    )
+    decoded = []
+    original = DoseHistoryEntry.from_dict
+
+    def counting_from_dict(payload):
+        decoded.append(payload["dose_id"])
+        return original(payload)
+
+    monkeypatch.setattr(DoseHistoryEntry, "from_dict", staticmethod(counting_from_dict))
+
+    latest = storage.load_history(limit=3, reverse=True)
+    assert [entry.scheduled_time for entry in latest] == [
+        base + timedelta(hours=index) for index in (49, 48, 47)
+    ]
+    assert len(decoded) == 3
+
+
+@pytest.mark.parametrize(
+    "options", [{}, {"journal": True}, {"cache": True}], ids=["plain", "journal", "cache"]
+)
+def test_transaction_reads_its_own_writes_and_rolls_back(tmp_path, options):
+    storage = ReminderStorage(tmp_path / "storage.json", **options)
+    medication = _make_medication(datetime.now())
+    storage.upsert_medication(medication)
+    dose = UpcomingDose.create(medication.medication_id, datetime.now())
+
+    with pytest.raises(RuntimeError):
+        with storage.transaction():
+            storage.upsert_upcoming_dose(dose)
+            assert storage.get_upcoming_dose(dose.dose_id) is not None
+            raise RuntimeError("abort")
+    assert storage.get_upcoming_dose(dose.dose_id) is None
+    assert ReminderStorage(tmp_path / "storage.json", **options).load_upcoming_doses() == []
+
+    with storage.transaction():
+        storage.upsert_upcoming_dose(dose)
+        with storage.transaction():
+            storage.remove_upcoming_dose(dose.dose_id)
+            storage.upsert_upcoming_dose(dose)
+    reopened = ReminderStorage(tmp_path / "storage.json", **options)
+    assert [item.dose_id for item in reopened.load_upcoming_doses()] == [dose.dose_id]
+    assert storage.get_upcoming_dose(dose.dose_id) is not None
+
+
+def test_writes_replace_the_document_atomically(tmp_path, monkeypatch):
+    path = tmp_path / "storage.json"
+    storage = ReminderStorage(path, fsync="always")
+    medication = _make_medication(datetime(2024, 1, 1, 8, 0))
+    storage.upsert_medication(medication)
+    assert sorted(item.name for item in tmp_path.iterdir()) == ["storage.json", "storage.json.lock"]
+
+    def crash(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr("reminders.durability.os.replace", crash)
+    with pytest.raises(OSError):
+        storage.save_medications([])
+    assert ReminderStorage(path).get_medication("med-1") == medication
+    assert sorted(item.name for item in tmp_path.iterdir()) == ["storage.json", "storage.json.lock"]
+
+
+@pytest.mark.parametrize("options", [{}, {"journal": True}], ids=["plain", "journal"])
+def test_commit_window_groups_mutations_into_one_write(tmp_path, monkeypatch, options):
+    path = tmp_path / "storage.json"
+    storage = ReminderStorage(path, commit_window=60, **options)
+    other = ReminderStorage(path, **options)
+    writes = []
+    write_records = storage._write_records
+
+    def counting_write(records, state=None):
+        writes.append(records)
+        write_records(records, state)
+
+    monkeypatch.setattr(storage, "_write_records", counting_write)
+
+    doses = [UpcomingDose.create("med-1", datetime(2024, 1, 1, hour)) for hour in range(3)]
+    for dose in doses:
+        storage.upsert_upcoming_dose(dose)
+    storage.remove_upcoming_dose(doses[0].dose_id)
+    assert [dose.dose_id for dose in storage.load_upcoming_doses()] == [
+        dose.dose_id for dose in doses[1:]
+    ]
+    assert other.load_upcoming_doses() == []
+    assert writes == []
+
+    storage.flush()
+    assert len(writes) == 1
+    assert len(writes[0]) == 4
+    assert len(other.load_upcoming_doses()) == 2
+
+
+def test_close_persists_grouped_mutations(tmp_path):
+    path = tmp_path / "storage.json"
+    storage = ReminderStorage(path, journal=True, commit_window=60)
+    dose = UpcomingDose.create("med-1", datetime(2024, 1, 1, 8))
+    storage.upsert_upcoming_dose(dose)
+    storage.close()
+    reopened = ReminderStorage(path, journal=True)
+    assert [item.dose_id for item in reopened.load_upcoming_doses()] == [dose.dose_id]
+
+
+def test_unknown_fsync_policy_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        ReminderStorage(tmp_path / "storage.json", fsync="sometimes")